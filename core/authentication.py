@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication, exceptions
+
+from .models import CustomUser
+from .principal import ADMIN, PROFILE_RELATIONS, resolve_principal
+
+TOKEN_KEY = 'auth-token:{key}'
+
+
+class TokenAuthentication(authentication.TokenAuthentication):
+    """
+    همان احراز هویت توکنی DRF که کاربر را همراه پروفایل موسسه، استاد یا دانش‌آموز در یک کوئری بارگذاری می‌کند
+    تا بررسی نقش کاربر در دسترسی‌ها و view ها کوئری اضافه نزند.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related(
+                'user', *[f'user__{name}' for name in PROFILE_RELATIONS]
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    برای مسیرهای پرتکرار: Principal هر توکن تا ``AUTH_TOKEN_CACHE_TIMEOUT`` ثانیه در کش نگه داشته می‌شود و در
+    حالت عادی کوئری‌ای زده نمی‌شود. ``request.user`` نمونه ذخیره‌نشده‌ای از کاربر فقط با شناسه و نقش است و
+    ``request.auth`` خود Principal است، پس view باید فقط از ``get_principal`` استفاده کند.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            request._principal = result[1]
+        return result
+
+    def authenticate_credentials(self, key):
+        cache_key = TOKEN_KEY.format(key=key)
+        principal = cache.get(cache_key)
+        if principal is None:
+            user, _token = super().authenticate_credentials(key)
+            principal = resolve_principal(user)
+            cache.set(cache_key, principal, timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+        user = CustomUser(
+            pk=principal.user_id, is_superuser=principal.is_superuser,
+            user_type=ADMIN if principal.is_admin else principal.role,
+        )
+        return (user, principal)
+
+
+def forget_token(key):
+    cache.delete(TOKEN_KEY.format(key=key))
@@ -0,0 +1,406 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from exam import consts as exam_consts
+from exam import models as exam_models
+from . import models
+
+ROLES = ('admin', 'institute', 'teacher', 'student')
+ANONYMOUS = None
+
+PASSWORD = 'benchmark-pass'
+URL_PREFIXES = {'core': '/api/core/', 'exam': '/api/exam/'}
+
+# حداکثر تعداد کوئری مجاز برای هر درخواست.
+QUERY_BUDGET = 30
+
+# مسیرهایی که تعداد کوئری آن‌ها با تعداد ردیف‌ها رشد می‌کند و بودجه و رشد کوئری برای آن‌ها بررسی نمی‌شود.
+# خروجی‌های فایل عمدا داده را دسته به دسته (برای هر آزمون و هر EXAM_EXPORT_CHUNK_SIZE ردیف) می‌خوانند.
+KNOWN_QUERY_GROWTH = {
+    'GET /api/exam/exams/<int:pk>/export/',
+    'GET /api/exam/classrooms/<int:pk>/export/',
+    'GET /api/exam/institutes/<int:pk>/export/',
+}
+
+
+def _submit_payload(ids):
+    return {'answers': [{'question_id': ids['question'], 'option_id': ids['option']}]}
+
+
+def _question_payload(options):
+    return {
+        'text': 'question', 'question_type': 'MultipleChoice', 'score': 1,
+        'options': [{'text': f'option {i}', 'is_correct': i == 0} for i in range(options)],
+    }
+
+
+def _import_payload(ids):
+    start = timezone.now() + timedelta(days=1)
+    return {
+        'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=2)).isoformat(),
+        'file': {
+            'format': 'online-exam', 'version': 1,
+            'exam': {'title': 'imported', 'description': '-', 'duration_minutes': 60, 'category': None},
+            'questions': [_question_payload(4) for _ in range(20)],
+        },
+    }
+
+
+def _signup_payload(kind):
+    def payload(ids):
+        data = {
+            'username': f'new-{kind}', 'password': PASSWORD, 'password2': PASSWORD,
+            'email': f'{kind}@example.com', 'first_name': kind, 'last_name': kind,
+        }
+        if kind == 'institute':
+            data.update(institute_name='new-institute', registration_code='new-code', address='-', phone='1',
+                        website='')
+        if kind in ('teacher', 'student'):
+            data.update(institute_id=ids['institute'], national_code='9999999999', phone_number='1')
+        if kind == 'teacher':
+            data.update(expertise='-')
+        if kind == 'student':
+            data.update(major_id=ids['major'], date_of_birth=None, gender='')
+        return data
+    return payload
+
+
+# (اپ، الگوی مسیر در urls.py، متد، نقش‌ها، کلید شناسه‌ای که جای pk قرار می‌گیرد، بدنه درخواست)
+ENDPOINTS = [
+    ('core', 'auth/signup/admin/', 'post', (ANONYMOUS,), None, _signup_payload('admin')),
+    ('core', 'auth/signup/institute/', 'post', (ANONYMOUS,), None, _signup_payload('institute')),
+    ('core', 'auth/signup/teacher/', 'post', (ANONYMOUS,), None, _signup_payload('teacher')),
+    ('core', 'auth/signup/student/', 'post', (ANONYMOUS,), None, _signup_payload('student')),
+    ('core', 'auth/login/', 'post', (ANONYMOUS,), None, lambda ids: {'username': 'student-0', 'password': PASSWORD}),
+    ('core', 'auth/logout/', 'post', ('student',), None, None),
+    ('core', 'institutes/', 'get', ROLES, None, None),
+    ('core', 'institutes/<int:pk>/', 'get', ROLES, 'institute', None),
+    ('core', 'institutes/<int:pk>/students/import/', 'post', ('institute',), 'institute', None),
+    ('core', 'teachers/', 'get', ROLES, None, None),
+    ('core', 'teachers/<int:pk>/', 'get', ROLES, 'teacher', None),
+    ('core', 'students/', 'get', ROLES, None, None),
+    ('core', 'students/<int:pk>/', 'get', ROLES, 'student', None),
+    ('core', 'users/<int:pk>/', 'get', ROLES, 'user', None),
+
+    ('exam', 'classrooms/', 'get', ROLES, None, None),
+    ('exam', 'classrooms/<int:pk>/', 'get', ROLES, 'classroom', None),
+    ('exam', 'classrooms/<int:pk>/enroll/', 'post', ('teacher',), 'classroom',
+     lambda ids: {'student_ids': [ids['student']]}),
+    ('exam', 'students-classrooms/', 'get', ROLES, None, None),
+    ('exam', 'students-classrooms/<int:pk>/', 'get', ROLES, 'student_classroom', None),
+    ('exam', 'majors/', 'get', ROLES, None, None),
+    ('exam', 'majors/<int:pk>/', 'get', ROLES, 'major', None),
+    ('exam', 'exam-categories/', 'get', ROLES, None, None),
+    ('exam', 'exam-categories/<int:pk>/', 'get', ROLES, 'category', None),
+    ('exam', 'classrooms/<int:classroom_id>/exams/', 'get', ROLES, None, None),
+    ('exam', 'classrooms/<int:classroom_id>/exams/<int:pk>/', 'get', ROLES, 'exam', None),
+    ('exam', 'classrooms/<int:pk>/exams/import/', 'post', ('teacher',), 'classroom', _import_payload),
+    ('exam', 'exams/<int:pk>/questions/', 'post', ('teacher',), 'exam', lambda ids: [_question_payload(3)] * 3),
+    ('exam', 'exams/<int:pk>/file/', 'get', ROLES, 'exam', None),
+    ('exam', 'exams/<int:pk>/paper/', 'get', ROLES, 'exam', None),
+    ('exam', 'exams/<int:pk>/submit/', 'post', ('student',), 'exam', _submit_payload),
+    ('exam', 'exams/<int:pk>/heartbeat/', 'get', ROLES, 'exam', None),
+    ('exam', 'exams/<int:pk>/finish/', 'post', ('student',), 'exam', None),
+    ('exam', 'exams/<int:pk>/autosave/', 'get', ('student',), 'exam', None),
+    ('exam', 'exams/<int:pk>/autosave/', 'put', ('student',), 'exam', _submit_payload),
+    ('exam', 'exams/<int:pk>/announcements/', 'post', ('teacher',), 'exam', lambda ids: {'text': 'announcement'}),
+    ('exam', 'exams/<int:pk>/export/', 'get', ROLES, 'exam', None),
+    ('exam', 'classrooms/<int:pk>/export/', 'get', ROLES, 'classroom', None),
+    ('exam', 'institutes/<int:pk>/export/', 'get', ROLES, 'institute', None),
+    ('exam', 'exams/<int:pk>/leaderboard/', 'get', ROLES, 'exam', None),
+    ('exam', 'exams/<int:pk>/leaderboard/summary/', 'get', ROLES, 'exam', None),
+    ('exam', 'exams/<int:pk>/leaderboard/me/', 'get', ROLES, 'exam', None),
+    ('exam', 'exams/<int:pk>/item-analysis/', 'get', ROLES, 'exam', None),
+    ('exam', 'classrooms/<int:classroom_id>/exams/<int:exam_id>/questions/', 'get', ROLES, None, None),
+    ('exam', 'classrooms/<int:classroom_id>/exams/<int:exam_id>/questions/<int:pk>/', 'get', ROLES, 'question',
+     None),
+    ('exam', 'classrooms/<int:classroom_id>/exams/<int:exam_id>/questions/<int:question_id>/options/', 'get', ROLES,
+     None, None),
+    ('exam', 'classrooms/<int:classroom_id>/exams/<int:exam_id>/questions/<int:question_id>/options/<int:pk>/',
+     'get', ROLES, 'option', None),
+    ('exam', 'answers/', 'get', ROLES, None, None),
+    ('exam', 'answers/<int:pk>/', 'get', ROLES, 'answer', None),
+    ('exam', 'options-answers/', 'get', ROLES, None, None),
+    ('exam', 'options-answers/<int:pk>/', 'get', ROLES, 'user_option', None),
+    ('exam', 'feedbackes/', 'get', ROLES, None, None),
+    ('exam', 'feedbackes/<int:pk>/', 'get', ROLES, 'feedback', None),
+    ('exam', 'user-exam-results/', 'get', ROLES, None, None),
+    ('exam', 'user-exam-results/<int:pk>/', 'get', ROLES, 'result', None),
+    ('exam', 'exam-time/', 'get', ROLES, None, None),
+    ('exam', 'exam-time/', 'post', ('student',), None, lambda ids: {'exam_id': ids['exam']}),
+]
+
+# مسیرهایی که علاوه بر خروجی پیش‌فرض با همه روابط قابل expand هم اندازه‌گیری می‌شوند.
+EXPANSIONS = {
+    'institutes/': 'account',
+    'teachers/': 'account,institute.account',
+    'students/': 'account,institute.account',
+    'classrooms/': 'teacher.account,teacher.institute',
+    'exam-categories/': 'creator',
+    'classrooms/<int:classroom_id>/exams/': 'classroom.teacher.account,creator,category',
+    'classrooms/<int:classroom_id>/exams/<int:exam_id>/questions/': 'exam.classroom.teacher.account',
+    'classrooms/<int:classroom_id>/exams/<int:exam_id>/questions/<int:question_id>/options/': 'question.exam',
+    'answers/': 'user.account,user.institute,question.exam',
+    'options-answers/': 'user.account,question.exam,answer_option',
+    'feedbackes/': 'user.account,exam.classroom',
+    'user-exam-results/': 'user.account,exam.category',
+    'exam-time/': 'user.account,exam',
+    'exams/<int:pk>/leaderboard/': 'user.account,user.institute',
+}
+
+PATH_PARAMS = {'classroom_id': 'classroom', 'exam_id': 'exam', 'question_id': 'question'}
+
+
+def in_test_database(func, *args, **kwargs):
+    """
+    ``func`` را روی یک پایگاه داده تست تازه اجرا می‌کند تا داده ساختگی بنچمارک‌ها به پایگاه داده اصلی نرسد.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def create_account(username, user_type, **extra):
+    return models.CustomUser.objects.create(
+        username=username, user_type=user_type, password=make_password(None), **extra
+    )
+
+
+def seed(scale):
+    """
+    داده‌ای نزدیک به واقعیت می‌سازد که اندازه آن با ``scale`` رشد می‌کند و شناسه‌های لازم برای ساخت مسیرها
+    و توکن هر نقش را برمی‌گرداند. همه ردیف‌ها به موسسه اول تعلق دارند تا هر نقش داده قابل مشاهده داشته باشد.
+    """
+    now = timezone.now()
+    major = exam_models.Major.objects.create(name='benchmark-major')
+    admin = create_account('benchmark-admin', 'admin', is_superuser=True, is_staff=True)
+    category = exam_models.ExamCategory.objects.create(name='benchmark-category', creator=admin)
+
+    institute = models.Institute.objects.create(
+        account=create_account('institute-0', 'institute'), name='institute-0', registration_code='institute-0',
+        address='-', phone='1',
+    )
+
+    students = [
+        models.Student.objects.create(
+            account=create_account(f'student-{i}', 'student'), institute=institute, national_code=f'{i:010d}',
+            phone_number='1', major=major,
+        )
+        for i in range(5 * scale)
+    ]
+    students[0].account.set_password(PASSWORD)
+    students[0].account.save(update_fields=['password'])
+
+    teachers, classrooms, exams = [], [], []
+    for t in range(scale):
+        teacher = models.Teacher.objects.create(
+            account=create_account(f'teacher-{t}', 'teacher'), institute=institute, national_code=f'{t:09d}1',
+            phone_number='1', expertise='-',
+        )
+        teachers.append(teacher)
+        for c in range(2):
+            classroom = exam_models.Classroom.objects.create(name=f'class-{t}-{c}', teacher=teacher, grade='bachelor')
+            classrooms.append(classroom)
+            exam_models.StudentClassroom.objects.bulk_create(
+                exam_models.StudentClassroom(classroom=classroom, student=student) for student in students
+            )
+            for e in range(2):
+                exams.append(exam_models.Exam.objects.create(
+                    title=f'exam-{t}-{c}-{e}', description='-', start_time=now - timedelta(minutes=10),
+                    end_time=now + timedelta(hours=1), duration_minutes=60, category=category,
+                    classroom=classroom, creator=teacher.account,
+                ))
+
+    for exam in exams:
+        for q in range(3 * scale):
+            question = exam_models.Question.objects.create(
+                exam=exam, text=f'question-{q}', question_type='MultipleChoice', score=2
+            )
+            exam_models.Option.objects.bulk_create(
+                exam_models.Option(question=question, text=f'option-{o}', is_correct=(o == 0)) for o in range(4)
+            )
+        exam_models.Question.objects.create(exam=exam, text='descriptive', question_type='Descriptive', score=5)
+
+    correct_options = exam_models.Option.objects.filter(is_correct=True).select_related('question')
+    exam_models.UserOptions.objects.bulk_create(
+        exam_models.UserOptions(user=student, question=option.question, answer_option=option)
+        for option in correct_options for student in students
+    )
+    descriptive = exam_models.Question.objects.filter(question_type='Descriptive')
+    exam_models.UserAnswer.objects.bulk_create(
+        exam_models.UserAnswer(user=student, question=question, answer_text='-', score=1)
+        for question in descriptive for student in students
+    )
+    exam_models.UserExamResult.objects.bulk_create(
+        exam_models.UserExamResult(user=student, exam=exam, score=0) for exam in exams for student in students
+    )
+    exam_models.Feedback.objects.bulk_create(
+        exam_models.Feedback(user=student, exam=exam, text='-') for exam in exams for student in students
+    )
+    exam_models.UserExamTime.objects.bulk_create(
+        exam_models.UserExamTime(
+            user=student, exam=exam, status=exam_consts.SESSION_IN_PROGRESS, started_at=now,
+            finish_time=now + timedelta(minutes=exam.duration_minutes),
+        )
+        for exam in exams for student in students
+    )
+
+    exam = exams[0]
+    question = exam.questions.filter(question_type='MultipleChoice').order_by('id').first()
+    student = students[0]
+    ids = {
+        'institute': institute.id,
+        'teacher': teachers[0].id,
+        'student': student.id,
+        'user': student.account_id,
+        'major': major.id,
+        'category': category.id,
+        'classroom': exam.classroom_id,
+        'student_classroom': exam_models.StudentClassroom.objects.filter(
+            classroom_id=exam.classroom_id, student=student).values_list('id', flat=True).get(),
+        'exam': exam.id,
+        'question': question.id,
+        'option': question.options.order_by('id').values_list('id', flat=True).first(),
+        'answer': exam_models.UserAnswer.objects.filter(user=student).values_list('id', flat=True).first(),
+        'user_option': exam_models.UserOptions.objects.filter(user=student, question=question)
+        .values_list('id', flat=True).get(),
+        'feedback': exam_models.Feedback.objects.filter(user=student, exam=exam).values_list('id', flat=True).get(),
+        'result': exam_models.UserExamResult.objects.filter(user=student, exam=exam).values_list('id', flat=True).get(),
+    }
+    accounts = {
+        'admin': admin,
+        'institute': institute.account,
+        'teacher': teachers[0].account,
+        'student': student.account,
+    }
+    tokens = {role: Token.objects.create(user=account).key for role, account in accounts.items()}
+    return ids, tokens
+
+
+def endpoint_key(app, route, method):
+    return f'{method.upper()} {URL_PREFIXES[app]}{route}'
+
+
+def build_path(app, route, pk_key, ids):
+    path = route
+    for param, key in PATH_PARAMS.items():
+        path = path.replace(f'<int:{param}>', str(ids[key]))
+    if pk_key:
+        path = path.replace('<int:pk>', str(ids[pk_key]))
+    return URL_PREFIXES[app] + path
+
+
+def measure(client, method, path, payload):
+    """
+    یک درخواست را در تراکنشی که در پایان برگردانده می‌شود اجرا می‌کند تا داده‌ها بین درخواست‌ها ثابت بمانند.
+    کش پیش از هر درخواست پاک می‌شود تا همیشه مسیر سرد اندازه‌گیری شود.
+    """
+    cache.clear()
+    connection.queries_log.clear()
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, method)(path, payload, format='json')
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - start
+        transaction.set_rollback(True)
+
+    return {
+        'status': response.status_code,
+        'queries': len(queries),
+        'bytes': len(content),
+        'ms': round(elapsed * 1000, 3),
+    }
+
+
+def run_scale(scale):
+    results = []
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    # پاسخ‌های 403 و 404 برای برخی نقش‌ها مورد انتظار است و نباید خروجی را شلوغ کند.
+    request_logger.setLevel(logging.ERROR)
+    try:
+        with transaction.atomic():
+            ids, tokens = seed(scale)
+            for app, route, method, roles, pk_key, payload in ENDPOINTS:
+                path = build_path(app, route, pk_key, ids)
+                data = payload(ids) if payload else None
+                queries = ['']
+                if method == 'get' and route in EXPANSIONS:
+                    queries.append(f'?expand={EXPANSIONS[route]}')
+                for role in roles:
+                    client = APIClient()
+                    client.raise_request_exception = False
+                    if role is not ANONYMOUS:
+                        client.credentials(HTTP_AUTHORIZATION=f'Token {tokens[role]}')
+                    for query in queries:
+                        result = measure(client, method, path + query, data)
+                        result.update(
+                            endpoint=endpoint_key(app, route, method) + query, role=role or 'anonymous', scale=scale
+                        )
+                        results.append(result)
+            transaction.set_rollback(True)
+    finally:
+        request_logger.setLevel(level)
+    return results
+
+
+def find_violations(results, query_budget=QUERY_BUDGET, max_ms=None):
+    """
+    خطاهای سرور، عبور از بودجه کوئری یا زمان و رشد تعداد کوئری بین کوچک‌ترین و بزرگ‌ترین مقیاس را برمی‌گرداند.
+    """
+    violations = []
+    for result in results:
+        label = f"{result['endpoint']} as {result['role']} (scale {result['scale']})"
+        if result['status'] >= 500:
+            violations.append(f"{label}: status {result['status']}")
+        if result['endpoint'] in KNOWN_QUERY_GROWTH:
+            continue
+        if result['queries'] > query_budget:
+            violations.append(f"{label}: {result['queries']} queries > budget {query_budget}")
+        if max_ms is not None and result['ms'] > max_ms:
+            violations.append(f"{label}: {result['ms']} ms > budget {max_ms} ms")
+
+    scales = sorted({result['scale'] for result in results})
+    if len(scales) > 1:
+        by_scale = {
+            (result['endpoint'], result['role'], result['scale']): result['queries'] for result in results
+        }
+        for result in results:
+            if result['scale'] != scales[0] or result['endpoint'] in KNOWN_QUERY_GROWTH:
+                continue
+            small = result['queries']
+            large = by_scale[(result['endpoint'], result['role'], scales[-1])]
+            if large > small:
+                violations.append(
+                    f"{result['endpoint']} as {result['role']}: queries grow with rows ({small} -> {large})"
+                )
+    return violations
+
+
+def run_benchmark(scales=(1, 3), query_budget=QUERY_BUDGET, max_ms=None):
+    results = []
+    for scale in scales:
+        results += run_scale(scale)
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'scales': list(scales),
+        'query_budget': query_budget,
+        'results': results,
+        'violations': find_violations(results, query_budget, max_ms),
+    }
@@ -0,0 +1,256 @@
+import csv
+import io
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from xml.etree.ElementTree import ParseError, iterparse
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from exam.models import Major
+
+from . import consts
+from . import models
+
+COLUMNS = ('username', 'password', 'first_name', 'last_name', 'email', 'national_code', 'phone_number', 'major_id',
+           'date_of_birth', 'gender')
+
+SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+class StudentRowSerializer(serializers.Serializer):
+    """
+    اعتبارسنجی یک ردیف فایل ورود دانش‌آموزان؛ بررسی‌های پایگاه داده برای هر دسته یکجا انجام می‌شود.
+    """
+    username = serializers.CharField(max_length=255)
+    password = serializers.CharField(max_length=255)
+    first_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    email = serializers.EmailField(required=False, allow_blank=True)
+    national_code = serializers.CharField(max_length=10)
+    phone_number = serializers.CharField(max_length=20)
+    major_id = serializers.IntegerField()
+    date_of_birth = serializers.DateField(required=False, allow_null=True)
+    gender = serializers.ChoiceField(choices=consts.GENDER_CHOICES, required=False, allow_null=True)
+
+
+def _csv_rows(upload):
+    yield from csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''))
+
+
+def _cell_text(cell, shared):
+    if cell.get('t') == 'inlineStr':
+        return ''.join(node.text or '' for node in cell.iter(f'{SHEET_NS}t'))
+    value = cell.find(f'{SHEET_NS}v')
+    if value is None or value.text is None:
+        return ''
+    if cell.get('t') == 's':
+        return shared[int(value.text)]
+    text = value.text
+    # اعداد صحیح در XLSX معمولا به صورت 12.0 ذخیره می‌شوند.
+    return text[:-2] if text.endswith('.0') else text
+
+
+def _column_index(reference):
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord('A') + 1
+    return index - 1
+
+
+def _xlsx_rows(upload):
+    """
+    برگه اول فایل XLSX را ردیف به ردیف با iterparse می‌خواند؛ فقط جدول رشته‌های مشترک در حافظه نگه داشته می‌شود.
+    """
+    with zipfile.ZipFile(upload) as archive:
+        shared = []
+        if 'xl/sharedStrings.xml' in archive.namelist():
+            with archive.open('xl/sharedStrings.xml') as strings:
+                for _, node in iterparse(strings):
+                    if node.tag == f'{SHEET_NS}si':
+                        shared.append(''.join(text.text or '' for text in node.iter(f'{SHEET_NS}t')))
+                        node.clear()
+
+        sheet = sorted(name for name in archive.namelist() if name.startswith('xl/worksheets/sheet'))[0]
+        header = None
+        with archive.open(sheet) as content:
+            for _, node in iterparse(content):
+                if node.tag != f'{SHEET_NS}row':
+                    continue
+                values = {}
+                for position, cell in enumerate(node.iter(f'{SHEET_NS}c')):
+                    reference = cell.get('r')
+                    values[_column_index(reference) if reference else position] = _cell_text(cell, shared)
+                node.clear()
+
+                row = [values.get(index, '') for index in range(max(values, default=-1) + 1)]
+                if header is None:
+                    header = [name.strip() for name in row]
+                    continue
+                yield dict(zip(header, row))
+
+
+READERS = {'csv': _csv_rows, 'xlsx': _xlsx_rows}
+
+# خطاهای فایل خراب یا با قالب نادرست هنگام خواندن
+READ_ERRORS = (csv.Error, UnicodeDecodeError, zipfile.BadZipFile, ParseError, KeyError, IndexError, ValueError)
+
+
+def read_rows(upload, output):
+    """
+    ردیف‌های فایل ``csv`` یا ``xlsx`` را به صورت جریانی و به شکل دیکشنری (بر اساس سطر عنوان) برمی‌گرداند.
+    """
+    for row in READERS[output](upload):
+        # سلول‌های خالی مانند نبود مقدار در نظر گرفته می‌شوند تا فیلدهای اختیاری خطا ندهند.
+        yield {key: value.strip() for key, value in row.items() if key in COLUMNS and value and value.strip()}
+
+
+def _setup_worker():
+    django.setup()
+
+
+def _hash(password):
+    return make_password(password)
+
+
+class PasswordHasher:
+    """
+    رمزهای عبور را با یک مجموعه پردازه هش می‌کند؛ هش PBKDF2 عمدا کند است و در یک پردازه بین هسته‌ها تقسیم
+    نمی‌شود. با ``workers`` کمتر از دو هش در همین پردازه انجام می‌شود.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = settings.ACCOUNT_IMPORT_WORKERS if workers is None else workers
+        self.pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_setup_worker)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def hash(self, passwords):
+        if self.pool is None:
+            return [_hash(password) for password in passwords]
+        return list(self.pool.map(_hash, passwords, chunksize=max(len(passwords) // (self.workers * 4), 1)))
+
+
+def _check_chunk(chunk, seen_usernames, seen_codes):
+    """
+    ردیف‌های یک دسته را اعتبارسنجی می‌کند و (ردیف‌های معتبر، خطای ردیف‌های نامعتبر) را برمی‌گرداند. تکراری بودن
+    نام کاربری و کد ملی (در فایل و در پایگاه داده) و وجود رشته تحصیلی با چند کوئری برای کل دسته بررسی می‌شود.
+    """
+    valid, errors = [], []
+    for number, row in chunk:
+        serializer = StudentRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            errors.append({'row': number, 'username': row.get('username'), 'errors': {
+                field: [str(error) for error in field_errors] for field, field_errors in serializer.errors.items()
+            }})
+
+    usernames = {data['username'] for _, data in valid}
+    codes = {data['national_code'] for _, data in valid}
+    taken_usernames = set(models.CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+    taken_codes = set(models.Student.objects.filter(national_code__in=codes).values_list('national_code', flat=True))
+    majors = set(Major.objects.filter(id__in={data['major_id'] for _, data in valid}).values_list('id', flat=True))
+
+    accepted = []
+    for number, data in valid:
+        row_errors = {}
+        if data['username'] in taken_usernames:
+            row_errors['username'] = ['این نام کاربری قبلا ثبت شده است.']
+        elif data['username'] in seen_usernames:
+            row_errors['username'] = ['این نام کاربری در فایل تکرار شده است.']
+        if data['national_code'] in taken_codes:
+            row_errors['national_code'] = ['این کد ملی قبلا ثبت شده است.']
+        elif data['national_code'] in seen_codes:
+            row_errors['national_code'] = ['این کد ملی در فایل تکرار شده است.']
+        if data['major_id'] not in majors:
+            row_errors['major_id'] = ['رشته تحصیلی یافت نشد.']
+        seen_usernames.add(data['username'])
+        seen_codes.add(data['national_code'])
+
+        if row_errors:
+            errors.append({'row': number, 'username': data['username'], 'errors': row_errors})
+        else:
+            accepted.append((number, data))
+    return accepted, errors
+
+
+def _insert_chunk(institute, rows, hashes):
+    with transaction.atomic():
+        models.CustomUser.objects.bulk_create([
+            models.CustomUser(
+                username=data['username'], password=password, user_type='student', email=data.get('email', ''),
+                first_name=data.get('first_name'), last_name=data.get('last_name'),
+            )
+            for (_, data), password in zip(rows, hashes)
+        ])
+        # همه پایگاه‌های داده (از جمله MySQL) کلید ردیف‌های bulk_create را برنمی‌گردانند.
+        account_ids = dict(
+            models.CustomUser.objects.filter(username__in=[data['username'] for _, data in rows])
+            .values_list('username', 'id')
+        )
+        models.Student.objects.bulk_create([
+            models.Student(
+                account_id=account_ids[data['username']], institute=institute, national_code=data['national_code'],
+                phone_number=data['phone_number'], major_id=data['major_id'],
+                date_of_birth=data.get('date_of_birth'), gender=data.get('gender'),
+            )
+            for _, data in rows
+        ])
+
+
+def import_students(institute, rows, chunk_size=None, workers=None):
+    """
+    دانش‌آموزان ``rows`` (ردیف‌های ``read_rows``) را در دسته‌های ``chunk_size`` تایی به موسسه اضافه می‌کند.
+    هر دسته در یک تراکنش با دو ``bulk_create`` درج می‌شود و رمزهای عبور با ``PasswordHasher`` هش می‌شوند.
+    خلاصه‌ای شامل تعداد حساب‌های ساخته‌شده و خطای هر ردیف ناموفق (با شماره سطر فایل) برمی‌گردد.
+    """
+    chunk_size = chunk_size or settings.ACCOUNT_IMPORT_CHUNK_SIZE
+    numbered = enumerate(rows, start=2)
+    created, errors = 0, []
+    seen_usernames, seen_codes = set(), set()
+
+    with PasswordHasher(workers) as hasher:
+        while True:
+            try:
+                chunk = list(islice(numbered, chunk_size))
+            except READ_ERRORS:
+                # ردیف‌های دسته‌های قبلی ثبت شده‌اند؛ خواندن بقیه فایل ممکن نیست.
+                errors.append({'row': None, 'username': None, 'errors': {'file': ['ادامه فایل قابل خواندن نیست.']}})
+                break
+            if not chunk:
+                break
+
+            accepted, chunk_errors = _check_chunk(chunk, seen_usernames, seen_codes)
+            errors += chunk_errors
+            if not accepted:
+                continue
+
+            hashes = hasher.hash([data['password'] for _, data in accepted])
+            try:
+                _insert_chunk(institute, accepted, hashes)
+            except IntegrityError:
+                # ردیفی هم‌زمان با همین نام کاربری یا کد ملی ثبت شده است؛ کل دسته ناموفق گزارش می‌شود.
+                errors += [
+                    {'row': number, 'username': data['username'],
+                     'errors': {'non_field_errors': ['ثبت این دسته به دلیل داده تکراری ناموفق بود.']}}
+                    for number, data in accepted
+                ]
+                continue
+            created += len(accepted)
+
+    errors.sort(key=lambda error: error['row'] or float('inf'))
+    return {'created': created, 'failed': len(errors), 'errors': errors}
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "همه مسیرهای API را با هر نقش روی داده ساختگی در چند مقیاس فراخوانی می‌کند و تعداد کوئری، "
+        "حجم پاسخ و زمان هر درخواست را در یک فایل JSON می‌نویسد. داده در پایگاه داده تست ساخته می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--scales', type=int, nargs='+', default=[1, 3])
+        parser.add_argument('--query-budget', type=int, default=benchmarks.QUERY_BUDGET)
+        parser.add_argument('--max-ms', type=float, default=None)
+
+    def handle(self, *args, **options):
+        report = benchmarks.in_test_database(
+            benchmarks.run_benchmark, options['scales'], options['query_budget'], options['max_ms']
+        )
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+
+        self.stdout.write(f"{len(report['results'])} requests measured, results written to {options['output']}")
+        if report['violations']:
+            raise CommandError("\n".join(report['violations']))
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import imports
+from core.models import Institute
+
+
+class Command(BaseCommand):
+    help = (
+        "دانش‌آموزان یک موسسه را از فایل CSV یا XLSX وارد می‌کند و گزارش خطای هر ردیف را چاپ می‌کند. "
+        "ستون‌ها: " + ', '.join(imports.COLUMNS)
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('institute_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        institute = Institute.objects.filter(pk=options['institute_id']).first()
+        if institute is None:
+            raise CommandError("موسسه یافت نشد.")
+
+        output = options['path'].rsplit('.', 1)[-1].lower()
+        if output not in imports.READERS:
+            raise CommandError("فقط فایل‌های CSV و XLSX پذیرفته می‌شوند.")
+
+        with open(options['path'], 'rb') as upload:
+            report = imports.import_students(
+                institute, imports.read_rows(upload, output), options['chunk_size'], options['workers']
+            )
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2, default=str))
@@ -0,0 +1,142 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.http import parse_etags
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from .principal import get_principal
+from .serializers import parse_field_paths
+from .versions import get_version
+
+
+class SelectRelatedMixin:
+    """
+    روابطی را که سریالایزر view برای هر ردیف لازم دارد (روابط ثابت و روابط ``?expand=`` شده) با
+    select_related در همان کوئری اصلی بارگذاری می‌کند تا تعداد کوئری‌ها به تعداد ردیف‌ها وابسته نباشد.
+    هر view می‌تواند با ``select_related_fields`` روابط دیگری را هم اضافه کند.
+    """
+    select_related_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        paths = list(self.select_related_fields)
+
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'related_paths'):
+            expand = parse_field_paths(self.request.query_params.get(serializer_class.expand_query_param, ''))
+            paths += serializer_class.related_paths(expand)
+
+        return queryset.select_related(*paths) if paths else queryset
+
+
+# فیلدهایی که مقدار خام پایگاه داده همان خروجی سریالایزر آن‌هاست و تبدیلی لازم ندارند.
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField, serializers.FloatField, serializers.BooleanField, serializers.CharField,
+    serializers.ChoiceField, serializers.PrimaryKeyRelatedField,
+)
+
+
+def values_plan(serializer, annotations=()):
+    """
+    اگر همه فیلدهای خواندنی سریالایزر مستقیما از ستون‌های مدل یا ``annotations`` کوئری خوانده شوند، لیست
+    ``(نام خروجی، ستون، تابع تبدیل یا None)`` را برمی‌گرداند؛ در غیر این صورت ``None``.
+    """
+    model = serializer.Meta.model
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+            return None
+        if isinstance(field, serializers.RelatedField) and not isinstance(field, serializers.PrimaryKeyRelatedField):
+            return None
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+            return None
+
+        convert = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+        if field.source in annotations:
+            plan.append((name, field.source, convert))
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+
+        plan.append((name, field.source, convert))
+    return plan
+
+
+def values_rows(plan, rows):
+    return [
+        {
+            name: row[source] if convert is None or row[source] is None else convert(row[source])
+            for name, source, convert in plan
+        }
+        for row in rows
+    ]
+
+
+class ValuesListMixin:
+    """
+    مسیر سریع لیست‌های فقط‌خواندنی: وقتی خروجی سریالایزر فقط از ستون‌های مدل ساخته می‌شود،
+    ردیف‌ها مستقیما از ``.values()`` به دیکشنری تبدیل می‌شوند و سریالایزری برای هر ردیف ساخته نمی‌شود.
+    با ``?expand=`` یا فیلدهای محاسبه‌شده همان مسیر معمول سریالایزر استفاده می‌شود.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = values_plan(self.get_serializer(), queryset.query.annotations)
+        if plan is None:
+            # همان ListModelMixin.list بدون ساختن دوباره کوئری.
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        queryset = queryset.values(*{source for _, source, _ in plan})
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_rows(plan, page))
+        return Response(values_rows(plan, queryset))
+
+
+class ConditionalListMixin:
+    """
+    ETag قوی برای لیست‌ها بر اساس شمارنده‌های نسخه‌ای که با هر تغییر داده افزایش می‌یابند.
+    ``etag_version_keys`` کلیدهای شمارنده‌های داده لیست است و با پارامترهای آدرس view پر می‌شود (مثلا
+    ``'exam:{exam_id}:paper-version'``)؛ ``etag_expand_version_keys`` فقط وقتی ``?expand=`` فرستاده شده خوانده
+    می‌شود. ETag از این نسخه‌ها، کاربر، آدرس کامل درخواست و قالب پاسخ ساخته می‌شود. اگر ``If-None-Match`` با آن
+    برابر باشد، پاسخ 304 بدون خواندن ردیف‌ها برگردانده می‌شود. view بدون کلید ETag ندارد.
+    """
+    etag_version_keys = ()
+    etag_expand_version_keys = ()
+
+    def get_etag(self, request):
+        keys = list(self.etag_version_keys)
+        if not keys:
+            return None
+        # روابط expand شده در خروجی لیست هم دیده می‌شوند و تغییر آن‌ها باید ETag را عوض کند.
+        if request.query_params.get('expand'):
+            keys += self.etag_expand_version_keys
+        principal = get_principal(request)
+        key = '|'.join(map(str, [
+            *[get_version(name.format(**self.kwargs)) for name in keys],
+            principal.user_id, request.get_full_path(), request.accepted_media_type,
+        ]))
+        return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        # نسخه‌ها پیش از خواندن ردیف‌ها خوانده می‌شوند تا تغییر هم‌زمان به ETag قدیمی‌تر نسبت داده شود.
+        etag = self.get_etag(request)
+        if etag is not None and {etag, '*'} & set(parse_etags(request.headers.get('If-None-Match', ''))):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+
+        if etag is not None:
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+        return response
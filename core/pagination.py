@@ -0,0 +1,170 @@
+import base64
+import json
+
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _json_default(value):
+    # DjangoJSONEncoder میکروثانیه را حذف می‌کند که برای مقایسه دقیق نشانگر کافی نیست.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(BasePagination):
+    """
+    صفحه‌بندی بر اساس نشانگر (keyset) روی ترتیب OrderingFilter به همراه کلید اصلی برای یکتا بودن ترتیب.
+    به جای OFFSET و COUNT(*) مقادیر آخرین ردیف صفحه در نشانگر ذخیره می‌شود و صفحه بعد با شرط
+    «بعد از این مقادیر» خوانده می‌شود. بدنه پاسخ همچنان لیست است و لینک صفحه بعد در هدر Link می‌آید.
+
+    صفحه‌بندی پیش‌فرض نیست و فقط view هایی که ``pagination_class`` را روی آن گذاشته‌اند صفحه‌بندی می‌شوند؛
+    هر view می‌تواند با ``page_size`` و ``max_page_size`` اندازه صفحه خودش را تعیین کند.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    default_ordering = ('pk',)
+    invalid_cursor_message = 'نشانگر صفحه نامعتبر است.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request, view)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+
+        # مقادیر ستون‌های ترتیب همراه هر ردیف خوانده می‌شوند تا ساخت نشانگر صفحه بعد کوئری جدا نخواهد.
+        queryset = queryset.annotate(**{
+            self._cursor_alias(index): F(field.lstrip('-')) for index, field in enumerate(self.ordering)
+        }).order_by(*[self._order_expression(field) for field in self.ordering])
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request, view=None):
+        max_page_size = getattr(view, 'max_page_size', self.max_page_size)
+        page_size = getattr(view, 'page_size', self.page_size)
+
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+
+        if requested <= 0:
+            return page_size
+        return min(requested, max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+
+        ordering = tuple(ordering or self.default_ordering)
+        if not {'pk', '-pk', 'id', '-id'} & set(ordering):
+            ordering += ('pk',)
+        return ordering
+
+    def get_paginated_response(self, data):
+        headers = {}
+        next_link = self.get_next_link()
+        if next_link:
+            headers['Link'] = f'<{next_link}>; rel="next"'
+        return Response(data, headers=headers)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        last = self.page[-1]
+        aliases = [self._cursor_alias(index) for index in range(len(self.ordering))]
+        # صفحه‌های ساخته‌شده از ``.values()`` به جای نمونه مدل دیکشنری دارند.
+        values = [last[alias] if isinstance(last, dict) else getattr(last, alias) for alias in aliases]
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(values)
+        )
+
+    def encode_cursor(self, values):
+        payload = json.dumps({'o': self.ordering, 'v': list(values)}, default=_json_default)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            if tuple(payload['o']) != self.ordering:
+                raise ValueError
+            return [
+                None if value is None else self._resolve_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, payload['v'], strict=True)
+            ]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _resolve_field(self, path):
+        model = self.model
+        field = None
+        for name in path.split(LOOKUP_SEP):
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            if field.is_relation and field.related_model:
+                model = field.related_model
+        return field
+
+    @staticmethod
+    def _cursor_alias(index):
+        return f'_keyset_{index}'
+
+    @staticmethod
+    def _order_expression(field):
+        if field.startswith('-'):
+            return F(field[1:]).desc(nulls_last=True)
+        return F(field).asc(nulls_first=True)
+
+    def _after(self, position):
+        # (a, b, pk) > (va, vb, vpk) به صورت: a > va یا (a = va و b > vb) یا ...
+        conditions = []
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            beyond = self._beyond(name, field.startswith('-'), value)
+            if beyond is not None:
+                conditions.append(equal & beyond)
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+
+        if not conditions:
+            return Q(pk__in=[])
+
+        condition = conditions[0]
+        for other in conditions[1:]:
+            condition |= other
+        return condition
+
+    @staticmethod
+    def _beyond(name, descending, value):
+        # مقادیر NULL در ترتیب صعودی اول و در ترتیب نزولی آخر قرار می‌گیرند.
+        if descending:
+            if value is None:
+                return None
+            return Q(**{f'{name}__lt': value}) | Q(**{f'{name}__isnull': True})
+
+        if value is None:
+            return Q(**{f'{name}__isnull': False})
+        return Q(**{f'{name}__gt': value})
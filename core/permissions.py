@@ -1,17 +1,19 @@
 # permissions.py
 from rest_framework import permissions
 
+from .principal import get_principal
+
 
 class IsAdminOrInstituteSelf(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
-        user = request.user
+        principal = get_principal(request)
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             return True
 
-        if hasattr(user, 'institute'):
-            return obj.id == user.institute.id
+        if principal.is_institute:
+            return obj.id == principal.institute_id
 
         return False
 
@@ -19,16 +21,16 @@ class IsAdminOrInstituteSelf(permissions.BasePermission):
 class IsAdminOrTeacherSelf(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
-        user = request.user
+        principal = get_principal(request)
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             return True
 
-        if hasattr(user, 'teacher'):
-            return obj.id == user.teacher.id
+        if principal.is_teacher:
+            return obj.id == principal.teacher_id
 
-        if hasattr(user, 'institute'):
-            return obj.institute.id == user.institute.id
+        if principal.is_institute:
+            return obj.institute_id == principal.institute_id
 
         return False
 
@@ -36,15 +38,15 @@ class IsAdminOrTeacherSelf(permissions.BasePermission):
 class IsAdminOrStudentOrInstituteSelf(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
-        user = request.user
+        principal = get_principal(request)
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             return True
 
-        if hasattr(user, 'student'):
-            return obj.id == user.student.id
+        if principal.is_student:
+            return obj.id == principal.student_id
 
-        if hasattr(user, 'institute'):
-            return obj.institute.id == user.institute.id
+        if principal.is_institute:
+            return obj.institute_id == principal.institute_id
 
         return False
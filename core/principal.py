@@ -0,0 +1,91 @@
+from collections import namedtuple
+
+ADMIN = 'admin'
+INSTITUTE = 'institute'
+TEACHER = 'teacher'
+STUDENT = 'student'
+
+PROFILE_RELATIONS = (INSTITUTE, TEACHER, STUDENT)
+
+
+class Principal(namedtuple(
+    'Principal', ['user_id', 'role', 'is_admin', 'is_superuser', 'student_id', 'teacher_id', 'institute_id']
+)):
+    """
+    نقش کاربر جاری و شناسه‌های پروفایل او که یک بار برای هر درخواست محاسبه می‌شود.
+    ``institute_id`` برای حساب موسسه شناسه خود موسسه و برای استاد و دانش‌آموز موسسه‌ای است که به آن تعلق دارند.
+    ``is_admin`` بر اساس ``user_type`` و ``is_superuser`` همان فیلد کاربر است.
+    """
+    __slots__ = ()
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def is_institute(self):
+        return self.role == INSTITUTE
+
+    @property
+    def is_teacher(self):
+        return self.role == TEACHER
+
+    @property
+    def is_student(self):
+        return self.role == STUDENT
+
+
+ANONYMOUS = Principal(None, None, False, False, None, None, None)
+
+
+def _profiles_loaded(user):
+    meta = type(user)._meta
+    return all(meta.get_field(name).is_cached(user) for name in PROFILE_RELATIONS)
+
+
+def _profile_ids(user):
+    if _profiles_loaded(user):
+        institute = getattr(user, INSTITUTE, None)
+        teacher = getattr(user, TEACHER, None)
+        student = getattr(user, STUDENT, None)
+        return (
+            institute and institute.id,
+            teacher and teacher.id, teacher and teacher.institute_id,
+            student and student.id, student and student.institute_id,
+        )
+
+    return type(user)._base_manager.filter(pk=user.pk).values_list(
+        'institute__id', 'teacher__id', 'teacher__institute_id', 'student__id', 'student__institute_id'
+    ).first() or (None,) * 5
+
+
+def resolve_principal(user):
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS
+
+    institute_id, teacher_id, teacher_institute_id, student_id, student_institute_id = _profile_ids(user)
+    is_admin = user.user_type == ADMIN
+
+    if institute_id is not None:
+        role = INSTITUTE
+    elif teacher_id is not None:
+        role, institute_id = TEACHER, teacher_institute_id
+    elif student_id is not None:
+        role, institute_id = STUDENT, student_institute_id
+    else:
+        role = ADMIN if is_admin else None
+
+    return Principal(user.pk, role, is_admin, user.is_superuser, student_id, teacher_id, institute_id)
+
+
+def get_principal(request):
+    """
+    Principal درخواست را برمی‌گرداند و آن را روی درخواست نگه می‌دارد تا فقط یک بار محاسبه شود.
+    اگر پروفایل‌ها همراه کاربر بارگذاری نشده باشند، حداکثر یک کوئری زده می‌شود.
+    """
+    user = request.user
+    principal = getattr(request, '_principal', None)
+    if principal is None or principal.user_id != getattr(user, 'pk', None):
+        principal = resolve_principal(user)
+        request._principal = principal
+    return principal
@@ -0,0 +1,27 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    رندرر JSON مبتنی بر orjson با همان خروجی فشرده JSONRenderer.
+    انواعی که orjson نمی‌شناسد (Decimal، رشته‌های lazy و ...) به انکودر DRF سپرده می‌شوند و
+    اگر orjson نصب نباشد همان JSONRenderer استفاده می‌شود.
+    """
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=JSONEncoder().default, option=options)
@@ -6,6 +6,83 @@ from django.contrib.auth import authenticate
 from .models import CustomUser
 
 
+def parse_field_paths(value):
+    """
+    مقدار پارامترهایی مثل ``user.account,question`` را به درخت ``{'user': {'account': {}}, 'question': {}}`` تبدیل می‌کند.
+    """
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class DynamicFieldsMixin:
+    """
+    خروجی سریالایزر را با پارامترهای ``?fields=`` و ``?expand=`` کنترل می‌کند.
+    روابطی که در ``Meta.expandable_fields`` آمده‌اند به طور پیش‌فرض فقط شناسه را برمی‌گردانند و فقط با درخواست
+    (مثلا ``expand=user.account``) به صورت تو در تو سریالایز می‌شوند. ``fields=id,score,user.account`` فقط
+    فیلدهای خواسته‌شده را برمی‌گرداند؛ فیلدهای فقط‌نوشتنی همیشه باقی می‌مانند.
+    سریالایزرهای تو در تو مقادیر را از سریالایزر والد می‌گیرند، نه از درخواست.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def __init__(self, *args, **kwargs):
+        self._requested_fields = kwargs.pop('fields', None)
+        self._requested_expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self.get_field_options()
+
+        for name, serializer_class in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand and name in fields:
+                options = {'read_only': True}
+                if issubclass(serializer_class, DynamicFieldsMixin):
+                    options.update(fields=(requested or {}).get(name) or None, expand=expand[name])
+                fields[name] = serializer_class(**options)
+
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested or field.write_only}
+        return fields
+
+    @classmethod
+    def related_paths(cls, expand, prefix=''):
+        """
+        مسیرهای select_related لازم برای سریالایز بدون کوئری اضافه: روابط ثابت ``Meta.select_related``
+        به همراه روابط expand شده و نیازهای سریالایزرهای تو در توی آن‌ها.
+        """
+        paths = [prefix + name for name in getattr(cls.Meta, 'select_related', ())]
+        for name, serializer_class in getattr(cls.Meta, 'expandable_fields', {}).items():
+            if name not in expand:
+                continue
+            paths.append(prefix + name)
+            if issubclass(serializer_class, DynamicFieldsMixin):
+                paths += serializer_class.related_paths(expand[name], f'{prefix}{name}__')
+        return paths
+
+    def get_field_options(self):
+        if self._requested_fields is not None or self._requested_expand is not None:
+            return self._requested_fields, self._requested_expand or {}
+
+        parent = getattr(self, 'parent', None)
+        if isinstance(parent, serializers.ListSerializer):
+            parent = getattr(parent, 'parent', None)
+        request = self.context.get('request') if parent is None else None
+        if request is None:
+            return None, {}
+
+        params = getattr(request, 'query_params', request.GET)
+        fields = params.get(self.fields_query_param)
+        return (
+            parse_field_paths(fields) if fields else None,
+            parse_field_paths(params.get(self.expand_query_param, '')),
+        )
+
+
 class CustomUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.CustomUser
@@ -125,11 +202,12 @@ class InstituteSignUpSerializer(serializers.ModelSerializer):
         return institute_account
 
 
-class InstituteSerializer(serializers.ModelSerializer):
-    account = CustomUserSerializer(read_only=True)
+class InstituteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    account = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.Institute
+        expandable_fields = {'account': CustomUserSerializer}
         fields = (
             'id',
             'account',
@@ -189,12 +267,13 @@ class TeacherSignUpSerializer(serializers.ModelSerializer):
         return teacher_account
 
 
-class TeacherSerializer(serializers.ModelSerializer):
-    account = CustomUserSerializer(read_only=True)
-    institute = InstituteSerializer(read_only=True)
+class TeacherSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    account = serializers.PrimaryKeyRelatedField(read_only=True)
+    institute = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.Teacher
+        expandable_fields = {'account': CustomUserSerializer, 'institute': InstituteSerializer}
         fields = (
             'id',
             'account',
@@ -206,15 +285,17 @@ class TeacherSerializer(serializers.ModelSerializer):
         )
 
 
-class StudentSerializer(serializers.ModelSerializer):
-    account = CustomUserSerializer(read_only=True)
-    institute = InstituteSerializer(read_only=True)
+class StudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    account = serializers.PrimaryKeyRelatedField(read_only=True)
+    institute = serializers.PrimaryKeyRelatedField(read_only=True)
 
     major = serializers.StringRelatedField(read_only=True)
     major_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = models.Student
+        expandable_fields = {'account': CustomUserSerializer, 'institute': InstituteSerializer}
+        select_related = ('major',)
         fields = (
             'id',
             'account',
@@ -282,6 +363,16 @@ class StudentSignUpSerializer(serializers.ModelSerializer):
         return student_account
 
 
+class StudentImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+
+    def validate(self, attrs):
+        attrs['output'] = attrs['file'].name.rsplit('.', 1)[-1].lower()
+        if attrs['output'] not in ('csv', 'xlsx'):
+            raise serializers.ValidationError({'file': "فقط فایل‌های CSV و XLSX پذیرفته می‌شوند."})
+        return attrs
+
+
 class CustomLoginSerializer(LoginSerializer):
     username = serializers.CharField()
     password = serializers.CharField(style={'input_type': 'password'}, trim_whitespace=False)
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_token
+from .models import CustomUser, Institute, Student, Teacher
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # نقش یا فعال بودن کاربر ممکن است تغییر کرده باشد؛ ثبت زمان ورود چیزی را عوض نمی‌کند.
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    forget_user_tokens(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Institute)
+@receiver([post_save, post_delete], sender=Teacher)
+@receiver([post_save, post_delete], sender=Student)
+def profile_changed(sender, instance, **kwargs):
+    # نقش و شناسه‌های Principal از پروفایل خوانده می‌شوند؛ ساخت، تغییر یا حذف آن Principal کش‌شده را کهنه می‌کند.
+    forget_user_tokens(instance.account_id)
+
+
+def forget_user_tokens(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        forget_token(key)
@@ -1,3 +1,265 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.db import connection
+from django.test import override_settings
+from django.urls import get_resolver
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from exam import exports
+from exam.models import Major
+from . import benchmarks
+from . import imports
+from .authentication import CachedTokenAuthentication
+from .models import CustomUser, Institute, Student, Teacher
+from .renderers import ORJSONRenderer
+from .principal import ANONYMOUS, INSTITUTE, STUDENT, TEACHER, resolve_principal
+
+
+class KeysetPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.major = Major.objects.create(name='major')
+        account = CustomUser.objects.create_user(username='institute', password='pass', user_type='institute')
+        cls.institute = Institute.objects.create(account=account, name='institute', registration_code='1',
+                                                 address='-', phone='1')
+        names = ['b', None, 'a', 'c', 'a', None, 'd']
+        created_at = timezone.now()
+        for i, name in enumerate(names):
+            account = CustomUser.objects.create_user(username=f'student{i}', password='pass', first_name=name,
+                                                     user_type='student')
+            student = Student.objects.create(account=account, institute=cls.institute, national_code=str(i),
+                                             phone_number='1', major=cls.major)
+            # چند دانش‌آموز با زمان عضویت یکسان تا ترتیب فقط با کلید اصلی یکتا شود.
+            Student.objects.filter(pk=student.pk).update(created_at=created_at - timedelta(microseconds=i // 2))
+
+    def collect(self, url):
+        self.client.force_authenticate(self.institute.account)
+        rows, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            rows += response.data
+            pages += 1
+            url = response.headers.get('Link', '').partition('<')[2].partition('>')[0]
+        return rows, pages
+
+    def test_pages_cover_every_row_once_with_default_ordering(self):
+        rows, pages = self.collect('/api/core/students/?page_size=2')
+
+        expected = list(Student.objects.order_by('-created_at', 'pk').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in rows], expected)
+        self.assertEqual(pages, 4)
+
+    def test_pages_follow_related_ordering_with_nulls(self):
+        for ordering in ('account__first_name', '-account__first_name'):
+            rows, _ = self.collect(f'/api/core/students/?page_size=3&ordering={ordering}&expand=account')
+            self.assertEqual(len(rows), 7)
+            self.assertEqual(len({row['id'] for row in rows}), 7)
+
+            names = [row['account']['first_name'] for row in rows]
+            non_null = [name for name in names if name is not None]
+            self.assertEqual(non_null, sorted(non_null, reverse=ordering.startswith('-')))
+
+    def test_no_count_query(self):
+        self.client.force_authenticate(self.institute.account)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/core/students/?page_size=2')
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.client.force_authenticate(self.institute.account)
+        response = self.client.get('/api/core/students/?cursor=broken')
+        self.assertEqual(response.status_code, 404)
+
+    def test_other_lists_are_not_paginated(self):
+        for i in range(3):
+            account = CustomUser.objects.create_user(username=f'teacher{i}', password='pass', user_type='teacher')
+            Teacher.objects.create(account=account, institute=self.institute, national_code=f't{i}',
+                                   phone_number='1', expertise='-')
+
+        self.client.force_authenticate(self.institute.account)
+        response = self.client.get('/api/core/teachers/?page_size=1')
+        self.assertEqual(len(response.data), 3)
+        self.assertNotIn('Link', response)
+
+
+class PrincipalTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        major = Major.objects.create(name='major')
+        account = CustomUser.objects.create_user(username='institute', password='pass', user_type='institute')
+        cls.institute = Institute.objects.create(account=account, name='institute', registration_code='1',
+                                                 address='-', phone='1')
+        account = CustomUser.objects.create_user(username='teacher', password='pass', user_type='teacher')
+        cls.teacher = Teacher.objects.create(account=account, institute=cls.institute, national_code='1',
+                                             phone_number='1', expertise='-')
+        account = CustomUser.objects.create_user(username='student', password='pass', user_type='student')
+        cls.student = Student.objects.create(account=account, institute=cls.institute, national_code='2',
+                                             phone_number='1', major=major)
+
+    def test_roles_are_resolved_from_profiles(self):
+        principal = resolve_principal(CustomUser.objects.get(pk=self.institute.account_id))
+        self.assertEqual((principal.role, principal.institute_id), (INSTITUTE, self.institute.id))
+
+        principal = resolve_principal(CustomUser.objects.get(pk=self.teacher.account_id))
+        self.assertEqual((principal.role, principal.teacher_id, principal.institute_id),
+                         (TEACHER, self.teacher.id, self.institute.id))
+
+        principal = resolve_principal(CustomUser.objects.get(pk=self.student.account_id))
+        self.assertEqual((principal.role, principal.student_id, principal.institute_id),
+                         (STUDENT, self.student.id, self.institute.id))
+
+    def test_unloaded_profiles_are_resolved_in_one_query(self):
+        user = CustomUser.objects.get(pk=self.teacher.account_id)
+        with self.assertNumQueries(1):
+            resolve_principal(user)
+
+        user = CustomUser.objects.select_related('institute', 'teacher', 'student').get(pk=self.teacher.account_id)
+        with self.assertNumQueries(0):
+            resolve_principal(user)
+
+    def test_anonymous_user_has_no_role(self):
+        self.assertEqual(resolve_principal(None), ANONYMOUS)
+        self.assertFalse(ANONYMOUS.is_authenticated)
+
+    def test_profile_changes_drop_cached_principal(self):
+        authentication = CachedTokenAuthentication()
+        token = Token.objects.create(user=self.teacher.account)
+        authentication.authenticate_credentials(token.key)
+
+        other = Institute.objects.create(account=CustomUser.objects.create_user(username='other', password='pass'),
+                                         name='other', registration_code='2', address='-', phone='1')
+        self.teacher.institute = other
+        self.teacher.save()
+        _user, principal = authentication.authenticate_credentials(token.key)
+        self.assertEqual(principal.institute_id, other.id)
+
+        token = Token.objects.create(user=self.student.account)
+        authentication.authenticate_credentials(token.key)
+        self.student.delete()
+        _user, principal = authentication.authenticate_credentials(token.key)
+        self.assertIsNone(principal.student_id)
+
+    def test_token_request_resolves_role_without_extra_queries(self):
+        token = Token.objects.create(user=self.teacher.account)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/core/students/?page_size=1')
+        self.assertEqual(response.status_code, 200)
+
+        # پروفایل‌ها همراه توکن خوانده می‌شوند و هیچ کوئری جداگانه‌ای برای نقش کاربر زده نمی‌شود.
+        self.assertIn('core_teacher', queries[0]['sql'])
+        self.assertFalse([q for q in queries[1:] if '"account_id" =' in q['sql']])
+
+
+class ApiBenchmarkTests(APITestCase):
+
+    def test_every_route_is_benchmarked(self):
+        covered = {benchmarks.URL_PREFIXES[app] + route for app, route, *_ in benchmarks.ENDPOINTS}
+        for app, prefix in benchmarks.URL_PREFIXES.items():
+            for pattern in get_resolver(f'{app}.urls').url_patterns:
+                self.assertIn(prefix + str(pattern.pattern), covered)
+
+    def test_budgets_hold_and_queries_do_not_grow_with_rows(self):
+        report = benchmarks.run_benchmark(scales=(1, 2))
+
+        self.assertFalse(report['violations'], "\n".join(report['violations']))
+        expected = set()
+        for app, route, method, *_ in benchmarks.ENDPOINTS:
+            expected.add(benchmarks.endpoint_key(app, route, method))
+            if method == 'get' and route in benchmarks.EXPANSIONS:
+                expected.add(benchmarks.endpoint_key(app, route, method) + f'?expand={benchmarks.EXPANSIONS[route]}')
+        self.assertEqual({result['endpoint'] for result in report['results']}, expected)
+
+
+class RenderingTests(APITestCase):
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {'name': 'آزمون', 'score': Decimal('2.50'), 'label': gettext_lazy('required'), 'rows': [1, None, True]}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class StudentImportTests(APITestCase):
+    HEADER = 'username,password,first_name,national_code,phone_number,major_id,gender\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.major = Major.objects.create(name='major')
+        account = CustomUser.objects.create_user(username='import-institute', password='pass', user_type='institute')
+        cls.institute = Institute.objects.create(account=account, name='i', registration_code='i', address='-',
+                                                 phone='1')
+
+    def csv_rows(self, lines):
+        return imports.read_rows(io.BytesIO((self.HEADER + ''.join(lines)).encode()), 'csv')
+
+    def test_upload_creates_students_and_reports_bad_rows(self):
+        CustomUser.objects.create_user(username='taken', password='pass', user_type='student')
+        upload = io.BytesIO((self.HEADER + (
+            f'ali,secret,Ali,1000000001,1,{self.major.id},male\n'
+            f'taken,secret,,1000000002,1,{self.major.id},\n'
+            f'sara,secret,,1000000001,1,{self.major.id},unknown\n'
+            f'reza,secret,,1000000003,1,999999,\n'
+        )).encode())
+        upload.name = 'students.csv'
+        self.client.force_authenticate(self.institute.account)
+
+        with override_settings(ACCOUNT_IMPORT_WORKERS=1):
+            response = self.client.post(f'/api/core/institutes/{self.institute.id}/students/import/',
+                                        {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 3))
+        self.assertEqual(
+            [(error['row'], sorted(error['errors'])) for error in response.data['errors']],
+            [(3, ['username']), (4, ['gender']), (5, ['major_id'])],
+        )
+        student = Student.objects.select_related('account').get(national_code='1000000001')
+        self.assertEqual((student.institute_id, student.account.first_name), (self.institute.id, 'Ali'))
+        self.assertTrue(student.account.check_password('secret'))
+
+    def test_duplicates_inside_the_file_are_rejected(self):
+        report = imports.import_students(self.institute, self.csv_rows([
+            f'a,p,,2000000001,1,{self.major.id},\n',
+            f'a,p,,2000000002,1,{self.major.id},\n',
+            f'b,p,,2000000001,1,{self.major.id},\n',
+        ]), chunk_size=2, workers=1)
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([sorted(error['errors']) for error in report['errors']], [['username'], ['national_code']])
+
+    def test_query_count_grows_with_chunks_not_rows(self):
+        def run(prefix, count):
+            rows = self.csv_rows(f'{prefix}{i},p,,{prefix[0]}{i:09d},1,{self.major.id},\n' for i in range(count))
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(imports.import_students(self.institute, rows, workers=1)['created'], count)
+            return len(queries)
+
+        self.assertEqual(run('few', 2), run('many', 40))
+
+    def test_xlsx_rows_are_streamed(self):
+        rows = [['username', 'password', 'national_code', 'phone_number', 'major_id'],
+                ['xlsx-user', 'secret', '3000000001', 98912, self.major.id]]
+        upload = io.BytesIO(b''.join(exports.stream_xlsx(rows)))
+
+        report = imports.import_students(self.institute, imports.read_rows(upload, 'xlsx'), workers=1)
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(Student.objects.get(account__username='xlsx-user').phone_number, '98912')
+
+    def test_passwords_are_hashed_in_worker_processes(self):
+        with imports.PasswordHasher(workers=2) as hasher:
+            hashes = hasher.hash(['first', 'second', 'third'])
+        self.assertTrue(all(check_password(password, hashed)
+                            for password, hashed in zip(['first', 'second', 'third'], hashes)))
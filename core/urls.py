@@ -13,6 +13,7 @@ urlpatterns = [
 
     path('institutes/', views.InstituteListAPIView.as_view(), name='institute'),
     path('institutes/<int:pk>/', views.InstituteRetrieveUpdateDeleteAPIView.as_view(), name='institute-detail'),
+    path('institutes/<int:pk>/students/import/', views.StudentImportAPIView.as_view(), name='student-import'),
 
     path('teachers/', views.TeacherListAPIView.as_view(), name='teacher'),
     path('teachers/<int:pk>/', views.TeacherRetrieveUpdateDeleteAPIView.as_view(), name='teacher-detail'),
@@ -0,0 +1,25 @@
+import time
+
+from django.core.cache import cache
+
+
+def _initial_version():
+    # اگر شمارنده از کش حذف شده باشد، مقدار جدید باید از همه نسخه‌های قبلی بزرگ‌تر باشد.
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
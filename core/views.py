@@ -6,7 +6,11 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .permissions import IsAdminOrInstituteSelf, IsAdminOrTeacherSelf, IsAdminOrStudentOrInstituteSelf
+from .principal import get_principal
+from .mixins import SelectRelatedMixin
+from .pagination import KeysetPagination
 from core import serializers, filters
+from . import imports
 from . import models
 from .serializers import CustomLoginSerializer
 from django_filters.rest_framework import DjangoFilterBackend
@@ -23,7 +27,7 @@ class InstituteSignUpAPIView(generics.CreateAPIView):
     serializer_class = serializers.InstituteSignUpSerializer
 
 
-class InstituteListAPIView(generics.ListAPIView):
+class InstituteListAPIView(SelectRelatedMixin, generics.ListAPIView):
     serializer_class = serializers.InstituteSerializer
     queryset = models.Institute.objects.all()
     permission_classes = [permissions.IsAdminUser]
@@ -35,18 +39,18 @@ class InstituteListAPIView(generics.ListAPIView):
     ordering = ['-created_at']
 
 
-class InstituteRetrieveUpdateDeleteAPIView(generics.RetrieveUpdateDestroyAPIView):
+class InstituteRetrieveUpdateDeleteAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Institute.objects.all()
     serializer_class = serializers.InstituteSerializer
 
     def get_object(self):
         obj = get_object_or_404(self.get_queryset(), pk=self.kwargs["pk"])
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if getattr(user, "user_type", None) == "admin":
+        if principal.is_admin:
             return obj
 
-        if hasattr(user, "institute") and user.institute.id == obj.id:
+        if principal.is_institute and principal.institute_id == obj.id:
             return obj
 
         raise PermissionDenied("شما مجاز به مشاهده یا ویرایش این موسسه نیستید.")
@@ -72,7 +76,7 @@ class TeacherSignUpAPIView(generics.CreateAPIView):
     serializer_class = serializers.TeacherSignUpSerializer
 
 
-class TeacherListAPIView(generics.ListAPIView):
+class TeacherListAPIView(SelectRelatedMixin, generics.ListAPIView):
     serializer_class = serializers.TeacherSerializer
     queryset = models.Teacher.objects.all()
     permission_classes = [permissions.IsAuthenticated]
@@ -84,18 +88,18 @@ class TeacherListAPIView(generics.ListAPIView):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             return models.Teacher.objects.all()
 
-        if hasattr(user, 'institute'):
-            return models.Teacher.objects.filter(institute=user.institute)
+        if principal.is_institute:
+            return models.Teacher.objects.filter(institute_id=principal.institute_id)
 
         raise PermissionDenied("شما مجاز به مشاهده لیست استادها نیستید.")
 
 
-class TeacherRetrieveUpdateDeleteAPIView(generics.RetrieveUpdateDestroyAPIView):
+class TeacherRetrieveUpdateDeleteAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Teacher.objects.all()
     serializer_class = serializers.TeacherSerializer
 
@@ -106,15 +110,15 @@ class TeacherRetrieveUpdateDeleteAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_object(self):
         obj = get_object_or_404(self.get_queryset(), pk=self.kwargs["pk"])
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if getattr(user, "user_type", None) == "admin":
+        if principal.is_admin:
             return obj
 
-        if hasattr(user, "teacher") and user.teacher.id == obj.id:
+        if principal.is_teacher and principal.teacher_id == obj.id:
             return obj
 
-        if hasattr(user, "institute") and obj.institute.id == user.institute.id:
+        if principal.is_institute and obj.institute_id == principal.institute_id:
             return obj
 
         raise PermissionDenied("شما مجاز به مشاهده یا ویرایش این اطلاعات نیستید.")
@@ -135,10 +139,11 @@ class StudentSignUpAPIView(generics.CreateAPIView):
     serializer_class = serializers.StudentSignUpSerializer
 
 
-class StudentListAPIView(generics.ListAPIView):
+class StudentListAPIView(SelectRelatedMixin, generics.ListAPIView):
     serializer_class = serializers.StudentSerializer
     queryset = models.Student.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = filters.StudentFilter
 
@@ -147,21 +152,18 @@ class StudentListAPIView(generics.ListAPIView):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             return models.Student.objects.all()
 
-        if hasattr(user, 'institute'):
-            return models.Student.objects.filter(institute=user.institute)
-
-        if hasattr(user, 'teacher'):
-            return models.Student.objects.filter(institute=user.teacher.institute)
+        if principal.is_institute or principal.is_teacher:
+            return models.Student.objects.filter(institute_id=principal.institute_id)
 
         raise PermissionDenied("شما مجاز به مشاهده لیست دانشجویان نیستید.")
 
 
-class StudentRetrieveUpdateDeleteAPIView(generics.RetrieveUpdateDestroyAPIView):
+class StudentRetrieveUpdateDeleteAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Student.objects.all()
     serializer_class = serializers.StudentSerializer
 
@@ -172,15 +174,15 @@ class StudentRetrieveUpdateDeleteAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_object(self):
         obj = get_object_or_404(self.get_queryset(), pk=self.kwargs["pk"])
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if getattr(user, "user_type", None) == "admin":
+        if principal.is_admin:
             return obj
 
-        if hasattr(user, "student") and user.student.id == obj.id:
+        if principal.is_student and principal.student_id == obj.id:
             return obj
 
-        if hasattr(user, "institute") and obj.institute.id == user.institute.id:
+        if principal.is_institute and obj.institute_id == principal.institute_id:
             return obj
 
         raise PermissionDenied("شما مجاز به مشاهده یا ویرایش این اطلاعات نیستید.")
@@ -203,6 +205,27 @@ class UserRetrieveAPIView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
 
+class StudentImportAPIView(generics.GenericAPIView):
+    """
+    ورود گروهی دانش‌آموزان یک موسسه از فایل CSV یا XLSX توسط مدیر یا خود موسسه. برای فایل‌های بزرگ دستور
+    ``python manage.py import_students`` مناسب‌تر است.
+    """
+    serializer_class = serializers.StudentImportSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        principal = get_principal(request)
+        if not (principal.is_admin or (principal.is_institute and principal.institute_id == pk)):
+            raise PermissionDenied("شما اجازه ورود دانش‌آموز به این موسسه را ندارید.")
+        institute = get_object_or_404(models.Institute, pk=pk)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rows = imports.read_rows(serializer.validated_data['file'], serializer.validated_data['output'])
+        report = imports.import_students(institute, rows)
+        return Response(report, status=status.HTTP_200_OK)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class CustomLoginView(LoginView):
     serializer_class = CustomLoginSerializer
@@ -0,0 +1,140 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db.models import Count, F, FilteredRelation, Q, Sum
+
+from . import cache
+from . import models
+
+ITEM_ANALYSIS_KEY = 'exam:{exam_id}:item-analysis:{paper_version}:{results_version}'
+
+
+def correlation(n, sx, sxx, sy, syy, sxy):
+    """
+    ضریب همبستگی پیرسون از روی مجموع‌ها. اگر یکی از دو متغیر ثابت باشد ``None`` برمی‌گردد.
+    """
+    covariance = n * sxy - sx * sy
+    variance = (n * sxx - sx * sx) * (n * syy - sy * sy)
+    if n < 2 or variance <= 1e-12:
+        return None
+    return covariance / math.sqrt(variance)
+
+
+def _with_result(queryset, exam_id):
+    # نمره کل هر پاسخ‌دهنده با یک JOIN به نتیجه همان آزمون کنار پاسخ او قرار می‌گیرد.
+    return queryset.filter(question__exam_id=exam_id).annotate(
+        result=FilteredRelation('user__userexamresult', condition=Q(user__userexamresult__exam_id=exam_id)),
+    ).filter(result__id__isnull=False)
+
+
+def _round(value, digits=4):
+    return None if value is None else round(value, digits)
+
+
+def item_analysis(exam_id):
+    """
+    تحلیل سوالات آزمون: ضریب دشواری (میانگین نسبت نمره گرفته‌شده به نمره سوال)، ضریب تمیز (همبستگی
+    نمره سوال با نمره بقیه آزمون) و تحلیل گزینه‌ها برای سوالات تستی.
+
+    ماتریس پاسخ‌ها هیچ‌وقت به پایتون منتقل نمی‌شود: مجموع‌های لازم برای همبستگی با چند کوئری گروهی
+    (تعداد آن به تعداد پاسخ‌دهنده‌ها و سوالات بستگی ندارد) در خود پایگاه داده محاسبه می‌شوند.
+    دانش‌آموزی که به سوالی پاسخ نداده برای آن سوال نمره صفر دارد.
+    """
+    totals = models.UserExamResult.objects.filter(exam_id=exam_id).aggregate(
+        n=Count('id'), sy=Sum('score'), syy=Sum(F('score') * F('score')),
+    )
+    n, sy, syy = totals['n'], totals['sy'] or 0, totals['syy'] or 0
+
+    questions = list(
+        models.Question.objects.filter(exam_id=exam_id).order_by('pk').values('id', 'text', 'question_type', 'score')
+    )
+    options = {}
+    for option in models.Option.objects.filter(question__exam_id=exam_id).order_by('pk').values(
+            'id', 'question_id', 'text', 'is_correct'):
+        options.setdefault(option['question_id'], []).append(option)
+
+    chosen = {
+        row['answer_option_id']: row
+        for row in _with_result(models.UserOptions.objects, exam_id).order_by().values('answer_option_id').annotate(
+            count=Count('id'), total=Sum('result__score'),
+        )
+    }
+    answered = {
+        row['question_id']: row
+        for row in _with_result(models.UserAnswer.objects, exam_id).order_by().values('question_id').annotate(
+            count=Count('id'), sx=Sum('score'), sxx=Sum(F('score') * F('score')),
+            sxy=Sum(F('score') * F('result__score')),
+        )
+    }
+
+    items = []
+    for question in questions:
+        score = question['score']
+        question_options = options.get(question['id'], [])
+        if question['question_type'] == 'Descriptive':
+            row = answered.get(question['id'], {})
+            responses = row.get('count', 0)
+            sx, sxx, sxy = row.get('sx') or 0, row.get('sxx') or 0, row.get('sxy') or 0
+        else:
+            rows = [chosen.get(option['id'], {}) for option in question_options]
+            correct = [row for row, option in zip(rows, question_options) if option['is_correct']]
+            responses = sum(row.get('count', 0) for row in rows)
+            right = sum(row.get('count', 0) for row in correct)
+            sx, sxx = score * right, score * score * right
+            sxy = score * sum(row.get('total') or 0 for row in correct)
+
+        # نمره بقیه آزمون (نمره کل منهای نمره همین سوال) تا سوال با خودش همبسته نشود.
+        rest_sum, rest_squares = sy - sx, syy - 2 * sxy + sxx
+        item = {
+            'id': question['id'],
+            'text': question['text'],
+            'question_type': question['question_type'],
+            'score': score,
+            'responses': responses,
+            'omitted': n - responses,
+            'difficulty': _round(sx / (n * score)) if n and score else None,
+            'discrimination': _round(correlation(n, sx, sxx, rest_sum, rest_squares, sxy - sxx)),
+        }
+
+        if question['question_type'] != 'Descriptive':
+            item['options'] = []
+            for option in question_options:
+                row = chosen.get(option['id'], {})
+                count, total = row.get('count', 0), row.get('total') or 0
+                rest_total = total - score * count if option['is_correct'] else total
+                item['options'].append({
+                    'id': option['id'],
+                    'text': option['text'],
+                    'is_correct': option['is_correct'],
+                    'count': count,
+                    'proportion': _round(count / n) if n else None,
+                    'mean_score': _round(total / count) if count else None,
+                    'discrimination': _round(correlation(n, count, count, rest_sum, rest_squares, rest_total)),
+                })
+        items.append(item)
+
+    mean = sy / n if n else None
+    return {
+        'exam': exam_id,
+        'participants': n,
+        'mean_score': _round(mean),
+        'std_score': _round(math.sqrt(max(syy / n - mean * mean, 0))) if n else None,
+        'questions': items,
+    }
+
+
+def get_item_analysis(exam_id):
+    """
+    تحلیل سوالات را از کش برمی‌گرداند. کلید کش شامل نسخه برگه آزمون و نسخه نتایج آن است، پس هر تغییر در
+    سوالات، گزینه‌ها یا نمره‌ها نسخه جدیدی می‌سازد.
+    """
+    key = ITEM_ANALYSIS_KEY.format(
+        exam_id=exam_id, paper_version=cache.get_paper_version(exam_id),
+        results_version=cache.get_results_version(exam_id),
+    )
+    analysis = django_cache.get(key)
+    if analysis is None:
+        analysis = item_analysis(exam_id)
+        django_cache.set(key, analysis, timeout=settings.EXAM_ITEM_ANALYSIS_CACHE_TIMEOUT)
+    return analysis
@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models import Prefetch
+
+from . import cache
+from . import leaderboard
+from . import models
+
+FILE_FORMAT = 'online-exam'
+FILE_VERSION = 1
+
+
+def ordered_options():
+    return Prefetch('options', queryset=models.Option.objects.order_by('pk'))
+
+
+def create_questions(exam, questions):
+    """
+    سوالات ``questions`` (دیکشنری‌هایی با ``options``) را با یک ``bulk_create`` برای سوالات و یکی برای گزینه‌ها
+    به آزمون اضافه می‌کند و سوالات ساخته‌شده را به همراه گزینه‌ها برمی‌گرداند.
+    """
+    with transaction.atomic():
+        created = models.Question.objects.bulk_create([
+            models.Question(exam=exam, text=question['text'], question_type=question['question_type'],
+                            score=question['score'])
+            for question in questions
+        ])
+        if created and created[0].pk is None:
+            # MySQL کلید ردیف‌های bulk_create را برنمی‌گرداند؛ ردیف‌های یک INSERT کلیدهای صعودی و پشت سر هم دارند.
+            ids = models.Question.objects.filter(exam=exam).order_by('-pk').values_list('pk', flat=True)
+            for question, pk in zip(created, reversed(ids[:len(created)])):
+                question.pk = pk
+
+        models.Option.objects.bulk_create([
+            models.Option(question_id=question.pk, text=option['text'], is_correct=option.get('is_correct', False))
+            for question, data in zip(created, questions)
+            for option in data.get('options', [])
+        ], batch_size=1000)
+
+        # bulk_create سیگنال post_save نمی‌فرستد.
+        cache.bump_paper_version(exam.pk)
+        leaderboard.rescale(exam.pk)
+    return list(
+        models.Question.objects.filter(pk__in=[question.pk for question in created]).order_by('pk')
+        .prefetch_related(ordered_options())
+    )
+
+
+def export_exam(exam):
+    """
+    آزمون را به قالب فایل قابل انتقال (بدون شناسه‌ها، زمان‌ها و کلاس) تبدیل می‌کند.
+    """
+    questions = exam.questions.order_by('pk').prefetch_related(ordered_options())
+    return {
+        'format': FILE_FORMAT,
+        'version': FILE_VERSION,
+        'exam': {
+            'title': exam.title,
+            'description': exam.description,
+            'duration_minutes': exam.duration_minutes,
+            'category': exam.category.name if exam.category_id else None,
+        },
+        'questions': [
+            {
+                'text': question.text,
+                'question_type': question.question_type,
+                'score': question.score,
+                'options': [
+                    {'text': option.text, 'is_correct': option.is_correct}
+                    for option in question.options.all()
+                ],
+            }
+            for question in questions
+        ],
+    }
+
+
+def import_exam(classroom, creator, data, schedule):
+    """
+    آزمون فایل ``data`` (خروجی ``export_exam`` پس از اعتبارسنجی) را با زمان‌بندی ``schedule`` در کلاس می‌سازد.
+    تعداد کوئری‌ها به تعداد سوالات بستگی ندارد.
+    """
+    details = data['exam']
+    with transaction.atomic():
+        category = None
+        if details.get('category'):
+            category = models.ExamCategory.objects.filter(name=details['category']).order_by('pk').first()
+        exam = models.Exam.objects.create(
+            title=details['title'], description=details['description'],
+            duration_minutes=details['duration_minutes'], category=category, classroom=classroom, creator=creator,
+            **schedule,
+        )
+        create_questions(exam, data['questions'])
+    return exam
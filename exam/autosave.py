@@ -0,0 +1,259 @@
+import json
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+from functools import lru_cache, reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import consts
+from . import models
+from .bulk import bulk_upsert
+
+
+class LocalBuffer:
+    """
+    بافر پیش‌نویس‌ها در یک فایل SQLite محلی (``EXAM_AUTOSAVE_PATH``) جدا از پایگاه داده اصلی. پیش‌نویس‌ها با
+    راه‌اندازی دوباره پروسه‌ها از بین نمی‌روند و همه پروسه‌های یک سرور از یک فایل استفاده می‌کنند.
+    """
+    schema = (
+        'CREATE TABLE IF NOT EXISTS drafts ('
+        'exam_id INTEGER NOT NULL, student_id INTEGER NOT NULL, question_id INTEGER NOT NULL, '
+        'option_id INTEGER, answer_text TEXT, revision TEXT NOT NULL, '
+        'PRIMARY KEY (exam_id, student_id, question_id))'
+    )
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.EXAM_AUTOSAVE_PATH)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(self.schema)
+            self._local.connection = connection
+        return connection
+
+    def put(self, exam_id, student_id, drafts):
+        with self._connection() as connection:
+            connection.executemany(
+                'INSERT INTO drafts VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (exam_id, student_id, question_id) '
+                'DO UPDATE SET option_id = excluded.option_id, answer_text = excluded.answer_text, '
+                'revision = excluded.revision',
+                [(exam_id, student_id, question_id, draft['option'], draft['text'], draft['revision'])
+                 for question_id, draft in drafts.items()],
+            )
+
+    def get(self, exam_id, student_id):
+        rows = self._connection().execute(
+            'SELECT question_id, option_id, answer_text, revision FROM drafts WHERE exam_id = ? AND student_id = ?',
+            (exam_id, student_id),
+        )
+        return {
+            question_id: {'option': option_id, 'text': answer_text, 'revision': revision}
+            for question_id, option_id, answer_text, revision in rows
+        }
+
+    def remove(self, exam_id, student_id, drafts):
+        with self._connection() as connection:
+            connection.executemany(
+                'DELETE FROM drafts WHERE exam_id = ? AND student_id = ? AND question_id = ? AND revision = ?',
+                [(exam_id, student_id, question_id, draft['revision']) for question_id, draft in drafts.items()],
+            )
+
+    def discard(self, exam_id, student_id, question_ids):
+        with self._connection() as connection:
+            connection.executemany(
+                'DELETE FROM drafts WHERE exam_id = ? AND student_id = ? AND question_id = ?',
+                [(exam_id, student_id, question_id) for question_id in question_ids],
+            )
+
+    def pending(self, limit):
+        return self._connection().execute(
+            'SELECT DISTINCT exam_id, student_id FROM drafts LIMIT ?', (limit,),
+        ).fetchall()
+
+
+class RedisBuffer:
+    """
+    بافر پیش‌نویس‌ها در ردیس (``EXAM_AUTOSAVE_BUFFER_URL``) برای چند سرور: یک hash برای پیش‌نویس‌های هر
+    دانش‌آموز در هر آزمون و یک set از hash های در انتظار نوشتن. به بسته ``redis`` نیاز دارد.
+    """
+    key = 'exam-autosave:{exam_id}:{student_id}'
+    pending_key = 'exam-autosave:pending'
+    remove_script = """
+        local removed = 0
+        for i = 2, #ARGV, 2 do
+            local value = redis.call('HGET', KEYS[1], ARGV[i])
+            if value and cjson.decode(value)['revision'] == ARGV[i + 1] then
+                removed = removed + redis.call('HDEL', KEYS[1], ARGV[i])
+            end
+        end
+        if redis.call('HLEN', KEYS[1]) == 0 then
+            redis.call('SREM', KEYS[2], ARGV[1])
+        end
+        return removed
+    """
+
+    def __init__(self, url=None):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBuffer به بسته redis نیاز دارد.")
+        self._client = redis.Redis.from_url(url or settings.EXAM_AUTOSAVE_BUFFER_URL)
+        self._remove = self._client.register_script(self.remove_script)
+
+    def _key(self, exam_id, student_id):
+        return self.key.format(exam_id=exam_id, student_id=student_id)
+
+    def put(self, exam_id, student_id, drafts):
+        pipeline = self._client.pipeline()
+        pipeline.hset(self._key(exam_id, student_id), mapping={
+            question_id: json.dumps(draft) for question_id, draft in drafts.items()
+        })
+        pipeline.sadd(self.pending_key, f'{exam_id}:{student_id}')
+        pipeline.execute()
+
+    def get(self, exam_id, student_id):
+        return {
+            int(question_id): json.loads(draft)
+            for question_id, draft in self._client.hgetall(self._key(exam_id, student_id)).items()
+        }
+
+    def remove(self, exam_id, student_id, drafts):
+        # hash خالی (حتی بدون پیش‌نویس قابل حذف) از فهرست انتظار هم خارج می‌شود.
+        args = [f'{exam_id}:{student_id}']
+        for question_id, draft in drafts.items():
+            args += [question_id, draft['revision']]
+        self._remove(keys=[self._key(exam_id, student_id), self.pending_key], args=args)
+
+    def discard(self, exam_id, student_id, question_ids):
+        if question_ids:
+            self._client.hdel(self._key(exam_id, student_id), *question_ids)
+
+    def pending(self, limit):
+        return [
+            tuple(int(part) for part in member.split(b':'))
+            for member in self._client.srandmember(self.pending_key, limit)
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_buffer():
+    return import_string(settings.EXAM_AUTOSAVE_BUFFER_BACKEND)()
+
+
+@receiver(setting_changed)
+def _reset_buffer(setting, **kwargs):
+    if setting.startswith('EXAM_AUTOSAVE_'):
+        get_buffer.cache_clear()
+
+
+def save(exam_id, student_id, drafts):
+    """
+    پیش‌نویس‌های اعتبارسنجی‌شده (``{question_id: {'option': ..., 'text': ...}}``) را فقط در بافر می‌نویسد.
+    هر پیش‌نویس شناسه نسخه تازه‌ای می‌گیرد تا flush پیش‌نویسی را که در این فاصله تغییر کرده حذف نکند.
+    """
+    get_buffer().put(exam_id, student_id, {
+        question_id: {**draft, 'revision': uuid.uuid4().hex} for question_id, draft in drafts.items()
+    })
+
+
+def get_drafts(exam_id, student_id):
+    return get_buffer().get(exam_id, student_id)
+
+
+def discard(exam_id, student_id, question_ids):
+    """
+    پیش‌نویس سوالاتی را که پاسخشان مستقیما ثبت یا حذف شده کنار می‌گذارد تا flush بعدی آن را بازنویسی نکند.
+    """
+    get_buffer().discard(exam_id, student_id, list(question_ids))
+
+
+def _write(exam_id, drafts):
+    if not drafts:
+        return
+    question_ids = {question_id for student_drafts in drafts.values() for question_id in student_drafts}
+    questions = set(models.Question.objects.filter(exam_id=exam_id, pk__in=question_ids).values_list('pk', flat=True))
+    option_ids = {
+        draft['option'] for student_drafts in drafts.values() for draft in student_drafts.values() if draft['option']
+    }
+    options = dict(models.Option.objects.filter(pk__in=option_ids).values_list('pk', 'question_id'))
+
+    chosen, texts, cleared = [], [], []
+    for student_id, student_drafts in drafts.items():
+        for question_id, draft in student_drafts.items():
+            # پیش‌نویس سوال یا گزینه‌ای که پس از ذخیره حذف شده مانند ثبت مستقیم آن پذیرفته نمی‌شود.
+            if question_id not in questions:
+                continue
+            if draft['option'] is not None:
+                if options.get(draft['option']) == question_id:
+                    chosen.append(models.UserOptions(
+                        user_id=student_id, question_id=question_id, answer_option_id=draft['option'],
+                    ))
+            elif draft['text'] is not None:
+                texts.append(models.UserAnswer(user_id=student_id, question_id=question_id, answer_text=draft['text']))
+            else:
+                cleared.append(Q(user_id=student_id, question_id=question_id))
+
+    bulk_upsert(models.UserOptions, chosen, ['question', 'user'], ['answer_option'], batch_size=1000)
+    bulk_upsert(models.UserAnswer, texts, ['question', 'user'], ['answer_text'], batch_size=1000)
+    if cleared:
+        models.UserOptions.objects.filter(reduce(or_, cleared)).delete()
+        models.UserAnswer.objects.filter(reduce(or_, cleared)).delete()
+
+
+def flush(exam_id, student_ids, close=None):
+    """
+    پیش‌نویس‌های دانش‌آموزان ``student_ids`` را با یک upsert گروهی برای هر جدول پاسخ می‌نویسد و پس از ثبت
+    تراکنش از بافر حذف می‌کند. ``close`` (در صورت وجود) در همان تراکنش و با همان قفل ردیف‌های جلسه پس از نوشتن
+    پیش‌نویس‌ها فراخوانی می‌شود تا جلسه را ببندد. شناسه دانش‌آموزانی که پیش‌نویسشان نوشته شد برگردانده می‌شود.
+    """
+    buffer = get_buffer()
+    with transaction.atomic():
+        # قفل ردیف جلسه باعث می‌شود flush هم‌زمان دیگری بافر را فقط پس از این تراکنش بخواند و پیش‌نویس
+        # قدیمی‌تری را روی پاسخ جدیدتر ننویسد.
+        statuses = dict(
+            models.UserExamTime.objects.select_for_update().filter(exam_id=exam_id, user_id__in=student_ids)
+            .values_list('user_id', 'status')
+        )
+        drafts = {student_id: buffer.get(exam_id, student_id) for student_id in student_ids}
+        drafts = {student_id: student_drafts for student_id, student_drafts in drafts.items() if student_drafts}
+        # پیش‌نویسی که با وضعیت کش‌شده قدیمی پس از بسته شدن جلسه ذخیره شده مانند ثبت مستقیم پذیرفته نمی‌شود.
+        written = {
+            student_id: student_drafts for student_id, student_drafts in drafts.items()
+            if statuses.get(student_id) not in consts.SESSION_CLOSED
+        }
+        _write(exam_id, written)
+        if close is not None:
+            close()
+
+    for student_id in student_ids:
+        buffer.remove(exam_id, student_id, drafts.get(student_id, {}))
+    return list(written)
+
+
+def flush_pending(batch_size=500):
+    """
+    یک دسته از پیش‌نویس‌های در انتظار را برای هر آزمون یکجا در جداول پاسخ می‌نویسد. فقط پیش‌نویس جلسه‌های باز
+    نوشته می‌شود و نمره آن‌ها با ثبت نهایی یا پایان زمان جلسه محاسبه می‌شود. تعداد (آزمون، دانش‌آموز) های
+    پردازش‌شده برگردانده می‌شود.
+    """
+    pending = get_buffer().pending(batch_size)
+    students_by_exam = defaultdict(list)
+    for exam_id, student_id in pending:
+        students_by_exam[exam_id].append(student_id)
+
+    for exam_id, student_ids in students_by_exam.items():
+        flush(exam_id, student_ids)
+    return len(pending)
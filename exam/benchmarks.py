@@ -0,0 +1,343 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import models as core_models
+from core.benchmarks import URL_PREFIXES, create_account
+from core.mixins import values_plan, values_rows
+from core.renderers import ORJSONRenderer
+from . import consts
+from . import exports
+from . import models
+
+
+def seed_exam(prefix, **fields):
+    """
+    یک موسسه، استاد، کلاس، رشته و آزمون با نام‌های ``prefix`` می‌سازد و آزمون و رشته را برمی‌گرداند.
+    """
+    now = timezone.now()
+    institute = core_models.Institute.objects.create(
+        account=create_account(f'{prefix}-institute', 'institute'), name=f'{prefix}-institute',
+        registration_code=f'{prefix}-institute', address='-', phone='1',
+    )
+    teacher = core_models.Teacher.objects.create(
+        account=create_account(f'{prefix}-teacher', 'teacher'), institute=institute, national_code='0000000001',
+        phone_number='1', expertise='-',
+    )
+    classroom = models.Classroom.objects.create(name=f'{prefix}-class', teacher=teacher, grade='bachelor')
+    major = models.Major.objects.create(name=f'{prefix}-major')
+    exam = models.Exam.objects.create(**{
+        'title': f'{prefix}-exam', 'description': '-', 'start_time': now, 'end_time': now + timedelta(hours=1),
+        'duration_minutes': 60, 'classroom': classroom, 'creator': teacher.account, **fields,
+    })
+    return exam, major
+
+
+def seed_students(exam, major, prefix, count):
+    """
+    ``count`` دانش‌آموز در موسسه آزمون با ``bulk_create`` می‌سازد و شناسه حساب‌ها و دانش‌آموزان را به یک ترتیب
+    برمی‌گرداند.
+    """
+    password = make_password(None)
+    core_models.CustomUser.objects.bulk_create(
+        [core_models.CustomUser(username=f'{prefix}-student-{i}', user_type='student', password=password)
+         for i in range(count)],
+        batch_size=1000,
+    )
+    # همه پایگاه‌های داده (از جمله MySQL) کلید ردیف‌های bulk_create را برنمی‌گردانند.
+    account_ids = list(
+        core_models.CustomUser.objects.filter(username__startswith=f'{prefix}-student-').order_by('pk')
+        .values_list('id', flat=True)
+    )
+    core_models.Student.objects.bulk_create(
+        [core_models.Student(account_id=account_id, institute_id=exam.classroom.teacher.institute_id,
+                             national_code=f'{i:010d}', phone_number='1', major=major)
+         for i, account_id in enumerate(account_ids)],
+        batch_size=1000,
+    )
+    student_ids = list(
+        core_models.Student.objects.filter(account_id__in=account_ids).order_by('account_id')
+        .values_list('id', flat=True)
+    )
+    return account_ids, student_ids
+
+
+def seed_results(rows, students=100):
+    """
+    ``rows`` ردیف نتیجه آزمون برای مقایسه سرعت سریالایز لیست‌ها می‌سازد.
+    """
+    exam, major = seed_exam('rendering')
+    _, student_ids = seed_students(exam, major, 'rendering', min(students, rows))
+    exams = [exam] + [
+        models.Exam.objects.create(
+            title=f'rendering-exam-{e}', description='-', start_time=exam.start_time, end_time=exam.end_time,
+            duration_minutes=60, classroom=exam.classroom, creator=exam.creator,
+        )
+        for e in range(1, -(-rows // len(student_ids)))
+    ]
+    results = [models.UserExamResult(user_id=student_id, exam=exam) for exam in exams for student_id in student_ids]
+    for i, result in enumerate(results):
+        result.score = i % 20
+    models.UserExamResult.objects.bulk_create(results[:rows], batch_size=1000)
+
+
+def compare_list_rendering(rows=10000, repeat=3):
+    """
+    زمان ساخت پاسخ لیست نتایج آزمون (خواندن از پایگاه داده، سریالایز و رندر) را برای سریالایزر با
+    JSONRenderer فعلی، سریالایزر با ORJSONRenderer و مسیر سریع ``.values()`` مقایسه می‌کند.
+    از هر روش بهترین زمان بین ``repeat`` اجرا گزارش می‌شود.
+    """
+    from .serializers import UserExamResultSerializer
+
+    with transaction.atomic():
+        seed_results(rows)
+        queryset = models.UserExamResult.objects.order_by('pk')
+        plan = values_plan(UserExamResultSerializer())
+        columns = {source for _, source, _ in plan}
+
+        paths = {
+            'serializer+json': lambda: JSONRenderer().render(UserExamResultSerializer(queryset.all(), many=True).data),
+            'serializer+orjson': lambda: ORJSONRenderer().render(
+                UserExamResultSerializer(queryset.all(), many=True).data
+            ),
+            'values+orjson': lambda: ORJSONRenderer().render(values_rows(plan, queryset.values(*columns))),
+        }
+
+        results, outputs = {}, {}
+        for name, render in paths.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                outputs[name] = render()
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            results[name] = {'ms': round(best * 1000, 3), 'rows_per_second': round(rows / best)}
+        transaction.set_rollback(True)
+
+    baseline = results['serializer+json']['ms']
+    for result in results.values():
+        result['speedup'] = round(baseline / max(result['ms'], 1e-6), 2)
+    return {
+        'rows': rows,
+        'database': connection.vendor,
+        'results': results,
+        'identical': len({output for output in outputs.values()}) == 1,
+    }
+
+
+def measure_export_memory(rows, output='csv', chunk_size=None):
+    """
+    خروجی نتایج ``rows`` ردیف را به طور کامل مصرف می‌کند و بیشترین حافظه تخصیص‌یافته در حین ساخت آن را
+    (با tracemalloc) گزارش می‌کند. حافظه نباید با تعداد ردیف‌ها رشد کند.
+    """
+    writer, _ = exports.WRITERS[output]
+    with transaction.atomic():
+        seed_results(rows)
+        exams = list(models.Exam.objects.order_by('pk').only('id', 'title'))
+
+        size = 0
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            for data in writer(exports.result_rows(exams, chunk_size)):
+                size += len(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        elapsed = time.perf_counter() - start
+        transaction.set_rollback(True)
+
+    return {
+        'rows': rows,
+        'output': output,
+        'bytes': size,
+        'peak_memory_kb': round(peak / 1024, 1),
+        'ms': round(elapsed * 1000, 3),
+    }
+
+
+def seed_questions(exam, questions, options=4):
+    """
+    ``questions`` سوال تستی با ``options`` گزینه (گزینه اول صحیح) می‌سازد و شناسه گزینه‌های هر سوال را برمی‌گرداند.
+    """
+    question_options = []
+    for q in range(questions):
+        question = models.Question.objects.create(exam=exam, text=f'q{q}', question_type='MultipleChoice', score=1)
+        question_options.append((question.id, [
+            option.id for option in models.Option.objects.bulk_create(
+                models.Option(question=question, text=f'o{o}', is_correct=(o == 0)) for o in range(options)
+            )
+        ]))
+    return question_options
+
+
+def seed_responses(responders, questions, options=4):
+    """
+    یک آزمون با ``questions`` سوال تستی و پاسخ همه ``responders`` دانش‌آموز به همه سوالات می‌سازد.
+    احتمال پاسخ صحیح با شماره دانش‌آموز بالا می‌رود تا سوالات ضریب تمیز معنی‌دار داشته باشند.
+    """
+    from . import scoring
+
+    exam, major = seed_exam('analysis')
+    _, students = seed_students(exam, major, 'analysis', responders)
+    question_options = seed_questions(exam, questions, options)
+
+    answers = []
+    for s, student_id in enumerate(students):
+        for q, (question_id, option_ids) in enumerate(question_options):
+            correct = (s * 7 + q * 13) % responders < s
+            option_id = option_ids[0] if correct else option_ids[1 + (s + q) % (options - 1)]
+            answers.append(models.UserOptions(user_id=student_id, question_id=question_id, answer_option_id=option_id))
+        if len(answers) >= 10000:
+            models.UserOptions.objects.bulk_create(answers)
+            answers = []
+    models.UserOptions.objects.bulk_create(answers)
+    scoring.recompute_results(exam.id)
+    return exam
+
+
+def measure_item_analysis(responders, questions, repeat=3):
+    """
+    زمان محاسبه تحلیل سوالات (بدون کش) و تعداد کوئری آن را برای ``responders`` پاسخ‌دهنده و
+    ``questions`` سوال گزارش می‌کند.
+    """
+    from . import analytics
+
+    with transaction.atomic():
+        exam = seed_responses(responders, questions)
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                analytics.item_analysis(exam.id)
+                timings.append(time.perf_counter() - start)
+        transaction.set_rollback(True)
+
+    return {
+        'responders': responders,
+        'questions': questions,
+        'database': connection.vendor,
+        'queries': len(queries),
+        'ms': round(min(timings) * 1000, 3),
+    }
+
+
+def _percentile(timings, fraction):
+    ordered = sorted(timings)
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 3)
+
+
+def seed_exam_takers(clients):
+    """
+    یک آزمون در حال برگزاری با ``clients`` دانش‌آموز که جلسه آزمونشان شروع شده و هر کدام یک توکن دارند می‌سازد.
+    """
+    now = timezone.now()
+    exam, major = seed_exam(
+        'heartbeat', start_time=now - timedelta(minutes=10), end_time=now + timedelta(hours=2), duration_minutes=90,
+    )
+    account_ids, student_ids = seed_students(exam, major, 'heartbeat', clients)
+    models.UserExamTime.objects.bulk_create(
+        [models.UserExamTime(user_id=student_id, exam=exam, status=consts.SESSION_IN_PROGRESS,
+                             started_at=now, finish_time=now + timedelta(minutes=exam.duration_minutes))
+         for student_id in student_ids],
+        batch_size=1000,
+    )
+    tokens = [Token(key=Token.generate_key(), user_id=account_id) for account_id in account_ids]
+    Token.objects.bulk_create(tokens, batch_size=1000)
+    return exam, [token.key for token in tokens]
+
+
+def measure_heartbeat(clients=5000, rounds=3):
+    """
+    ``clients`` دانش‌آموز را شبیه‌سازی می‌کند که در هر دور یک بار زمان‌سنج آزمون را می‌خوانند (مانند درخواست هر
+    ۱۰ ثانیه) و برای هر دور صدک‌های زمان پاسخ و تعداد کوئری را گزارش می‌کند. دور اول کش را پر می‌کند و
+    دورهای بعدی نباید هیچ کوئری‌ای بزنند یا کندتر شوند.
+    """
+    cache_settings = None
+    if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        # کش locmem به طور پیش‌فرض فقط ۳۰۰ کلید نگه می‌دارد؛ ظرفیت آن مانند یک کش مشترک بالا برده می‌شود.
+        cache_settings = {'default': {
+            'BACKEND': settings.CACHES['default']['BACKEND'], 'LOCATION': 'heartbeat-benchmark',
+            'OPTIONS': {'MAX_ENTRIES': clients * 4 + 1000},
+        }}
+
+    with transaction.atomic(), override_settings(**({'CACHES': cache_settings} if cache_settings else {})):
+        cache.clear()
+        exam, keys = seed_exam_takers(clients)
+        path = f"{URL_PREFIXES['exam']}exams/{exam.id}/heartbeat/"
+        client = APIClient()
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        results = []
+        for number in range(1, rounds + 1):
+            # CaptureQueriesContext بیش از ۹۰۰۰ کوئری را نگه نمی‌دارد.
+            timings, statuses, queries = [], set(), []
+            with connection.execute_wrapper(count_query):
+                for key in keys:
+                    start = time.perf_counter()
+                    response = client.get(path, HTTP_AUTHORIZATION=f'Token {key}')
+                    timings.append(time.perf_counter() - start)
+                    statuses.add(response.status_code)
+            results.append({
+                'round': number,
+                'statuses': sorted(statuses),
+                'queries': len(queries),
+                'p50_ms': _percentile(timings, 0.5),
+                'p95_ms': _percentile(timings, 0.95),
+                'p99_ms': _percentile(timings, 0.99),
+                'max_ms': round(max(timings) * 1000, 3),
+            })
+        transaction.set_rollback(True)
+
+    return {
+        'clients': clients,
+        'database': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'],
+        'rounds': results,
+    }
+
+
+def measure_exam_paper(questions=50, repeat=200):
+    """
+    زمان CPU ساخت برگه آزمونی با ``questions`` سوال با سریالایزر را با خواندن همان برگه از کش مقایسه می‌کند.
+    """
+    from . import cache as exam_cache
+    from .views import ExamPaperAPIView
+
+    with transaction.atomic():
+        exam, _ = seed_exam('paper')
+        seed_questions(exam, questions)
+        queryset = ExamPaperAPIView().get_queryset()
+
+        start = time.process_time()
+        for _ in range(repeat):
+            exam_cache.build_paper(queryset.get(pk=exam.id))
+        uncached = time.process_time() - start
+
+        loader = lambda: queryset.get(pk=exam.id)  # noqa: E731
+        exam_cache.get_paper(exam.id, loader)
+        start = time.process_time()
+        for _ in range(repeat):
+            exam_cache.get_paper(exam.id, loader)
+        cached = time.process_time() - start
+        transaction.set_rollback(True)
+
+    return {
+        'questions': questions,
+        'uncached_ms': round(uncached / repeat * 1000, 3),
+        'cached_ms': round(cached / repeat * 1000, 3),
+        'speedup': round(uncached / max(cached, 1e-9), 1),
+    }
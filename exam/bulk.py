@@ -0,0 +1,30 @@
+from django.db import connections, router
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """
+    درج گروهی با به‌روزرسانی در صورت تکراری بودن کلید یکتا (INSERT ... ON CONFLICT / ON DUPLICATE KEY).
+    MySQL ستون‌های کلید یکتا را نمی‌پذیرد و خودش از همه کلیدهای یکتای جدول استفاده می‌کند.
+    """
+    features = connections[router.db_for_write(model)].features
+    return model.objects.bulk_create(
+        objs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=unique_fields if features.supports_update_conflicts_with_target else None,
+        update_fields=update_fields,
+    )
+
+
+def upsert(instance, unique_fields, update_fields):
+    """
+    ذخیره یک ردیف با یک دستور upsert. چون همه پایگاه‌های داده کلید ردیف موجود را برنمی‌گردانند،
+    ردیف ذخیره‌شده برای پاسخ دوباره خوانده می‌شود.
+    """
+    model = type(instance)
+    bulk_upsert(model, [instance], unique_fields, update_fields)
+    saved = model.objects.get(**{field: getattr(instance, field) for field in unique_fields})
+    instance.pk = saved.pk
+    for field in model._meta.concrete_fields:
+        setattr(instance, field.attname, getattr(saved, field.attname))
+    return instance
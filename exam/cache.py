@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from django.db.models import F, Prefetch
+
+from core.renderers import ORJSONRenderer
+from core.versions import bump_version, get_version
+from . import models
+
+PAPER_VERSION_KEY = 'exam:{exam_id}:paper-version'
+PAPER_KEY = 'exam:{exam_id}:paper:{version}'
+RESULTS_VERSION_KEY = 'exam:{exam_id}:results-version'
+TIMING_KEY = 'exam:{exam_id}:timing:{version}'
+
+# شمارنده‌های نسخه برای ETag لیست‌ها: مجموعه کلاس‌ها، آزمون‌های هر کلاس و روابطی که با ?expand= نمایش داده می‌شوند.
+# سوالات هر آزمون همان نسخه برگه آزمون را استفاده می‌کنند.
+CLASSROOMS_VERSION_KEY = 'classrooms:version'
+CLASSROOM_EXAMS_VERSION_KEY = 'classroom:{classroom_id}:exams-version'
+CLASSROOM_STUDENTS_KEY = 'classroom:{classroom_id}:students:{version}'
+QUESTION_OPTIONS_VERSION_KEY = 'question:{question_id}:options-version'
+RELATED_VERSION_KEY = 'related:version'
+
+
+def get_paper_version(exam_id):
+    return get_version(PAPER_VERSION_KEY.format(exam_id=exam_id))
+
+
+def bump_paper_version(exam_id):
+    return bump_version(PAPER_VERSION_KEY.format(exam_id=exam_id))
+
+
+def get_results_version(exam_id):
+    return get_version(RESULTS_VERSION_KEY.format(exam_id=exam_id))
+
+
+def bump_results_version(exam_id):
+    return bump_version(RESULTS_VERSION_KEY.format(exam_id=exam_id))
+
+
+def get_classroom_exams_version(classroom_id):
+    return get_version(CLASSROOM_EXAMS_VERSION_KEY.format(classroom_id=classroom_id))
+
+
+def bump_classroom_exams_version(classroom_id):
+    return bump_version(CLASSROOM_EXAMS_VERSION_KEY.format(classroom_id=classroom_id))
+
+
+def get_question_options_version(question_id):
+    return get_version(QUESTION_OPTIONS_VERSION_KEY.format(question_id=question_id))
+
+
+def bump_question_options_version(question_id):
+    return bump_version(QUESTION_OPTIONS_VERSION_KEY.format(question_id=question_id))
+
+
+def paper_queryset():
+    return models.Exam.objects.select_related('classroom__teacher').prefetch_related(
+        Prefetch(
+            'questions',
+            queryset=models.Question.objects.order_by('id').prefetch_related(
+                Prefetch('options', queryset=models.Option.objects.order_by('id'))
+            )
+        )
+    )
+
+
+def build_paper(exam):
+    """
+    برگه آزمون را یک بار سریالایز کرده و دو نسخه JSON از پیش کدشده می‌سازد:
+    نسخه کامل (همراه با گزینه صحیح) و نسخه دانش‌آموز (بدون گزینه صحیح).
+    ``choices`` گزینه‌های هر سوال (برای سوال تشریحی ``None``) را برای اعتبارسنجی پاسخ بدون کوئری نگه می‌دارد.
+    """
+    from .serializers import ExamPaperSerializer
+
+    data = ExamPaperSerializer(exam, context={'hide_answers': False}).data
+    renderer = ORJSONRenderer()
+    full = renderer.render(data)
+
+    for question in data['questions']:
+        for option in question['options']:
+            option.pop('is_correct', None)
+
+    return {
+        'classroom_id': exam.classroom_id,
+        'teacher_id': exam.classroom.teacher_id,
+        'institute_id': exam.classroom.teacher.institute_id if exam.classroom.teacher_id else None,
+        'end_time': exam.end_time,
+        'choices': {
+            question['id']: (
+                None if question['question_type'] == 'Descriptive'
+                else frozenset(option['id'] for option in question['options'])
+            )
+            for question in data['questions']
+        },
+        'full': full,
+        'public': renderer.render(data),
+    }
+
+
+def get_paper(exam_id, loader):
+    """
+    برگه آزمون را از کش برمی‌گرداند؛ در صورت نبود، با ``loader`` آزمون را بارگذاری و برگه را می‌سازد.
+    ``loader`` باید آزمون را برگرداند یا در صورت نبود آن ``None`` برگرداند.
+    """
+    key = PAPER_KEY.format(exam_id=exam_id, version=get_paper_version(exam_id))
+    paper = cache.get(key)
+    if paper is None:
+        exam = loader()
+        if exam is None:
+            return None
+        paper = build_paper(exam)
+        cache.set(key, paper, timeout=settings.EXAM_PAPER_CACHE_TIMEOUT)
+    return paper
+
+
+def get_exam_timing(exam_id):
+    """
+    زمان شروع، پایان و نمایش نتایج، مدت و موسسه آزمون را از کش برمی‌گرداند؛ کلید کش مانند برگه آزمون به نسخه برگه
+    وابسته است. اگر آزمون وجود نداشته باشد ``None`` برمی‌گردد.
+    """
+    key = TIMING_KEY.format(exam_id=exam_id, version=get_paper_version(exam_id))
+    timing = cache.get(key)
+    if timing is None:
+        timing = models.Exam.objects.filter(pk=exam_id).values(
+            'start_time', 'end_time', 'duration_minutes', 'result_show_time',
+            institute_id=F('classroom__teacher__institute_id'),
+        ).first()
+        if timing is None:
+            return None
+        cache.set(key, timing, timeout=settings.EXAM_PAPER_CACHE_TIMEOUT)
+    return timing
+
+
+def get_classroom_students(classroom_id):
+    """
+    شناسه دانش‌آموزان ثبت‌نام‌شده در کلاس را از کش برمی‌گرداند؛ کلید کش به نسخه مجموعه کلاس‌ها (که با هر
+    ثبت‌نام افزایش می‌یابد) وابسته است.
+    """
+    key = CLASSROOM_STUDENTS_KEY.format(classroom_id=classroom_id, version=get_version(CLASSROOMS_VERSION_KEY))
+    students = cache.get(key)
+    if students is None:
+        students = frozenset(
+            models.StudentClassroom.objects.filter(classroom_id=classroom_id).values_list('student_id', flat=True)
+        )
+        cache.set(key, students, timeout=settings.EXAM_PAPER_CACHE_TIMEOUT)
+    return students
@@ -24,3 +24,21 @@ QUESTION_TYPES = (
     ('Descriptive', 'تشریحی'),
     ('TrueFalse', 'درست/نادرست')
 )
+
+SESSION_NOT_STARTED = 'not_started'
+SESSION_IN_PROGRESS = 'in_progress'
+SESSION_SUBMITTED = 'submitted'
+SESSION_EXPIRED = 'expired'
+
+SESSION_STATUSES = (
+    (SESSION_NOT_STARTED, 'شروع نشده'),
+    (SESSION_IN_PROGRESS, 'در حال انجام'),
+    (SESSION_SUBMITTED, 'ثبت نهایی شده'),
+    (SESSION_EXPIRED, 'پایان زمان'),
+)
+
+SESSION_CLOSED = (SESSION_SUBMITTED, SESSION_EXPIRED)
+
+EXAM_UPCOMING = 'upcoming'
+EXAM_RUNNING = 'running'
+EXAM_ENDED = 'ended'
@@ -0,0 +1,95 @@
+import csv
+import io
+
+from core.models import Student
+from . import cache
+from . import models
+
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+DUPLICATE = 'duplicate'
+NOT_FOUND = 'not_found'
+OTHER_INSTITUTE = 'other_institute'
+
+MESSAGES = {
+    ENROLLED: 'به کلاس اضافه شد.',
+    ALREADY_ENROLLED: 'قبلا در این کلاس ثبت‌نام شده است.',
+    DUPLICATE: 'در همین درخواست تکرار شده است.',
+    NOT_FOUND: 'دانش‌آموز یافت نشد.',
+    OTHER_INSTITUTE: 'دانش‌آموز متعلق به موسسه این کلاس نیست.',
+}
+
+# ستون‌هایی که در سطر اول فایل CSV پذیرفته می‌شوند.
+CSV_COLUMNS = ('student_id', 'national_code')
+
+
+def read_csv(upload):
+    """
+    فایل CSV با سطر عنوان ``student_id`` یا ``national_code`` را می‌خواند و شناسه‌ها و کدهای ملی را برمی‌گرداند.
+    """
+    text = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    if not set(CSV_COLUMNS) & set(reader.fieldnames or []):
+        raise ValueError(f"سطر اول فایل باید شامل یکی از ستون‌های {', '.join(CSV_COLUMNS)} باشد.")
+
+    student_ids, national_codes = [], []
+    for row in reader:
+        student_id = (row.get('student_id') or '').strip()
+        national_code = (row.get('national_code') or '').strip()
+        if student_id:
+            if not student_id.isdigit():
+                raise ValueError(f"شناسه دانش‌آموز «{student_id}» معتبر نیست.")
+            student_ids.append(int(student_id))
+        elif national_code:
+            national_codes.append(national_code)
+    return student_ids, national_codes
+
+
+def enroll(classroom, student_ids=(), national_codes=()):
+    """
+    دانش‌آموزان را با چند کوئری مجموعه‌ای به کلاس اضافه می‌کند و برای هر ورودی (به ترتیب ارسال) یک ردیف گزارش
+    برمی‌گرداند. ورودی‌ها با شناسه یا کد ملی دانش‌آموز مشخص می‌شوند و دانش‌آموز باید عضو موسسه کلاس باشد.
+    """
+    by_id = dict(Student.objects.filter(id__in=set(student_ids)).values_list('id', 'institute_id'))
+    by_code = {
+        code: (student_id, institute_id)
+        for student_id, code, institute_id in Student.objects.filter(
+            national_code__in=set(national_codes)
+        ).values_list('id', 'national_code', 'institute_id')
+    }
+    found = set(by_id) | {student_id for student_id, _ in by_code.values()}
+    enrolled = set(
+        models.StudentClassroom.objects.filter(classroom=classroom, student_id__in=found).values_list(
+            'student_id', flat=True
+        )
+    )
+    institute_id = classroom.teacher.institute_id if classroom.teacher_id else None
+
+    entries = [
+        ('student_id', value, value if value in by_id else None, by_id.get(value)) for value in student_ids
+    ]
+    entries += [('national_code', code, *by_code.get(code, (None, None))) for code in national_codes]
+
+    rows, seen, created = [], set(), []
+    for kind, value, student_id, student_institute_id in entries:
+        if student_id is None:
+            status = NOT_FOUND
+        elif student_id in seen:
+            status = DUPLICATE
+        elif student_institute_id != institute_id:
+            status = OTHER_INSTITUTE
+        elif student_id in enrolled:
+            status = ALREADY_ENROLLED
+        else:
+            status = ENROLLED
+            created.append(models.StudentClassroom(classroom=classroom, student_id=student_id))
+        if student_id is not None:
+            seen.add(student_id)
+        rows.append({kind: value, 'student_id': student_id, 'status': status, 'detail': MESSAGES[status]})
+
+    # ثبت‌نام هم‌زمان همان دانش‌آموز با کلید یکتای جدول نادیده گرفته می‌شود.
+    models.StudentClassroom.objects.bulk_create(created, batch_size=1000, ignore_conflicts=True)
+    if created:
+        # bulk_create سیگنال post_save نمی‌فرستد.
+        cache.bump_version(cache.CLASSROOMS_VERSION_KEY)
+    return {'enrolled': len(created), 'rows': rows}
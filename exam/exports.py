@@ -0,0 +1,252 @@
+import csv
+import heapq
+import re
+import zipfile
+from itertools import groupby
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import models
+
+RESULT_HEADER = ['شناسه آزمون', 'آزمون', 'شناسه دانش‌آموز', 'نام کاربری', 'نام', 'نام خانوادگی', 'کد ملی', 'نمره',
+                 'در انتظار محاسبه']
+ANSWER_HEADER = ['شناسه آزمون', 'شناسه دانش‌آموز', 'نام کاربری', 'شناسه سوال', 'سوال', 'پاسخ', 'نمره']
+STUDENT_COLUMNS = ['شناسه دانش‌آموز', 'نام کاربری', 'نام', 'نام خانوادگی']
+
+STUDENT_FIELDS = ('user__account__username', 'user__account__first_name', 'user__account__last_name')
+
+# هر بار حدود این مقدار داده برای کلاینت فرستاده می‌شود.
+FLUSH_SIZE = 64 * 1024
+
+
+def chunked(queryset, fields, chunk_size=None):
+    """
+    ردیف‌های ``queryset`` (که با ``.values()`` ساخته شده) را به ترتیب ``fields`` در دسته‌های ``chunk_size`` تایی
+    با شرط «بعد از آخرین ردیف» می‌خواند. برخلاف ``.iterator()`` که mysqlclient کل نتیجه را در حافظه نگه می‌دارد،
+    حافظه مصرفی فقط به اندازه یک دسته است. ``fields`` باید روی ردیف‌ها یکتا و غیر NULL باشند.
+    """
+    chunk_size = chunk_size or settings.EXAM_EXPORT_CHUNK_SIZE
+    queryset = queryset.order_by(*fields)
+    last = None
+    while True:
+        batch = queryset
+        if last is not None:
+            condition, equal = Q(), Q()
+            for field in fields:
+                condition |= equal & Q(**{f'{field}__gt': last[field]})
+                equal &= Q(**{field: last[field]})
+            batch = batch.filter(condition)
+
+        rows = list(batch[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
+
+
+def result_rows(exams, chunk_size=None):
+    yield RESULT_HEADER
+    for exam in exams:
+        results = models.UserExamResult.objects.filter(exam_id=exam.id).values(
+            'user_id', 'score', 'is_pending', *STUDENT_FIELDS, 'user__national_code'
+        )
+        for row in chunked(results, ['user_id'], chunk_size):
+            yield [
+                exam.id, exam.title, row['user_id'], row['user__account__username'],
+                row['user__account__first_name'], row['user__account__last_name'], row['user__national_code'],
+                row['score'], row['is_pending'],
+            ]
+
+
+def _exam_answers(exam_id, chunk_size=None):
+    """
+    پاسخ‌های تستی و تشریحی یک آزمون را به ترتیب (دانش‌آموز، سوال) و به صورت جریانی برمی‌گرداند.
+    نمره پاسخ تستی در صورت صحیح بودن گزینه برابر نمره سوال و در غیر این صورت صفر است.
+    """
+    options = models.UserOptions.objects.filter(question__exam_id=exam_id).values(
+        'user_id', 'question_id', *STUDENT_FIELDS, 'question__text', 'question__score',
+        'answer_option__text', 'answer_option__is_correct',
+    )
+    answers = models.UserAnswer.objects.filter(question__exam_id=exam_id).values(
+        'user_id', 'question_id', *STUDENT_FIELDS, 'question__text', 'answer_text', 'score',
+    )
+    option_rows = (
+        dict(row, answer=row['answer_option__text'],
+             score=row['question__score'] if row['answer_option__is_correct'] else 0)
+        for row in chunked(options, ['user_id', 'question_id'], chunk_size)
+    )
+    answer_rows = (
+        dict(row, answer=row['answer_text']) for row in chunked(answers, ['user_id', 'question_id'], chunk_size)
+    )
+    return heapq.merge(option_rows, answer_rows, key=lambda row: (row['user_id'], row['question_id']))
+
+
+def answer_rows(exams, chunk_size=None):
+    yield ANSWER_HEADER
+    for exam in exams:
+        for row in _exam_answers(exam.id, chunk_size):
+            yield [
+                exam.id, row['user_id'], row['user__account__username'], row['question_id'],
+                row['question__text'], row['answer'], row['score'],
+            ]
+
+
+def matrix_rows(exam, chunk_size=None):
+    """
+    ماتریس دانش‌آموز × سوال یک آزمون: هر ردیف نمره یک دانش‌آموز در هر سوال و جمع نمره‌ها است.
+    """
+    questions = list(models.Question.objects.filter(exam_id=exam.id).order_by('pk').values_list('id', flat=True))
+    yield STUDENT_COLUMNS + [f'سوال {index}' for index in range(1, len(questions) + 1)] + ['جمع']
+
+    for user_id, rows in groupby(_exam_answers(exam.id, chunk_size), key=lambda row: row['user_id']):
+        scores = {}
+        for row in rows:
+            scores[row['question_id']] = row['score']
+            student = [user_id, row['user__account__username'], row['user__account__first_name'],
+                       row['user__account__last_name']]
+        yield student + [scores.get(question_id) for question_id in questions] + [sum(scores.values())]
+
+
+class _Buffer:
+    """
+    بافر فقط‌نوشتنی که محتوای آن پس از هر بار خواندن خالی می‌شود.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.parts.append(data)
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts, self.size = [], 0
+        return data
+
+
+def _csv_cell(value):
+    # جلوگیری از اجرای مقدار به عنوان فرمول در نرم‌افزارهای صفحه‌گسترده
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    # BOM برای نمایش درست متن فارسی در Excel
+    buffer.write('\ufeff')
+    for row in rows:
+        writer.writerow([_csv_cell(value) for value in row])
+        if buffer.size >= FLUSH_SIZE:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def _column_name(index):
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+
+def _xlsx_cell(reference, value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number, row, columns):
+    while len(columns) < len(row):
+        columns.append(_column_name(len(columns)))
+    cells = ''.join(_xlsx_cell(f'{column}{number}', value) for column, value in zip(columns, row))
+    return f'<row r="{number}">{cells}</row>'
+
+
+def stream_xlsx(rows):
+    """
+    فایل XLSX را بدون وابستگی خارجی و به صورت جریانی می‌سازد: برگه با رشته‌های inline نوشته می‌شود و
+    خروجی zip همان لحظه فشرده و فرستاده می‌شود، پس حافظه مصرفی به تعداد ردیف‌ها بستگی ندارد.
+    """
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(SHEET_HEADER.encode())
+            columns = []
+            for number, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(number, row, columns).encode())
+                if buffer.size >= FLUSH_SIZE:
+                    yield buffer.drain()
+            sheet.write(SHEET_FOOTER.encode())
+    yield buffer.drain()
+
+
+WRITERS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
@@ -0,0 +1,203 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Sum, Value, Window
+from django.db.models.functions import DenseRank, Rank
+from django.utils import timezone
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+
+def exam_max_score(exam_id):
+    return models.Question.objects.filter(exam_id=exam_id).aggregate(total=Sum('score'))['total'] or 0
+
+
+def bucket_of(score, max_score, buckets):
+    if max_score <= 0:
+        return 0
+    return min(max(int(score / max_score * buckets), 0), buckets - 1)
+
+
+def percentile_of(rank, participants):
+    # درصد شرکت‌کنندگانی که نمره کمتری دارند؛ نفر اول ۱۰۰ و نفر آخر صفر است.
+    if participants <= 1:
+        return 100.0
+    return 100.0 * (participants - rank) / (participants - 1)
+
+
+def percentile_expression(participants):
+    """
+    همان ``percentile_of`` به صورت عبارت کوئری؛ صدک ذخیره نمی‌شود تا تغییر تعداد شرکت‌کنندگان به نوشتن
+    دوباره همه ردیف‌ها نیاز نداشته باشد.
+    """
+    if participants <= 1:
+        return Value(100.0, output_field=FloatField())
+    return ExpressionWrapper(
+        (Value(participants) - F('rank')) * Value(100.0 / (participants - 1)), output_field=FloatField()
+    )
+
+
+def rebuild(exam_id):
+    """
+    جدول رتبه‌بندی آزمون را با یک کوئری window (RANK و DENSE_RANK) از روی نتایج دوباره می‌سازد.
+    """
+    buckets = settings.EXAM_LEADERBOARD_BUCKETS
+    with transaction.atomic():
+        board, _ = models.Leaderboard.objects.get_or_create(exam_id=exam_id)
+        board = models.Leaderboard.objects.select_for_update().get(pk=board.pk)
+
+        rows = list(
+            models.UserExamResult.objects.filter(exam_id=exam_id).annotate(
+                rank=Window(Rank(), order_by=F('score').desc()),
+                dense_rank=Window(DenseRank(), order_by=F('score').desc()),
+            ).values_list('user_id', 'score', 'rank', 'dense_rank')
+        )
+        participants = len(rows)
+        max_score = exam_max_score(exam_id)
+        histogram = [0] * buckets
+
+        entries = []
+        for user_id, score, rank, dense_rank in rows:
+            histogram[bucket_of(score, max_score, buckets)] += 1
+            entries.append(models.LeaderboardEntry(
+                exam_id=exam_id, user_id=user_id, score=score, rank=rank, dense_rank=dense_rank,
+            ))
+
+        models.LeaderboardEntry.objects.filter(exam_id=exam_id).delete()
+        models.LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+        models.Leaderboard.objects.filter(pk=board.pk).update(
+            participants=participants, max_score=max_score, histogram=histogram, updated_at=timezone.now()
+        )
+    logger.info("rebuilt leaderboard of exam %s with %s entries", exam_id, participants)
+    return participants
+
+
+def _remove(entries, score):
+    # نتایجی که کمتر از نمره حذف‌شده هستند یک رتبه بالا می‌آیند.
+    below = entries.filter(score__lt=score)
+    below.update(rank=F('rank') - 1)
+    if not entries.filter(score=score).exists():
+        below.update(dense_rank=F('dense_rank') - 1)
+
+
+def _insert(entries, score):
+    below = entries.filter(score__lt=score)
+    below.update(rank=F('rank') + 1)
+    if not entries.filter(score=score).exists():
+        below.update(dense_rank=F('dense_rank') + 1)
+
+    above = entries.filter(score__gt=score)
+    return above.count() + 1, above.values('score').distinct().count() + 1
+
+
+def _move(board, entry, user_id, new_score):
+    """
+    نمره یک دانش‌آموز را از جدول برمی‌دارد و با نمره جدید دوباره اضافه می‌کند. فقط رتبه ردیف‌هایی که بین
+    دو نمره قرار دارند با UPDATE تغییر می‌کند و مرتب‌سازی کل نتایج لازم نیست.
+    """
+    others = models.LeaderboardEntry.objects.filter(exam_id=board.exam_id).exclude(user_id=user_id)
+
+    if entry is not None:
+        _remove(others, entry.score)
+        board.participants -= 1
+        board.histogram[bucket_of(entry.score, board.max_score, len(board.histogram))] -= 1
+
+    if new_score is None:
+        if entry is not None:
+            entry.delete()
+        return
+
+    rank, dense_rank = _insert(others, new_score)
+    board.participants += 1
+    board.histogram[bucket_of(new_score, board.max_score, len(board.histogram))] += 1
+    models.LeaderboardEntry.objects.update_or_create(
+        exam_id=board.exam_id, user_id=user_id,
+        defaults={'score': new_score, 'rank': rank, 'dense_rank': dense_rank},
+    )
+
+
+def refresh(exam_id, student_ids=None):
+    """
+    تغییر نتایج ``student_ids`` را در جدول رتبه‌بندی آزمون اعمال می‌کند. تا
+    ``EXAM_LEADERBOARD_INCREMENTAL_LIMIT`` دانش‌آموز به صورت افزایشی و بیشتر از آن با ساخت دوباره کل جدول.
+    اگر جدول هنوز ساخته نشده باشد کاری انجام نمی‌شود؛ جدول در اولین مشاهده ساخته می‌شود.
+    """
+    if not models.Leaderboard.objects.filter(exam_id=exam_id).exists():
+        return
+
+    with transaction.atomic():
+        board = models.Leaderboard.objects.select_for_update().filter(exam_id=exam_id).first()
+        if board is None:
+            return
+        if student_ids is None or len(student_ids) > settings.EXAM_LEADERBOARD_INCREMENTAL_LIMIT:
+            rebuild(exam_id)
+            return
+
+        scores = dict(
+            models.UserExamResult.objects.filter(
+                exam_id=exam_id, user_id__in=student_ids
+            ).values_list('user_id', 'score')
+        )
+        entries = {
+            entry.user_id: entry
+            for entry in models.LeaderboardEntry.objects.filter(exam_id=exam_id, user_id__in=student_ids)
+        }
+
+        changed = False
+        for user_id in set(student_ids):
+            entry, score = entries.get(user_id), scores.get(user_id)
+            if (entry.score if entry else None) != score:
+                _move(board, entry, user_id, score)
+                changed = True
+        if not changed:
+            return
+
+        # ممکن است جدول هم‌زمان با حذف آزمون حذف شده باشد؛ save دوباره آن را درج می‌کرد.
+        models.Leaderboard.objects.filter(pk=board.pk).update(
+            participants=board.participants, histogram=board.histogram, updated_at=timezone.now()
+        )
+
+
+def rescale(exam_id):
+    """
+    پس از اضافه یا حذف سوال، حداکثر نمره آزمون و در نتیجه بازه‌های نمودار تغییر می‌کند. نمودار از روی نمره‌های
+    ذخیره‌شده در جدول دوباره شمرده می‌شود؛ رتبه‌ها به حداکثر نمره وابسته نیستند.
+    """
+    if not models.Leaderboard.objects.filter(exam_id=exam_id).exists():
+        return
+
+    with transaction.atomic():
+        board = models.Leaderboard.objects.select_for_update().filter(exam_id=exam_id).first()
+        if board is None:
+            return
+        max_score = exam_max_score(exam_id)
+        if max_score == board.max_score:
+            return
+
+        buckets = len(board.histogram) or settings.EXAM_LEADERBOARD_BUCKETS
+        histogram = [0] * buckets
+        for score in models.LeaderboardEntry.objects.filter(exam_id=exam_id).values_list('score', flat=True):
+            histogram[bucket_of(score, max_score, buckets)] += 1
+        models.Leaderboard.objects.filter(pk=board.pk).update(
+            max_score=max_score, histogram=histogram, updated_at=timezone.now()
+        )
+
+
+def ensure(exam_id):
+    board = models.Leaderboard.objects.filter(exam_id=exam_id).first()
+    if board is None:
+        rebuild(exam_id)
+        board = models.Leaderboard.objects.get(exam_id=exam_id)
+    return board
+
+
+def histogram_buckets(board):
+    buckets = len(board.histogram)
+    width = board.max_score / buckets if buckets else 0
+    return [
+        {'from': round(index * width, 2), 'to': round((index + 1) * width, 2), 'count': count}
+        for index, count in enumerate(board.histogram)
+    ]
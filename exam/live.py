@@ -0,0 +1,260 @@
+import asyncio
+import contextlib
+import json
+import logging
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CachedTokenAuthentication
+from . import cache
+from . import sessions
+
+logger = logging.getLogger(__name__)
+
+ROUTE = re.compile(r'^/ws/exams/(?P<exam_id>\d+)/$')
+GROUP = 'exam-live:{exam_id}'
+
+TICK = 'tick'
+FORCED_SUBMIT = 'forced_submit'
+ANNOUNCEMENT = 'announcement'
+RESULTS_PUBLISHED = 'results_published'
+
+# کدهای بستن اتصال پیش از پذیرش آن
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+class LocalBroadcast:
+    """
+    پخش پیام بین اتصال‌های همین پروسه. ``publish`` از کد همگام (view ها و دستورها) هم قابل فراخوانی است و پیام
+    در حلقه رویداد هر مشترک تحویل داده می‌شود.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, group, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(group, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, group):
+        queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[group].add(subscriber)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers[group].discard(subscriber)
+                if not self._subscribers[group]:
+                    del self._subscribers[group]
+
+
+class RedisBroadcast(LocalBroadcast):
+    """
+    پخش پیام بین چند سرور با Pub/Sub ردیس (``EXAM_LIVE_BROADCAST_URL``). هر پروسه فقط یک اتصال اشتراک دارد و
+    پیام‌های دریافتی را با ``LocalBroadcast`` بین اتصال‌های خودش پخش می‌کند. به بسته ``redis`` نیاز دارد.
+    """
+    prefix = 'exam-live:'
+
+    def __init__(self, url=None):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBroadcast به بسته redis نیاز دارد.")
+        self.url = url or settings.EXAM_LIVE_BROADCAST_URL
+        self._client = redis.Redis.from_url(self.url)
+        self._listeners = {}
+
+    def publish(self, group, message):
+        self._client.publish(group, json.dumps(message, cls=DjangoJSONEncoder))
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(f'{self.prefix}*')
+        try:
+            async for item in pubsub.listen():
+                if item['type'] == 'pmessage':
+                    super().publish(item['channel'].decode(), json.loads(item['data']))
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, group):
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            self._listeners[loop] = loop.create_task(self._listen())
+        async with super().subscribe(group) as queue:
+            yield queue
+
+
+@lru_cache(maxsize=None)
+def get_broadcast():
+    return import_string(settings.EXAM_LIVE_BROADCAST_BACKEND)()
+
+
+def publish(exam_id, message):
+    """
+    پیامی را برای همه اتصال‌های زنده آزمون (در همه سرورها، بسته به ``EXAM_LIVE_BROADCAST_BACKEND``) می‌فرستد.
+    خطای پخش نباید درخواست اصلی را ناموفق کند.
+    """
+    try:
+        get_broadcast().publish(GROUP.format(exam_id=exam_id), message)
+    except Exception:
+        logger.exception("publishing live event for exam %s failed", exam_id)
+
+
+def _call(function, *args):
+    close_old_connections()
+    try:
+        return function(*args)
+    finally:
+        close_old_connections()
+
+
+async def _run(function, *args):
+    return await sync_to_async(_call)(function, *args)
+
+
+def _authenticate(key):
+    try:
+        _user, principal = CachedTokenAuthentication().authenticate_credentials(key)
+    except AuthenticationFailed:
+        return None
+    return principal
+
+
+def _load(student_id, exam_id):
+    return sessions.get_session(student_id, exam_id), cache.get_exam_timing(exam_id)
+
+
+class ExamConnection:
+    """
+    یک اتصال WebSocket دانش‌آموز به آزمون. جلسه و زمان‌بندی آزمون هنگام اتصال و هر
+    ``EXAM_LIVE_REFRESH_SECONDS`` ثانیه از کش خوانده می‌شوند و بین آن‌ها تیک‌های زمان فقط در حافظه ساخته می‌شوند.
+    """
+
+    def __init__(self, exam_id, send):
+        self.exam_id = exam_id
+        self.send = send
+        self.student_id = None
+        self.session = None
+        self.timing = None
+        self.results_sent = False
+
+    async def open(self, scope):
+        """
+        اتصال را احراز هویت می‌کند (توکن در ``?token=``) و در صورت رد شدن کد بستن اتصال را برمی‌گرداند.
+        """
+        key = (parse_qs(scope.get('query_string', b'').decode()).get('token') or [''])[0]
+        principal = await _run(_authenticate, key) if key else None
+        if principal is None:
+            return CLOSE_UNAUTHENTICATED
+        if not principal.is_student:
+            return CLOSE_FORBIDDEN
+
+        self.student_id = principal.student_id
+        self.session, self.timing = await _run(_load, self.student_id, self.exam_id)
+        if self.timing is None:
+            return CLOSE_NOT_FOUND
+        if self.timing['institute_id'] != principal.institute_id:
+            return CLOSE_FORBIDDEN
+        return None
+
+    async def emit(self, message):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(message, cls=DjangoJSONEncoder)})
+
+    async def tick(self):
+        refreshed = timezone.now()
+        while True:
+            now = timezone.now()
+            if (now - refreshed).total_seconds() >= settings.EXAM_LIVE_REFRESH_SECONDS:
+                self.session, timing = await _run(_load, self.student_id, self.exam_id)
+                self.timing = timing or self.timing
+                refreshed = now
+
+            await self.emit({'type': TICK, **sessions.describe(self.exam_id, self.session, self.timing, now)})
+            show_time = self.timing.get('result_show_time')
+            if not self.results_sent and show_time is not None and show_time <= now:
+                self.results_sent = True
+                await self.emit({'type': RESULTS_PUBLISHED, 'exam': self.exam_id})
+            await asyncio.sleep(settings.EXAM_LIVE_TICK_SECONDS)
+
+    async def forward(self, queue):
+        while True:
+            message = await queue.get()
+            if message['type'] == FORCED_SUBMIT:
+                if self.student_id not in message['students']:
+                    continue
+                self.session, _ = await _run(_load, self.student_id, self.exam_id)
+                await self.emit({'type': FORCED_SUBMIT, 'exam': self.exam_id, 'status': self.session['status'],
+                                 'submitted_at': self.session['submitted_at']})
+            else:
+                await self.emit(message)
+
+
+async def websocket_application(scope, receive, send):
+    """
+    کانال زنده آزمون در ``/ws/exams/<exam_id>/?token=<token>``: تیک‌های زمان باقی‌مانده، ثبت اجباری پایان
+    جلسه، اطلاعیه‌های استاد و اعلام انتشار نتایج به جای درخواست‌های پی‌درپی هر دانش‌آموز.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    match = ROUTE.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    connection = ExamConnection(int(match['exam_id']), send)
+    code = await connection.open(scope)
+    if code is not None:
+        await send({'type': 'websocket.close', 'code': code})
+        return
+
+    await send({'type': 'websocket.accept'})
+    async with get_broadcast().subscribe(GROUP.format(exam_id=connection.exam_id)) as queue:
+        tasks = [asyncio.ensure_future(connection.tick()), asyncio.ensure_future(connection.forward(queue))]
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def notify_forced_submit(exam_id, student_ids):
+    publish(exam_id, {'type': FORCED_SUBMIT, 'exam': exam_id, 'students': list(student_ids)})
+
+
+def announce(exam_id, text, sender):
+    publish(exam_id, {'type': ANNOUNCEMENT, 'exam': exam_id, 'text': text, 'sender': sender,
+                      'sent_at': timezone.now()})
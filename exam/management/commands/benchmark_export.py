@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import in_test_database
+from exam import benchmarks
+from exam import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "خروجی جریانی نتایج آزمون را روی داده ساختگی می‌سازد و حجم خروجی و بیشترین حافظه مصرفی را گزارش می‌کند. "
+        "داده در پایگاه داده تست ساخته می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[20000, 200000])
+        parser.add_argument('--output', choices=list(exports.WRITERS), default='csv')
+
+    def handle(self, *args, **options):
+        reports = in_test_database(
+            lambda: [benchmarks.measure_export_memory(rows, options['output']) for rows in options['rows']]
+        )
+
+        self.stdout.write(json.dumps(reports, ensure_ascii=False, indent=2))
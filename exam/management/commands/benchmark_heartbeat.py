@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import in_test_database
+from exam import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "دانش‌آموزان ساختگی را شبیه‌سازی می‌کند که زمان‌سنج آزمون را در چند دور می‌خوانند و زمان پاسخ و تعداد "
+        "کوئری هر دور را گزارش می‌کند. داده در پایگاه داده تست ساخته می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=5000)
+        parser.add_argument('--rounds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        report = in_test_database(benchmarks.measure_heartbeat, options['clients'], options['rounds'])
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import in_test_database
+from exam import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "تحلیل سوالات یک آزمون ساختگی را محاسبه و زمان و تعداد کوئری آن را گزارش می‌کند. "
+        "داده در پایگاه داده تست ساخته می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--responders', type=int, default=10000)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        report = in_test_database(
+            benchmarks.measure_item_analysis, options['responders'], options['questions'], options['repeat']
+        )
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import in_test_database
+from exam import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "زمان CPU ساخت برگه یک آزمون ساختگی با سریالایزر را با خواندن آن از کش مقایسه می‌کند. "
+        "داده در پایگاه داده تست ساخته می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        report = in_test_database(benchmarks.measure_exam_paper, options['questions'], options['repeat'])
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,24 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import in_test_database
+from exam import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "سرعت ساخت پاسخ لیست نتایج آزمون را برای سریالایزر فعلی، رندرر orjson و مسیر سریع values "
+        "روی داده ساختگی مقایسه می‌کند. داده در پایگاه داده تست ساخته می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        report = in_test_database(benchmarks.compare_list_rendering, options['rows'], options['repeat'])
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if not report['identical']:
+            raise CommandError("خروجی روش‌های مختلف با هم یکسان نیست.")
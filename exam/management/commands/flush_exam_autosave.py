@@ -0,0 +1,40 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from exam import autosave
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "پیش‌نویس‌های ذخیره خودکار پاسخ‌ها را به صورت دسته‌ای در جداول پاسخ می‌نویسد"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--poll-interval', type=float, default=settings.EXAM_AUTOSAVE_FLUSH_SECONDS)
+        parser.add_argument('--once', action='store_true', help="پس از نوشتن همه پیش‌نویس‌های موجود خارج شود.")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                flushed = autosave.flush_pending(options['batch_size'])
+            except OperationalError:
+                # قفل یا قطعی موقت پایگاه داده نباید پروسه را متوقف کند؛ پیش‌نویس‌ها در بافر می‌مانند.
+                logger.warning("autosave flusher could not reach the database", exc_info=True)
+                connections.close_all()
+                time.sleep(options['poll_interval'])
+                continue
+
+            if flushed:
+                self.stdout.write(f"{flushed} drafts flushed")
+            # دسته کامل یعنی پیش‌نویس‌های بیشتری در انتظارند؛ در غیر این صورت تا دوره بعد صبر می‌شود تا
+            # تغییرهای پی‌درپی هر پاسخ در یک نوشتن جمع شوند.
+            if flushed == options['batch_size']:
+                continue
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
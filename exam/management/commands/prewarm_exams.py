@@ -0,0 +1,35 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from exam import prewarm
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "برگه، زمان‌بندی و جلسه دانش‌آموزان آزمون‌های نزدیک به شروع را از پیش در کش آماده می‌کند"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-minutes', type=int, default=settings.EXAM_PREWARM_LEAD_MINUTES)
+        parser.add_argument('--poll-interval', type=float, default=60.0)
+        parser.add_argument('--once', action='store_true', help="پس از یک بار بررسی خارج شود.")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                report = prewarm.prewarm_due_exams(options['lead_minutes'])
+            except OperationalError:
+                # قفل یا قطعی موقت پایگاه داده نباید پروسه را متوقف کند.
+                logger.warning("exam prewarmer could not reach the database", exc_info=True)
+                connections.close_all()
+                report = []
+
+            for entry in report:
+                self.stdout.write(f"exam {entry['exam']}: {entry['students']} students")
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
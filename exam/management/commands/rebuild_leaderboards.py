@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from exam import leaderboard
+from exam import models
+
+
+class Command(BaseCommand):
+    help = "جدول رتبه‌بندی آزمون‌های مشخص‌شده (یا همه آزمون‌های دارای نتیجه) را دوباره می‌سازد"
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_ids', type=int, nargs='*')
+
+    def handle(self, *args, **options):
+        exam_ids = options['exam_ids'] or list(
+            models.UserExamResult.objects.order_by('exam_id').values_list('exam_id', flat=True).distinct()
+        )
+        for exam_id in exam_ids:
+            participants = leaderboard.rebuild(exam_id)
+            self.stdout.write(f"exam {exam_id}: {participants} entries")
@@ -0,0 +1,61 @@
+import logging
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from exam import scoring
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(batch_size, poll_interval, once):
+    while True:
+        try:
+            processed = scoring.process_pending_jobs(batch_size)
+        except OperationalError:
+            # قفل یا قطعی موقت پایگاه داده نباید پروسه را متوقف کند.
+            logger.warning("scoring worker could not reach the database", exc_info=True)
+            connections.close_all()
+            time.sleep(poll_interval)
+            continue
+
+        if not processed:
+            if once:
+                return
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = "پردازش صف محاسبه نمره آزمون‌ها با چند پروسه"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.EXAM_SCORING_WORKERS)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help="پس از خالی شدن صف خارج شود.")
+
+    def handle(self, *args, **options):
+        worker_args = (options['batch_size'], options['poll_interval'], options['once'])
+
+        if options['processes'] <= 1:
+            run_worker(*worker_args)
+            return
+
+        # اتصال‌های پایگاه داده نباید بین پروسه‌های فرزند به اشتراک گذاشته شوند.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=worker_args, daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
@@ -0,0 +1,36 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from exam import sessions
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "جلسه‌های آزمونی را که مهلتشان گذشته به صورت گروهی می‌بندد"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--poll-interval', type=float, default=10.0)
+        parser.add_argument('--once', action='store_true', help="پس از بستن همه جلسه‌های منقضی‌شده خارج شود.")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                closed = sessions.sweep_expired(options['batch_size'])
+            except OperationalError:
+                # قفل یا قطعی موقت پایگاه داده نباید پروسه را متوقف کند.
+                logger.warning("session sweeper could not reach the database", exc_info=True)
+                connections.close_all()
+                time.sleep(options['poll_interval'])
+                continue
+
+            if closed:
+                self.stdout.write(f"{closed} sessions expired")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
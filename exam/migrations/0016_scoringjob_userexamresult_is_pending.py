@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_remove_customuser_is_team'),
+        ('exam', '0015_alter_userexamtime_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userexamresult',
+            name='is_pending',
+            field=models.BooleanField(default=False, verbose_name='در انتظار محاسبه'),
+        ),
+        migrations.CreateModel(
+            name='ScoringJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(verbose_name='زمان آخرین درخواست')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='زمان برداشتن توسط پردازشگر')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='آخرین خطا')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scoring_jobs', to='exam.exam', verbose_name='آزمون')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scoring_jobs', to='core.student', verbose_name='دانش آموز')),
+            ],
+            options={
+                'verbose_name': 'کار محاسبه نمره',
+                'verbose_name_plural': 'کارهای محاسبه نمره',
+                'indexes': [models.Index(fields=['claimed_at', 'requested_at'], name='scoring_job_queue_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scoringjob',
+            constraint=models.UniqueConstraint(fields=('user', 'exam'), name='unique_scoring_job_user_exam'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:58
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+CHUNK_SIZE = 1000
+
+
+def delete_duplicates(model, fields, batch_size=1000):
+    """
+    از هر گروه ردیف‌های هم‌کلید (``fields``) فقط جدیدترین ردیف را نگه می‌دارد و کلیدهای گروه‌های تکراری را
+    برمی‌گرداند. شناسه‌های حذفی در پایتون جمع و در دسته‌های ``batch_size`` تایی با ``id__in`` حذف می‌شوند تا
+    اندازه کوئری به تعداد گروه‌ها وابسته نباشد. ``model`` مدل تاریخی است؛ این تابع عمدا از کد اپ وارد نمی‌شود
+    تا تغییرات بعدی کد رفتار این مایگریشن را تغییر ندهد.
+    """
+    groups = list(
+        model.objects.values(*fields).annotate(rows=Count('id')).filter(rows__gt=1).order_by()
+    )
+    keys = {tuple(group[field] for field in fields) for group in groups}
+    leading = sorted({key[0] for key in keys})
+
+    doomed = []
+    for start in range(0, len(leading), batch_size):
+        rows = model.objects.filter(**{f'{fields[0]}__in': leading[start:start + batch_size]}).order_by(*fields, '-id')
+        seen = set()
+        for *key, pk in rows.values_list(*fields, 'id').iterator(chunk_size=batch_size):
+            key = tuple(key)
+            if key not in keys:
+                continue
+            if key in seen:
+                doomed.append(pk)
+            seen.add(key)
+
+    for start in range(0, len(doomed), batch_size):
+        model.objects.filter(id__in=doomed[start:start + batch_size]).delete()
+    return groups
+
+
+def deduplicate(apps, schema_editor):
+    UserOptions = apps.get_model('exam', 'UserOptions')
+    UserAnswer = apps.get_model('exam', 'UserAnswer')
+    UserExamResult = apps.get_model('exam', 'UserExamResult')
+    UserExamTime = apps.get_model('exam', 'UserExamTime')
+    Question = apps.get_model('exam', 'Question')
+    ScoringJob = apps.get_model('exam', 'ScoringJob')
+
+    affected = delete_duplicates(UserOptions, ['question', 'user'], CHUNK_SIZE)
+    affected += delete_duplicates(UserAnswer, ['question', 'user'], CHUNK_SIZE)
+    results = delete_duplicates(UserExamResult, ['exam', 'user'], CHUNK_SIZE)
+    delete_duplicates(UserExamTime, ['exam', 'user'], CHUNK_SIZE)
+
+    # پاسخ‌های تکراری در نمره نهایی دو بار شمرده شده بودند و نمره ردیف نتیجه باقی‌مانده از میان نتایج تکراری
+    # معلوم نیست؛ نمره این دانش‌آموزان «در انتظار» علامت می‌خورد و دوباره محاسبه می‌شود.
+    question_ids = sorted({group['question'] for group in affected})
+    exam_ids = {}
+    for start in range(0, len(question_ids), CHUNK_SIZE):
+        exam_ids.update(
+            Question.objects.filter(id__in=question_ids[start:start + CHUNK_SIZE]).values_list('id', 'exam_id')
+        )
+    jobs = {(group['user'], exam_ids[group['question']]) for group in affected}
+    jobs |= {(group['user'], group['exam']) for group in results}
+
+    now = timezone.now()
+    ScoringJob.objects.bulk_create(
+        [ScoringJob(user_id=user_id, exam_id=exam_id, requested_at=now) for user_id, exam_id in jobs],
+        batch_size=CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+    students_by_exam = defaultdict(list)
+    for user_id, exam_id in jobs:
+        students_by_exam[exam_id].append(user_id)
+    for exam_id, student_ids in students_by_exam.items():
+        for start in range(0, len(student_ids), CHUNK_SIZE):
+            UserExamResult.objects.filter(
+                exam_id=exam_id, user_id__in=student_ids[start:start + CHUNK_SIZE],
+            ).update(is_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0016_scoringjob_userexamresult_is_pending'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['user', 'question'], name='user_answer_user_question_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useroptions',
+            index=models.Index(fields=['user', 'question'], name='user_option_user_question_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='useranswer',
+            constraint=models.UniqueConstraint(fields=('question', 'user'), name='unique_user_answer_question_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='userexamresult',
+            constraint=models.UniqueConstraint(fields=('exam', 'user'), name='unique_exam_result_exam_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='userexamtime',
+            constraint=models.UniqueConstraint(fields=('exam', 'user'), name='unique_exam_time_exam_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='useroptions',
+            constraint=models.UniqueConstraint(fields=('question', 'user'), name='unique_user_option_question_user'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_remove_customuser_is_team'),
+        ('exam', '0017_unique_answers_and_results'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Leaderboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('participants', models.PositiveIntegerField(default=0, verbose_name='تعداد شرکت\u200cکنندگان')),
+                ('max_score', models.FloatField(default=0, verbose_name='حداکثر نمره آزمون')),
+                ('histogram', models.JSONField(default=list, verbose_name='تعداد نتایج هر بازه نمره')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='زمان آخرین به\u200cروزرسانی')),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='exam.exam', verbose_name='آزمون')),
+            ],
+            options={
+                'verbose_name': 'جدول رتبه\u200cبندی',
+                'verbose_name_plural': 'جداول رتبه\u200cبندی',
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='نمره')),
+                ('rank', models.PositiveIntegerField(verbose_name='رتبه')),
+                ('dense_rank', models.PositiveIntegerField(verbose_name='رتبه بدون فاصله')),
+                ('percentile', models.FloatField(verbose_name='صدک')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='exam.exam', verbose_name='آزمون')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='core.student', verbose_name='دانش آموز')),
+            ],
+            options={
+                'verbose_name': 'رتبه دانش آموز',
+                'verbose_name_plural': 'رتبه\u200cهای دانش آموزان',
+                'indexes': [models.Index(fields=['exam', 'rank'], name='leaderboard_exam_rank_idx'), models.Index(fields=['exam', 'score'], name='leaderboard_exam_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('exam', 'user'), name='unique_leaderboard_entry_exam_user'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def delete_duplicates(model, fields, batch_size=1000):
+    """
+    از هر گروه ردیف‌های هم‌کلید (``fields``) فقط جدیدترین ردیف را نگه می‌دارد و کلیدهای گروه‌های تکراری را
+    برمی‌گرداند. شناسه‌های حذفی در پایتون جمع و در دسته‌های ``batch_size`` تایی با ``id__in`` حذف می‌شوند تا
+    اندازه کوئری به تعداد گروه‌ها وابسته نباشد. ``model`` مدل تاریخی است؛ این تابع عمدا از کد اپ وارد نمی‌شود
+    تا تغییرات بعدی کد رفتار این مایگریشن را تغییر ندهد.
+    """
+    groups = list(
+        model.objects.values(*fields).annotate(rows=Count('id')).filter(rows__gt=1).order_by()
+    )
+    keys = {tuple(group[field] for field in fields) for group in groups}
+    leading = sorted({key[0] for key in keys})
+
+    doomed = []
+    for start in range(0, len(leading), batch_size):
+        rows = model.objects.filter(**{f'{fields[0]}__in': leading[start:start + batch_size]}).order_by(*fields, '-id')
+        seen = set()
+        for *key, pk in rows.values_list(*fields, 'id').iterator(chunk_size=batch_size):
+            key = tuple(key)
+            if key not in keys:
+                continue
+            if key in seen:
+                doomed.append(pk)
+            seen.add(key)
+
+    for start in range(0, len(doomed), batch_size):
+        model.objects.filter(id__in=doomed[start:start + batch_size]).delete()
+    return groups
+
+
+def deduplicate(apps, schema_editor):
+    """
+    از هر ثبت‌نام تکراری دانش‌آموز در یک کلاس فقط جدیدترین ردیف نگه داشته می‌شود.
+    """
+    delete_duplicates(apps.get_model('exam', 'StudentClassroom'), ['classroom', 'student'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0018_leaderboard'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentclassroom',
+            constraint=models.UniqueConstraint(fields=('classroom', 'student'), name='unique_student_classroom'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+def mark_started(apps, schema_editor):
+    # ردیف‌های قبلی فقط هنگام شروع آزمون ساخته می‌شدند؛ جلسه‌های تمام‌شده را sweep_exam_sessions می‌بندد.
+    UserExamTime = apps.get_model('exam', 'UserExamTime')
+    UserExamTime.objects.filter(finish_time__isnull=False).update(status='in_progress')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0019_unique_student_classroom'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userexamtime',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='زمان شروع'),
+        ),
+        migrations.AddField(
+            model_name='userexamtime',
+            name='status',
+            field=models.CharField(choices=[('not_started', 'شروع نشده'), ('in_progress', 'در حال انجام'), ('submitted', 'ثبت نهایی شده'), ('expired', 'پایان زمان')], default='not_started', max_length=20, verbose_name='وضعیت'),
+        ),
+        migrations.AddField(
+            model_name='userexamtime',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='زمان ثبت نهایی'),
+        ),
+        migrations.AddIndex(
+            model_name='userexamtime',
+            index=models.Index(fields=['status', 'finish_time'], name='exam_time_status_finish_idx'),
+        ),
+        migrations.RunPython(mark_started, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0020_exam_session'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['start_time'], name='exam_start_time_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0021_exam_start_time_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='leaderboardentry',
+            name='percentile',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0022_remove_leaderboardentry_percentile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scoringjob',
+            name='generation',
+            field=models.PositiveIntegerField(default=0, verbose_name='شماره آخرین درخواست'),
+        ),
+    ]
@@ -25,6 +25,11 @@ class StudentClassroom(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="student_classroom",
                                 verbose_name="دانشجو")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["classroom", "student"], name="unique_student_classroom"),
+        ]
+
 
 class Major(models.Model):
     name = models.CharField(max_length=100, verbose_name="نام رشته تحصیلی")
@@ -61,6 +66,10 @@ class Exam(models.Model):
     class Meta:
         verbose_name = "آزمون"
         verbose_name_plural = "آزمون‌ها"
+        indexes = [
+            # جستجوی آزمون‌های نزدیک به شروع در prewarm_exams
+            models.Index(fields=["start_time"], name="exam_start_time_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -102,6 +111,12 @@ class UserAnswer(models.Model):
     class Meta:
         verbose_name = "پاسخ دانش‌آموز"
         verbose_name_plural = "پاسخ‌های دانش‌آموزان"
+        constraints = [
+            models.UniqueConstraint(fields=["question", "user"], name="unique_user_answer_question_user"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "question"], name="user_answer_user_question_idx"),
+        ]
 
 
 class UserOptions(models.Model):
@@ -112,26 +127,99 @@ class UserOptions(models.Model):
     class Meta:
         verbose_name = "پاسخ تستی دانش‌آموز"
         verbose_name_plural = "پاسخ‌های تستی دانش‌آموزان"
+        constraints = [
+            models.UniqueConstraint(fields=["question", "user"], name="unique_user_option_question_user"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "question"], name="user_option_user_question_idx"),
+        ]
 
 
 class UserExamResult(models.Model):
     user = models.ForeignKey(Student, on_delete=models.CASCADE, verbose_name="دانش آموز")
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, verbose_name="آزمون")
     score = models.FloatField(default=0, verbose_name="نمره نهایی")
+    is_pending = models.BooleanField(default=False, verbose_name="در انتظار محاسبه")
 
     class Meta:
         verbose_name = "نمره نهایی دانش آموز/دانشجو"
         verbose_name_plural = "نمره های نهایی دانش آموز/دانشجو"
+        constraints = [
+            models.UniqueConstraint(fields=["exam", "user"], name="unique_exam_result_exam_user"),
+        ]
+
+
+class ScoringJob(models.Model):
+    user = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="scoring_jobs", verbose_name="دانش آموز")
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="scoring_jobs", verbose_name="آزمون")
+    requested_at = models.DateTimeField(verbose_name="زمان آخرین درخواست")
+    generation = models.PositiveIntegerField(default=0, verbose_name="شماره آخرین درخواست")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="زمان برداشتن توسط پردازشگر")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="تعداد تلاش")
+    last_error = models.TextField(blank=True, default="", verbose_name="آخرین خطا")
+
+    class Meta:
+        verbose_name = "کار محاسبه نمره"
+        verbose_name_plural = "کارهای محاسبه نمره"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "exam"], name="unique_scoring_job_user_exam"),
+        ]
+        indexes = [
+            models.Index(fields=["claimed_at", "requested_at"], name="scoring_job_queue_idx"),
+        ]
+
+
+class Leaderboard(models.Model):
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name="leaderboard", verbose_name="آزمون")
+    participants = models.PositiveIntegerField(default=0, verbose_name="تعداد شرکت‌کنندگان")
+    max_score = models.FloatField(default=0, verbose_name="حداکثر نمره آزمون")
+    histogram = models.JSONField(default=list, verbose_name="تعداد نتایج هر بازه نمره")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="زمان آخرین به‌روزرسانی")
+
+    class Meta:
+        verbose_name = "جدول رتبه‌بندی"
+        verbose_name_plural = "جداول رتبه‌بندی"
+
+
+class LeaderboardEntry(models.Model):
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="leaderboard_entries", verbose_name="آزمون")
+    user = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="leaderboard_entries",
+                             verbose_name="دانش آموز")
+    score = models.FloatField(verbose_name="نمره")
+    rank = models.PositiveIntegerField(verbose_name="رتبه")
+    dense_rank = models.PositiveIntegerField(verbose_name="رتبه بدون فاصله")
+
+    class Meta:
+        verbose_name = "رتبه دانش آموز"
+        verbose_name_plural = "رتبه‌های دانش آموزان"
+        constraints = [
+            models.UniqueConstraint(fields=["exam", "user"], name="unique_leaderboard_entry_exam_user"),
+        ]
+        indexes = [
+            models.Index(fields=["exam", "rank"], name="leaderboard_exam_rank_idx"),
+            models.Index(fields=["exam", "score"], name="leaderboard_exam_score_idx"),
+        ]
 
 
 class UserExamTime(models.Model):
     user = models.ForeignKey(Student, on_delete=models.CASCADE, verbose_name="دانش آموز")
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, verbose_name="آزمون")
+    status = models.CharField(max_length=20, choices=consts.SESSION_STATUSES, default=consts.SESSION_NOT_STARTED,
+                              verbose_name="وضعیت")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="زمان شروع")
     finish_time = models.DateTimeField(null=True, blank=True, verbose_name="زمان پایان آزمون")
+    submitted_at = models.DateTimeField(null=True, blank=True, verbose_name="زمان ثبت نهایی")
 
     class Meta:
         verbose_name = "زمان پایان آزمون دانشجو"
         verbose_name_plural = "زمان های پایان آزمون دانشجو"
+        constraints = [
+            models.UniqueConstraint(fields=["exam", "user"], name="unique_exam_time_exam_user"),
+        ]
+        indexes = [
+            # جستجوی جلسه‌های منقضی‌شده در sweep_exam_sessions
+            models.Index(fields=["status", "finish_time"], name="exam_time_status_finish_idx"),
+        ]
 
 
 class Feedback(models.Model):
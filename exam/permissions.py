@@ -1,28 +1,26 @@
 from rest_framework import permissions
 
+from core.principal import get_principal
 from exam.models import UserOptions, Feedback
 
 
 class IsTeacherOrInstituteOrAdmin(permissions.BasePermission):
 
     def has_permission(self, request, view):
-        user = request.user
-        return (
-                hasattr(user, "teacher") or
-                hasattr(user, "institute") or
-                getattr(user, "user_type", None) == "admin"
-        )
+        principal = get_principal(request)
+        return principal.is_teacher or principal.is_institute or principal.is_admin
 
 
 class IsStudentOfClassOrTeacherOrInstitute(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
-        if hasattr(request.user, "teacher"):
-            return obj.teacher == request.user.teacher
-        elif hasattr(request.user, "institute"):
-            return obj.institute == request.user.institute
-        elif hasattr(request.user, "student"):
-            return obj.student_classroom.filter(student=request.user.student).exists()
+        principal = get_principal(request)
+        if principal.is_teacher:
+            return obj.teacher_id == principal.teacher_id
+        elif principal.is_institute:
+            return obj.teacher_id is not None and obj.teacher.institute_id == principal.institute_id
+        elif principal.is_student:
+            return obj.student_classroom.filter(student_id=principal.student_id).exists()
         return False
 
 
@@ -39,18 +37,18 @@ class IsAdminOrTeacherOrInstituteOwner(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        user = request.user
+        principal = get_principal(request)
 
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             return True
 
-        if hasattr(user, 'teacher') and obj.teacher == user.teacher:
+        if principal.is_teacher and obj.teacher_id == principal.teacher_id:
             return True
 
-        if hasattr(user, 'institute') and obj.teacher and obj.teacher.institute == user.institute:
+        if principal.is_institute and obj.teacher_id and obj.teacher.institute_id == principal.institute_id:
             return True
 
         return False
@@ -58,167 +56,153 @@ class IsAdminOrTeacherOrInstituteOwner(permissions.BasePermission):
 
 class IsAdminOrInstituteOrCreatorTeacher(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        user = request.user
+        principal = get_principal(request)
 
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        if user.user_type == 'admin':
+        if principal.is_admin:
             return True
 
-        if hasattr(user, 'institute'):
-            return obj.classroom.teacher.institute_id == user.institute.id
-
-        if hasattr(user, 'teacher'):
-            return obj.classroom.teacher.institute_id == user.teacher.institute_id
+        if principal.is_institute or principal.is_teacher:
+            return obj.classroom.teacher.institute_id == principal.institute_id
 
         return False
 
 
 class IsAdminOrInstituteOrTeacherForQuestion(permissions.BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        if not user.is_authenticated:
+        principal = get_principal(request)
+        if not principal.is_authenticated:
             return False
 
         if request.method in permissions.SAFE_METHODS:
             return True
 
         if request.method == 'POST':
-            return user.user_type == 'admin' or hasattr(user, 'teacher') or hasattr(user, 'institute')
+            return principal.is_admin or principal.is_teacher or principal.is_institute
 
         return True
 
     def has_object_permission(self, request, view, obj):
-        user = request.user
+        principal = get_principal(request)
 
-        if user.user_type == 'admin':
+        if principal.is_admin:
             return True
 
-        if hasattr(user, 'institute'):
-            return obj.exam.classroom.teacher.institute == user.institute
+        teacher = obj.exam.classroom.teacher
+        if teacher is None:
+            return False
+
+        if principal.is_institute:
+            return teacher.institute_id == principal.institute_id
 
-        if hasattr(user, 'teacher'):
-            return obj.exam.classroom.teacher == user.teacher
+        if principal.is_teacher:
+            return teacher.id == principal.teacher_id
 
-        if hasattr(user, 'student') and request.method in permissions.SAFE_METHODS:
-            return obj.exam.classroom.teacher.institute == user.student.institute
+        if principal.is_student and request.method in permissions.SAFE_METHODS:
+            return teacher.institute_id == principal.institute_id
 
         return False
 
 
 class OptionPermission(permissions.BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        if not user.is_authenticated:
+        principal = get_principal(request)
+        if not principal.is_authenticated:
             return False
 
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        if request.method == "POST":
-            return (
-                    user.is_superuser or
-                    hasattr(user, 'teacher') or
-                    hasattr(user, 'institute')
-            )
-
-        if request.method in ['PUT', 'PATCH', 'DELETE']:
-            return (
-                    user.is_superuser or
-                    hasattr(user, 'teacher') or
-                    hasattr(user, 'institute')
-            )
+        if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
+            return principal.is_superuser or principal.is_teacher or principal.is_institute
 
         return False
 
     def has_object_permission(self, request, view, obj):
-        user = request.user
-        exam = obj.question.exam
+        principal = get_principal(request)
 
-        if request.method in permissions.SAFE_METHODS:
-            if user.is_superuser:
-                return True
-            if hasattr(user, 'teacher') and exam.classroom.teacher == user.teacher:
-                return True
-            if hasattr(user, 'institute') and exam.classroom.teacher.institute == user.institute:
-                return True
-            if hasattr(user, 'student') and exam.classroom.teacher.institute == user.student.institute:
-                return True
-            return False
+        if principal.is_superuser:
+            return True
 
-        else:
-            if user.is_superuser:
-                return True
-            if hasattr(user, 'teacher') and exam.classroom.teacher == user.teacher:
-                return True
-            if hasattr(user, 'institute') and exam.classroom.teacher.institute == user.institute:
-                return True
+        teacher = obj.question.exam.classroom.teacher
+        if teacher is None:
             return False
 
+        if principal.is_teacher and teacher.id == principal.teacher_id:
+            return True
+        if principal.is_institute and teacher.institute_id == principal.institute_id:
+            return True
+        if request.method in permissions.SAFE_METHODS:
+            return principal.is_student and teacher.institute_id == principal.institute_id
+        return False
+
 
 class UserAnswerPermission(permissions.BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        if not user.is_authenticated:
+        principal = get_principal(request)
+        if not principal.is_authenticated:
             return False
 
         if request.method == "POST":
-            return user.is_superuser or hasattr(user, 'student')
+            return principal.is_superuser or principal.is_student
 
         if request.method in permissions.SAFE_METHODS or request.method in ["PUT", "PATCH"]:
             return (
-                    user.is_superuser or
-                    hasattr(user, 'student') or
-                    hasattr(user, 'teacher') or
-                    hasattr(user, 'institute')
+                    principal.is_superuser or
+                    principal.is_student or
+                    principal.is_teacher or
+                    principal.is_institute
             )
 
         if request.method == "DELETE":
-            return user.is_superuser or hasattr(user, 'student')
+            return principal.is_superuser or principal.is_student
 
         return False
 
     def has_object_permission(self, request, view, obj):
-        user = request.user
+        principal = get_principal(request)
 
         if request.method in permissions.SAFE_METHODS or request.method in ["PUT", "PATCH"]:
-            if user.is_superuser:
-                return True
-            if hasattr(user, 'student') and obj.user == user.student:
-                return True
-            if hasattr(user, 'teacher') and obj.question.exam.classroom.teacher == user.teacher:
+            if principal.is_superuser:
                 return True
-            if hasattr(user, 'institute') and obj.question.exam.classroom.teacher.institute == user.institute:
+            if principal.is_student and obj.user_id == principal.student_id:
                 return True
+            if principal.is_teacher or principal.is_institute:
+                teacher = obj.question.exam.classroom.teacher
+                if teacher is None:
+                    return False
+                if principal.is_teacher and teacher.id == principal.teacher_id:
+                    return True
+                if principal.is_institute and teacher.institute_id == principal.institute_id:
+                    return True
 
         if request.method == "DELETE":
-            return user.is_superuser
+            return principal.is_superuser
 
         return False
 
 
 class UserOptionsPermission(permissions.BasePermission):
     def has_permission(self, request, view):
-        if request.method == 'POST':
-            return request.user.is_superuser or hasattr(request.user, 'student')
-
         if request.method in permissions.SAFE_METHODS:  # GET, HEAD, OPTIONS
             return True
 
-        if request.method in ['PUT', 'PATCH', 'DELETE']:
-            return request.user.is_superuser or hasattr(request.user, 'student')
+        if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
+            principal = get_principal(request)
+            return principal.is_superuser or principal.is_student
 
         return False
 
     def has_object_permission(self, request, view, obj: UserOptions):
-        user = request.user
+        principal = get_principal(request)
 
         if request.method in ['PUT', 'PATCH', 'DELETE']:
-            if user.is_superuser:
+            if principal.is_superuser:
                 return True
-            if hasattr(user, 'student'):
-                return obj.user == user.student
+            if principal.is_student:
+                return obj.user_id == principal.student_id
 
         if request.method in permissions.SAFE_METHODS:
             return True
@@ -228,36 +212,29 @@ class UserOptionsPermission(permissions.BasePermission):
 
 class FeedbackPermission(permissions.BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-
-        if request.method == 'POST':  # create
-            return user.is_superuser or hasattr(user, 'student')
-
         if request.method in ['GET']:  # list or retrieve
             return True
 
-        if request.method in ['PUT', 'PATCH', 'DELETE']:
-            return user.is_superuser or hasattr(user, 'student')
+        if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:  # create, update, delete
+            principal = get_principal(request)
+            return principal.is_superuser or principal.is_student
 
         return False
 
     def has_object_permission(self, request, view, obj: Feedback):
-        user = request.user
+        principal = get_principal(request)
 
         if request.method == 'GET':  # retrieve
-            if user.is_superuser:
+            if principal.is_superuser:
                 return True
-            if hasattr(user, 'institute'):
-                return obj.exam.classroom.teacher.institute == user.institute
-            if hasattr(user, 'teacher'):
-                return obj.exam.classroom.teacher == user.teacher
-            if hasattr(user, 'student'):
-                return obj.user == user.student
-
-        if request.method in ['PUT', 'PATCH']:
-            return user.is_superuser or (hasattr(user, 'student') and obj.user == user.student)
-
-        if request.method == 'DELETE':
-            return user.is_superuser or (hasattr(user, 'student') and obj.user == user.student)
+            if principal.is_institute:
+                return obj.exam.classroom.teacher.institute_id == principal.institute_id
+            if principal.is_teacher:
+                return obj.exam.classroom.teacher_id == principal.teacher_id
+            if principal.is_student:
+                return obj.user_id == principal.student_id
+
+        if request.method in ['PUT', 'PATCH', 'DELETE']:
+            return principal.is_superuser or (principal.is_student and obj.user_id == principal.student_id)
 
         return False
@@ -0,0 +1,59 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.utils import timezone
+
+from . import cache
+from . import models
+from . import sessions
+
+logger = logging.getLogger(__name__)
+
+PREWARMED_KEY = 'exam:{exam_id}:prewarmed:{paper_version}:{classrooms_version}'
+
+
+def due_exams(lead_minutes=None, now=None):
+    """
+    آزمون‌های فعالی که حداکثر ``lead_minutes`` دقیقه تا شروعشان مانده یا در حال برگزاری هستند.
+    """
+    now = now or timezone.now()
+    lead = timedelta(minutes=settings.EXAM_PREWARM_LEAD_MINUTES if lead_minutes is None else lead_minutes)
+    return models.Exam.objects.filter(status=True, start_time__lte=now + lead, end_time__gt=now).order_by('start_time')
+
+
+def prewarm_exam(exam):
+    """
+    برگه آزمون و زمان‌بندی آن را در کش می‌سازد، فهرست دانش‌آموزان کلاس را از ``StudentClassroom`` می‌خواند و برای
+    همه آن‌ها ردیف و کش جلسه آزمون را آماده می‌کند. تعداد دانش‌آموزان آماده‌شده برگردانده می‌شود.
+    """
+    cache.get_paper(exam.pk, lambda: cache.paper_queryset().filter(pk=exam.pk).first())
+    cache.get_exam_timing(exam.pk)
+    students = cache.get_classroom_students(exam.classroom_id)
+    sessions.prepare(exam, students)
+    return len(students)
+
+
+def prewarm_due_exams(lead_minutes=None, now=None):
+    """
+    آزمون‌های نزدیک به شروع را یک بار آماده می‌کند و گزارش هر آزمون را برمی‌گرداند. آزمونی که پس از آماده شدن
+    تغییر کند یا دانش‌آموز جدیدی به کلاسش اضافه شود، در اجرای بعدی دوباره آماده می‌شود.
+    """
+    report = []
+    for exam in due_exams(lead_minutes, now):
+        key = PREWARMED_KEY.format(
+            exam_id=exam.pk, paper_version=cache.get_paper_version(exam.pk),
+            classrooms_version=cache.get_version(cache.CLASSROOMS_VERSION_KEY),
+        )
+        if django_cache.get(key):
+            continue
+        try:
+            students = prewarm_exam(exam)
+        except Exception:
+            # خطای یک آزمون نباید آماده‌سازی آزمون‌های دیگر را متوقف کند.
+            logger.exception("prewarming exam %s failed", exam.pk)
+            continue
+        django_cache.set(key, True, timeout=settings.EXAM_PAPER_CACHE_TIMEOUT)
+        report.append({'exam': exam.pk, 'start_time': exam.start_time, 'students': students})
+    return report
@@ -0,0 +1,65 @@
+import logging
+
+from django.db.models import F
+
+from . import models
+from . import scoring
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+
+def _apply_delta(exam_id, student_ids, delta):
+    """
+    تغییر نمره را با دستورهای UPDATE گروهی و در دسته‌های ``CHUNK_SIZE`` تایی اعمال می‌کند.
+    تعداد نتایج تغییرکرده برگردانده می‌شود.
+    """
+    if not delta:
+        return 0
+
+    changed = 0
+    for start in range(0, len(student_ids), CHUNK_SIZE):
+        changed += models.UserExamResult.objects.filter(
+            exam_id=exam_id, user_id__in=student_ids[start:start + CHUNK_SIZE]
+        ).update(score=F('score') + delta)
+    return changed
+
+
+def regrade_option(option, was_correct):
+    """
+    پس از تغییر گزینه صحیح، فقط نتیجه دانش‌آموزانی که این گزینه را انتخاب کرده‌اند اصلاح می‌شود.
+    """
+    if was_correct is None or option.is_correct == was_correct:
+        return 0
+
+    question = models.Question.objects.only('score', 'exam_id').get(pk=option.question_id)
+    student_ids = list(
+        models.UserOptions.objects.filter(answer_option=option).values_list('user_id', flat=True).distinct()
+    )
+    delta = question.score if option.is_correct else -question.score
+
+    changed = _apply_delta(question.exam_id, student_ids, delta)
+    scoring.results_changed(question.exam_id, student_ids)
+    logger.info("regraded option %s of exam %s: %s students changed", option.pk, question.exam_id, changed)
+    return changed
+
+
+def regrade_question_score(question, old_score):
+    """
+    پس از تغییر نمره سوال، تفاوت نمره فقط به نتیجه دانش‌آموزانی که پاسخ صحیح داده‌اند اضافه می‌شود.
+    """
+    if old_score is None or question.score == old_score:
+        return 0
+
+    student_ids = list(
+        models.UserOptions.objects.filter(
+            question=question, answer_option__is_correct=True
+        ).values_list('user_id', flat=True).distinct()
+    )
+
+    changed = _apply_delta(question.exam_id, student_ids, question.score - old_score)
+    # حداکثر نمره آزمون و در نتیجه بازه‌های نمودار تغییر کرده است.
+    scoring.results_changed(question.exam_id)
+    logger.info("regraded question %s of exam %s: %s students changed", question.pk, question.exam_id, changed)
+    return changed
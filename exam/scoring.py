@@ -0,0 +1,200 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import cache
+from . import leaderboard
+from . import models
+from .bulk import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+
+def _options_score():
+    return Subquery(
+        models.UserOptions.objects.filter(
+            user_id=OuterRef('user_id'),
+            question__exam_id=OuterRef('exam_id'),
+            answer_option__is_correct=True,
+        ).order_by().values('user_id').annotate(total=Sum('question__score')).values('total')[:1],
+        output_field=FloatField(),
+    )
+
+
+def _answers_score():
+    return Subquery(
+        models.UserAnswer.objects.filter(
+            user_id=OuterRef('user_id'),
+            question__exam_id=OuterRef('exam_id'),
+        ).order_by().values('user_id').annotate(total=Sum('score')).values('total')[:1],
+        output_field=FloatField(),
+    )
+
+
+def results_changed(exam_id, student_ids=None):
+    """
+    پس از تغییر نمره‌های یک آزمون جدول رتبه‌بندی را به‌روز و نسخه نتایج (برای کش تحلیل سوالات) را افزایش می‌دهد.
+    """
+    cache.bump_results_version(exam_id)
+    leaderboard.refresh(exam_id, student_ids)
+
+
+def ensure_results(exam_id, student_ids=None):
+    """
+    برای دانش‌آموزانی که پاسخی ثبت کرده‌اند ولی ردیف نتیجه ندارند، ردیف نتیجه با نمره صفر می‌سازد.
+    """
+    options = models.UserOptions.objects.filter(question__exam_id=exam_id)
+    answers = models.UserAnswer.objects.filter(question__exam_id=exam_id)
+    results = models.UserExamResult.objects.filter(exam_id=exam_id)
+    if student_ids is not None:
+        options = options.filter(user_id__in=student_ids)
+        answers = answers.filter(user_id__in=student_ids)
+        results = results.filter(user_id__in=student_ids)
+
+    missing = set(options.values_list('user_id', flat=True).distinct())
+    missing |= set(answers.values_list('user_id', flat=True).distinct())
+    missing -= set(results.values_list('user_id', flat=True))
+
+    models.UserExamResult.objects.bulk_create(
+        [models.UserExamResult(user_id=student_id, exam_id=exam_id, score=0) for student_id in missing],
+        ignore_conflicts=True,
+    )
+
+
+def recompute_results(exam_id, student_ids=None):
+    """
+    نمره نهایی را مستقیما از پاسخ‌های ذخیره‌شده و با یک دستور UPDATE محاسبه می‌کند:
+    مجموع نمره سوالاتی که گزینه صحیح آن‌ها انتخاب شده به علاوه مجموع نمره پاسخ‌های تشریحی.
+    بدون ``student_ids`` همه نتایج آزمون دوباره محاسبه می‌شوند. تعداد ردیف‌های به‌روزشده برگردانده می‌شود.
+    """
+    ensure_results(exam_id, student_ids)
+
+    results = models.UserExamResult.objects.filter(exam_id=exam_id)
+    if student_ids is not None:
+        results = results.filter(user_id__in=student_ids)
+
+    changed = results.update(
+        score=Coalesce(_options_score(), Value(0.0)) + Coalesce(_answers_score(), Value(0.0))
+    )
+    results_changed(exam_id, student_ids)
+    return changed
+
+
+def recompute_result(student_id, exam_id):
+    return recompute_results(exam_id, [student_id])
+
+
+def increment_score(student_id, exam_id, delta):
+    """
+    نمره نهایی را به صورت اتمیک و در خود پایگاه داده به اندازه ``delta`` تغییر می‌دهد.
+    """
+    models.UserExamResult.objects.get_or_create(user_id=student_id, exam_id=exam_id, defaults={'score': 0})
+    changed = models.UserExamResult.objects.filter(user_id=student_id, exam_id=exam_id).update(
+        score=F('score') + delta
+    )
+    results_changed(exam_id, [student_id])
+    return changed
+
+
+def request_rescore(student_id, exam_id):
+    request_rescores(exam_id, [student_id])
+
+
+def request_rescores(exam_id, student_ids):
+    """
+    در حالت پس‌زمینه فقط یک کار محاسبه ثبت می‌شود و نتیجه «در انتظار» علامت می‌خورد؛
+    در غیر این صورت نمره همان لحظه محاسبه می‌شود.
+    """
+    if settings.EXAM_SCORING_BACKGROUND:
+        enqueue_rescore(exam_id, student_ids)
+    else:
+        recompute_results(exam_id, student_ids)
+
+
+def enqueue_rescore(exam_id, student_ids):
+    """
+    برای هر دانش‌آموز حداکثر یک کار در صف می‌ماند؛ هر درخواست شماره ``generation`` کار را یکی زیاد می‌کند تا
+    پردازشگری که کار را پیش از این درخواست برداشته آن را حذف نکند.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        models.ScoringJob.objects.bulk_create(
+            [models.ScoringJob(user_id=student_id, exam_id=exam_id, requested_at=now) for student_id in student_ids],
+            ignore_conflicts=True,
+        )
+        # قفل ردیف تا پایان تراکنش درخواست‌کننده می‌ماند؛ حذف کار در _finish_jobs تا آن زمان منتظر می‌ماند و
+        # سپس شماره جدید را می‌بیند.
+        models.ScoringJob.objects.filter(exam_id=exam_id, user_id__in=student_ids).update(
+            requested_at=now, generation=F('generation') + 1
+        )
+    bulk_upsert(
+        models.UserExamResult,
+        [models.UserExamResult(user_id=student_id, exam_id=exam_id, is_pending=True) for student_id in student_ids],
+        unique_fields=['exam', 'user'],
+        update_fields=['is_pending'],
+    )
+
+
+def _claim_jobs(batch_size):
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.EXAM_SCORING_CLAIM_TIMEOUT)
+
+    with transaction.atomic():
+        jobs = list(
+            models.ScoringJob.objects.select_for_update(
+                skip_locked=connection.features.has_select_for_update_skip_locked
+            ).filter(
+                Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale)
+            ).order_by('requested_at')[:batch_size]
+        )
+        models.ScoringJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            claimed_at=now, attempts=F('attempts') + 1
+        )
+    return jobs
+
+
+def _finish_jobs(exam_id, jobs):
+    ids = [job.pk for job in jobs]
+    # کارهایی که پس از برداشتن دوباره درخواست شده‌اند (شماره آن‌ها با شماره زمان برداشتن فرق دارد) باقی
+    # می‌مانند تا دوباره محاسبه شوند.
+    ids_by_generation = defaultdict(list)
+    for job in jobs:
+        ids_by_generation[job.generation].append(job.pk)
+    for generation, generation_ids in ids_by_generation.items():
+        models.ScoringJob.objects.filter(pk__in=generation_ids, generation=generation).delete()
+    models.ScoringJob.objects.filter(pk__in=ids).update(claimed_at=None)
+
+    models.UserExamResult.objects.filter(
+        exam_id=exam_id, user_id__in=[job.user_id for job in jobs]
+    ).exclude(
+        Exists(models.ScoringJob.objects.filter(user_id=OuterRef('user_id'), exam_id=OuterRef('exam_id')))
+    ).update(is_pending=False)
+
+
+def process_pending_jobs(batch_size=100):
+    """
+    یک دسته از کارهای صف را برمی‌دارد و نمره هر آزمون را به صورت مجموعه‌ای محاسبه می‌کند.
+    تعداد کارهای پردازش‌شده برگردانده می‌شود.
+    """
+    jobs_by_exam = defaultdict(list)
+    for job in _claim_jobs(batch_size):
+        jobs_by_exam[job.exam_id].append(job)
+
+    for exam_id, jobs in jobs_by_exam.items():
+        try:
+            with transaction.atomic():
+                recompute_results(exam_id, [job.user_id for job in jobs])
+                _finish_jobs(exam_id, jobs)
+        except Exception as exc:
+            logger.exception("scoring jobs for exam %s failed", exam_id)
+            models.ScoringJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                claimed_at=None, last_error=str(exc)
+            )
+
+    return sum(len(jobs) for jobs in jobs_by_exam.values())
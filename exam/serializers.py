@@ -1,13 +1,22 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from core.serializers import StudentSerializer
+from core.serializers import DynamicFieldsMixin, StudentSerializer
+from . import authoring
+from . import autosave
+from . import enrollment
 from . import models
+from . import leaderboard
+from . import scoring
+from . import sessions
+from .bulk import bulk_upsert, upsert
 from core import serializers as core_serializers
 from django.utils import timezone as dj_timezone
 
 
-class ClassroomSerializer(serializers.ModelSerializer):
+class ClassroomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     teacher_id = serializers.PrimaryKeyRelatedField(
         queryset=models.Teacher.objects.all(),
         source='teacher',
@@ -17,10 +26,11 @@ class ClassroomSerializer(serializers.ModelSerializer):
             'incorrect_type': 'شناسه استاد باید عدد باشد.',
         }
     )
-    teacher = core_serializers.TeacherSerializer(read_only=True)
+    teacher = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.Classroom
+        expandable_fields = {'teacher': core_serializers.TeacherSerializer}
         fields = ("id",
                   "name",
                   "grade",
@@ -47,7 +57,7 @@ class ClassroomSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class StudentClassroomSerializer(serializers.ModelSerializer):
+class StudentClassroomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     classroom_id = serializers.IntegerField(write_only=True)
     classroom = serializers.StringRelatedField(read_only=True)
 
@@ -56,6 +66,7 @@ class StudentClassroomSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.StudentClassroom
+        select_related = ('classroom', 'student__account', 'student__major')
         fields = [
             'id',
             'classroom_id',
@@ -92,6 +103,43 @@ class StudentClassroomSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class BulkEnrollmentSerializer(serializers.Serializer):
+    """
+    ثبت‌نام گروهی دانش‌آموزان در یک کلاس با لیست شناسه‌ها و کدهای ملی یا فایل CSV (``file``).
+    کلاس باید در context با کلید ``classroom`` ارسال شود.
+    """
+    student_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    national_codes = serializers.ListField(child=serializers.CharField(max_length=10), required=False, default=list)
+    file = serializers.FileField(required=False, write_only=True)
+
+    def validate(self, attrs):
+        upload = attrs.pop('file', None)
+        if upload is not None:
+            try:
+                student_ids, national_codes = enrollment.read_csv(upload)
+            except UnicodeDecodeError:
+                raise serializers.ValidationError({'file': 'فایل باید با کدگذاری UTF-8 باشد.'})
+            except ValueError as exc:
+                raise serializers.ValidationError({'file': str(exc)})
+            attrs['student_ids'] = attrs['student_ids'] + student_ids
+            attrs['national_codes'] = attrs['national_codes'] + national_codes
+
+        count = len(attrs['student_ids']) + len(attrs['national_codes'])
+        if not count:
+            raise serializers.ValidationError("حداقل یک دانش‌آموز باید ارسال شود.")
+        if count > settings.EXAM_BULK_ENROLLMENT_LIMIT:
+            raise serializers.ValidationError(
+                f"حداکثر {settings.EXAM_BULK_ENROLLMENT_LIMIT} دانش‌آموز در هر درخواست قابل ثبت‌نام است."
+            )
+        return attrs
+
+    def save(self, **kwargs):
+        with transaction.atomic():
+            return enrollment.enroll(
+                self.context['classroom'], self.validated_data['student_ids'], self.validated_data['national_codes']
+            )
+
+
 class MajorSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Major
@@ -106,11 +154,12 @@ class MajorSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ExamCategorySerializer(serializers.ModelSerializer):
-    creator = core_serializers.CustomUserSerializer(read_only=True)
+class ExamCategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    creator = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.ExamCategory
+        expandable_fields = {'creator': core_serializers.CustomUserSerializer}
         fields = "__all__"
 
     def create(self, validated_data):
@@ -123,12 +172,17 @@ class ExamCategorySerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ExamSerializer(serializers.ModelSerializer):
+class ExamSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     classroom = serializers.PrimaryKeyRelatedField(read_only=True)
-    creator = core_serializers.CustomUserSerializer(read_only=True)
+    creator = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.Exam
+        expandable_fields = {
+            'classroom': ClassroomSerializer,
+            'creator': core_serializers.CustomUserSerializer,
+            'category': ExamCategorySerializer,
+        }
         fields = '__all__'
 
     def validate(self, attrs):
@@ -180,25 +234,26 @@ class ExamSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     exam = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.Question
+        expandable_fields = {'exam': ExamSerializer}
         fields = "__all__"
 
     def validate(self, attrs):
         user = self.context['request'].user
         exam_id = self.context['view'].kwargs.get('exam_id')
         try:
-            exam = models.Exam.objects.get(pk=exam_id)
+            exam = models.Exam.objects.select_related('classroom__teacher').get(pk=exam_id)
         except models.Exam.DoesNotExist:
             raise serializers.ValidationError({"exam": "آزمون مشخص‌شده وجود ندارد."})
 
         if not (user.user_type == 'admin' or hasattr(user, 'teacher') or hasattr(user, 'institute')):
             raise serializers.ValidationError("شما اجازه ایجاد سوال را ندارید.")
 
-        if hasattr(user, 'institute') and exam.classroom.teacher.institute != user.institute:
+        if hasattr(user, 'institute') and exam.classroom.teacher.institute_id != user.institute.id:
             raise serializers.ValidationError(
                 "شما نمی‌توانید برای این آزمون سوال بسازید، این آزمون متعلق به موسسه شما نیست.")
 
@@ -212,13 +267,115 @@ class QuestionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class OptionSerializer(serializers.ModelSerializer):
+class NestedOptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.Option
+        fields = ['id', 'text', 'is_correct']
+
+
+class QuestionListSerializer(serializers.ListSerializer):
+
+    def create(self, validated_data):
+        return authoring.create_questions(self.context['exam'], validated_data)
+
+
+class QuestionWithOptionsSerializer(serializers.ModelSerializer):
+    """
+    ساخت سوال به همراه گزینه‌ها در یک درخواست و یک تراکنش؛ با ``many=True`` همه سوالات با ``bulk_create`` ساخته
+    می‌شوند. آزمون باید در context با کلید ``exam`` ارسال شود.
+    """
+    options = NestedOptionSerializer(many=True, required=False)
+
+    class Meta:
+        model = models.Question
+        fields = ['id', 'text', 'question_type', 'score', 'options']
+        list_serializer_class = QuestionListSerializer
+
+    def validate(self, attrs):
+        options = attrs.setdefault('options', [])
+        if attrs['question_type'] == 'Descriptive':
+            if options:
+                raise serializers.ValidationError({'options': "سوال تشریحی گزینه ندارد."})
+        elif len(options) < 2:
+            raise serializers.ValidationError({'options': "سوال تستی باید حداقل دو گزینه داشته باشد."})
+        elif not any(option.get('is_correct', False) for option in options):
+            raise serializers.ValidationError({'options': "حداقل یکی از گزینه‌ها باید صحیح باشد."})
+        return attrs
+
+    def create(self, validated_data):
+        return authoring.create_questions(self.context['exam'], [validated_data])[0]
+
+
+class ExamFileDetailsSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField(max_length=500, allow_blank=True)
+    duration_minutes = serializers.IntegerField(min_value=1)
+    category = serializers.CharField(max_length=100, allow_null=True, required=False)
+
+
+class ExamFileSerializer(serializers.Serializer):
+    """
+    قالب فایل قابل انتقال آزمون (خروجی ``authoring.export_exam``).
+    """
+    format = serializers.CharField()
+    version = serializers.IntegerField()
+    exam = ExamFileDetailsSerializer()
+    questions = QuestionWithOptionsSerializer(many=True)
+
+    def validate(self, attrs):
+        if attrs['format'] != authoring.FILE_FORMAT or attrs['version'] > authoring.FILE_VERSION:
+            raise serializers.ValidationError("قالب یا نسخه فایل آزمون پشتیبانی نمی‌شود.")
+        return attrs
+
+
+class ExamImportSerializer(serializers.Serializer):
+    """
+    ساخت آزمون در کلاس از روی فایل آزمون (``file``) با زمان‌بندی جدید.
+    کلاس باید در context با کلید ``classroom`` ارسال شود.
+    """
+    file = ExamFileSerializer()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    result_show_time = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        start_time, end_time = attrs['start_time'], attrs['end_time']
+        result_show_time = attrs.get('result_show_time')
+
+        if start_time >= end_time:
+            raise serializers.ValidationError("زمان شروع باید قبل از زمان پایان باشد.")
+        if result_show_time is not None and result_show_time < end_time:
+            raise serializers.ValidationError("زمان نمایش پاسخ نباید زودتر از زمان اتمام آزمون باشد.")
+        if attrs['file']['exam']['duration_minutes'] > (end_time - start_time).total_seconds() / 60:
+            raise serializers.ValidationError("مدت زمان آزمون نمی‌تواند بیشتر از فاصله بین زمان شروع و پایان باشد.")
+        return attrs
+
+    def create(self, validated_data):
+        schedule = {
+            'start_time': validated_data['start_time'],
+            'end_time': validated_data['end_time'],
+            'result_show_time': validated_data.get('result_show_time'),
+        }
+        return authoring.import_exam(
+            self.context['classroom'], self.context['request'].user, validated_data['file'], schedule
+        )
+
+
+class AnnouncementSerializer(serializers.Serializer):
+    """
+    اطلاعیه استاد که از کانال زنده به دانش‌آموزان در حال آزمون فرستاده می‌شود.
+    """
+    text = serializers.CharField(max_length=1000)
+
+
+class OptionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     question = serializers.PrimaryKeyRelatedField(read_only=True)
     question_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = models.Option
         fields = ['id', 'question', 'question_id', 'text', 'is_correct']
+        expandable_fields = {'question': QuestionSerializer}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -233,7 +390,144 @@ class OptionSerializer(serializers.ModelSerializer):
                 self.fields.pop('is_correct', None)
 
 
-class UserAnswerSerializer(serializers.ModelSerializer):
+class PaperOptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.Option
+        fields = ['id', 'text', 'is_correct']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.context.get('hide_answers'):
+            data.pop('is_correct', None)
+        return data
+
+
+class PaperQuestionSerializer(serializers.ModelSerializer):
+    options = PaperOptionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = models.Question
+        fields = ['id', 'text', 'question_type', 'score', 'options']
+
+
+class ExamPaperSerializer(serializers.ModelSerializer):
+    """
+    برگه کامل آزمون (سوالات به همراه گزینه‌ها) در یک پاسخ.
+    با ``hide_answers`` در context گزینه صحیح حذف می‌شود.
+    """
+    questions = PaperQuestionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = models.Exam
+        fields = ['id', 'title', 'description', 'start_time', 'end_time', 'duration_minutes', 'classroom',
+                  'questions']
+
+
+class SubmittedAnswerSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    option_id = serializers.IntegerField(required=False)
+    answer_text = serializers.CharField(required=False, allow_blank=True)
+
+
+class ExamSubmissionSerializer(serializers.Serializer):
+    """
+    ثبت یکجای همه پاسخ‌های یک آزمون؛ اعتبارسنجی با یک بار بارگذاری سوالات و گزینه‌های آزمون انجام می‌شود.
+    آزمون باید در context با کلید ``exam`` ارسال شود.
+    """
+    answers = SubmittedAnswerSerializer(many=True, allow_empty=False)
+
+    def validate_answers(self, answers):
+        exam = self.context['exam']
+        questions = {
+            question.id: question
+            for question in exam.questions.prefetch_related('options')
+        }
+
+        seen = set()
+        for answer in answers:
+            question = questions.get(answer['question_id'])
+            if question is None:
+                raise serializers.ValidationError(f"سوال {answer['question_id']} متعلق به این آزمون نیست.")
+
+            if question.id in seen:
+                raise serializers.ValidationError(f"برای سوال {question.id} بیش از یک پاسخ ارسال شده است.")
+            seen.add(question.id)
+
+            if question.question_type == 'Descriptive':
+                if 'answer_text' not in answer:
+                    raise serializers.ValidationError(f"برای سوال تشریحی {question.id} متن پاسخ الزامی است.")
+            else:
+                options = {option.id: option for option in question.options.all()}
+                option = options.get(answer.get('option_id'))
+                if option is None:
+                    raise serializers.ValidationError(f"گزینه انتخاب‌شده برای سوال {question.id} معتبر نیست.")
+                answer['option'] = option
+
+            answer['question'] = question
+
+        return answers
+
+    def save(self, student):
+        exam = self.context['exam']
+        answers = self.validated_data['answers']
+
+        options = [
+            models.UserOptions(user=student, question=answer['question'], answer_option=answer['option'])
+            for answer in answers if 'option' in answer
+        ]
+        texts = [
+            models.UserAnswer(user=student, question=answer['question'], answer_text=answer['answer_text'])
+            for answer in answers if 'option' not in answer
+        ]
+
+        autosave.discard(exam.id, student.id, [answer['question'].id for answer in answers])
+        with transaction.atomic():
+            bulk_upsert(models.UserOptions, options, ['question', 'user'], ['answer_option'])
+            bulk_upsert(models.UserAnswer, texts, ['question', 'user'], ['answer_text'])
+            scoring.request_rescore(student.id, exam.id)
+
+        return {
+            'options_saved': len(options),
+            'answers_saved': len(texts),
+        }
+
+
+class AutosaveSerializer(serializers.Serializer):
+    """
+    پیش‌نویس پاسخ‌های جلسه در حال انجام. اعتبارسنجی فقط با برگه کش‌شده آزمون انجام می‌شود که باید در context با
+    کلید ``paper`` ارسال شود. پاسخی که نه گزینه دارد و نه متن، پاسخ قبلی سوال را پاک می‌کند.
+    """
+    answers = SubmittedAnswerSerializer(many=True, allow_empty=False)
+
+    def validate_answers(self, answers):
+        choices = self.context['paper']['choices']
+        drafts = {}
+        for answer in answers:
+            question_id = answer['question_id']
+            if question_id not in choices:
+                raise serializers.ValidationError(f"سوال {question_id} متعلق به این آزمون نیست.")
+            if question_id in drafts:
+                raise serializers.ValidationError(f"برای سوال {question_id} بیش از یک پاسخ ارسال شده است.")
+
+            options = choices[question_id]
+            if 'option_id' in answer and (options is None or answer['option_id'] not in options):
+                raise serializers.ValidationError(f"گزینه انتخاب‌شده برای سوال {question_id} معتبر نیست.")
+            if 'answer_text' in answer and options is not None:
+                raise serializers.ValidationError(f"برای سوال تستی {question_id} باید گزینه ارسال شود.")
+
+            drafts[question_id] = {'option': answer.get('option_id'), 'text': answer.get('answer_text')}
+        return drafts
+
+    def to_representation(self, drafts):
+        return {
+            'answers': [
+                {'question_id': question_id, 'option_id': draft['option'], 'answer_text': draft['text']}
+                for question_id, draft in sorted(drafts.items())
+            ],
+        }
+
+
+class UserAnswerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_id = serializers.PrimaryKeyRelatedField(
         queryset=models.Student.objects.all(),
         source="user",
@@ -246,18 +540,15 @@ class UserAnswerSerializer(serializers.ModelSerializer):
         write_only=True
     )
 
-    user = serializers.SerializerMethodField(read_only=True)
-    question = serializers.SerializerMethodField(read_only=True)
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    question = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.UserAnswer
         fields = ['id', 'user', 'user_id', 'question', 'question_id', 'answer_text', 'score']
-
-    def get_user(self, obj):
-        return StudentSerializer(obj.user).data
-
-    def get_question(self, obj):
-        return QuestionSerializer(obj.question).data
+        expandable_fields = {'user': StudentSerializer, 'question': QuestionSerializer}
+        # پاسخ تکراری با upsert جایگزین می‌شود، پس اعتبارسنج یکتایی DRF لازم نیست.
+        validators = []
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -276,30 +567,14 @@ class UserAnswerSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         user = self.context['request'].user
-        question = attrs.get('question') or (self.instance.question if self.instance else None)
+
+        if hasattr(user, 'student'):
+            question = self.instance.question if self.instance else attrs['question']
+            sessions.ensure_writable(user.student.id, question.exam)
 
         if hasattr(user, 'student') and self.instance is None:
             attrs['user'] = user.student
 
-        if self.instance is None:
-            if hasattr(user, 'student'):
-                already_exists = models.UserAnswer.objects.filter(
-                    question=question,
-                    user=user.student
-                ).exists()
-                if already_exists:
-                    raise serializers.ValidationError("شما قبلاً به این سوال پاسخ داده‌اید.")
-
-            elif user.is_superuser:
-                target_user = attrs.get('user')
-                if target_user:
-                    already_exists = models.UserAnswer.objects.filter(
-                        question=question,
-                        user=target_user
-                    ).exists()
-                    if already_exists:
-                        raise serializers.ValidationError("این دانش‌آموز قبلاً به این سوال پاسخ داده است.")
-
         if self.instance and not hasattr(user, 'student'):
             score = attrs.get('score')
             if score is not None and score > self.instance.question.score:
@@ -309,28 +584,26 @@ class UserAnswerSerializer(serializers.ModelSerializer):
 
         return attrs
 
+    def create(self, validated_data):
+        # پاسخ دوباره به همان سوال، پاسخ قبلی را جایگزین می‌کند.
+        update_fields = [field for field in ('answer_text', 'score') if field in validated_data]
+        if 'answer_text' in validated_data:
+            autosave.discard(validated_data['question'].exam_id, validated_data['user'].id,
+                             [validated_data['question'].id])
+        instance = upsert(models.UserAnswer(**validated_data), ['question', 'user'], update_fields)
+        if 'score' in validated_data:
+            scoring.request_rescore(instance.user_id, instance.question.exam_id)
+        return instance
+
     def update(self, instance, validated_data):
-        old_score = instance.score
+        if 'answer_text' in validated_data:
+            autosave.discard(instance.question.exam_id, instance.user_id, [instance.question_id])
         instance = super().update(instance, validated_data)
-        self._update_exam_score(instance, old_score)
+        scoring.request_rescore(instance.user_id, instance.question.exam_id)
         return instance
 
-    def _update_exam_score(self, instance, old_score):
-        student = instance.user
-        exam = instance.question.exam
-        new_score = instance.score
-
-        exam_result, created = models.UserExamResult.objects.get_or_create(
-            user=student, exam=exam,
-            defaults={'score': 0}
-        )
-
-        exam_result.score -= old_score
-        exam_result.score += new_score
-        exam_result.save()
 
-
-class UserOptionsSerializer(serializers.ModelSerializer):
+class UserOptionsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_id = serializers.PrimaryKeyRelatedField(
         queryset=models.Student.objects.all(),
         source="user",
@@ -348,9 +621,9 @@ class UserOptionsSerializer(serializers.ModelSerializer):
         write_only=True
     )
 
-    user = serializers.SerializerMethodField(read_only=True)
-    question = serializers.SerializerMethodField(read_only=True)
-    answer_option = serializers.SerializerMethodField(read_only=True)
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    question = serializers.PrimaryKeyRelatedField(read_only=True)
+    answer_option = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.UserOptions
@@ -360,15 +633,12 @@ class UserOptionsSerializer(serializers.ModelSerializer):
             'question', 'question_id',
             'answer_option', 'answer_option_id'
         ]
-
-    def get_user(self, obj):
-        return StudentSerializer(obj.user).data
-
-    def get_question(self, obj):
-        return QuestionSerializer(obj.question).data
-
-    def get_answer_option(self, obj):
-        return OptionSerializer(obj.answer_option).data
+        expandable_fields = {
+            'user': StudentSerializer,
+            'question': QuestionSerializer,
+            'answer_option': OptionSerializer,
+        }
+        validators = []
 
     def validate(self, attrs):
         user = self.context['request'].user
@@ -380,6 +650,7 @@ class UserOptionsSerializer(serializers.ModelSerializer):
         if hasattr(user, 'student'):
             if question.exam.classroom.teacher.institute != user.student.institute:
                 raise serializers.ValidationError('شما اجازه پاسخ به این سوال را ندارید.')
+            sessions.ensure_writable(user.student.id, question.exam)
             attrs['user'] = user.student
 
         elif user.is_superuser:
@@ -391,40 +662,19 @@ class UserOptionsSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        instance = super().create(validated_data)
-        self._update_exam_score(instance, None)
+        autosave.discard(validated_data['question'].exam_id, validated_data['user'].id, [validated_data['question'].id])
+        instance = upsert(models.UserOptions(**validated_data), ['question', 'user'], ['answer_option'])
+        scoring.request_rescore(instance.user_id, instance.question.exam_id)
         return instance
 
     def update(self, instance, validated_data):
-        old_option = instance.answer_option
+        autosave.discard(instance.question.exam_id, instance.user_id, [instance.question_id])
         instance = super().update(instance, validated_data)
-        self._update_exam_score(instance, old_option)
+        scoring.request_rescore(instance.user_id, instance.question.exam_id)
         return instance
 
-    def _update_exam_score(self, instance, old_option):
-        student = instance.user
-        exam = instance.question.exam
-        question_score = instance.question.score
-        new_option = instance.answer_option
-
-        exam_result, created = models.UserExamResult.objects.get_or_create(
-            user=student, exam=exam,
-            defaults={'score': 0}
-        )
-
-        old_correct = old_option.is_correct if old_option else False
-        new_correct = new_option.is_correct
-
-        if not old_correct and new_correct:
-            exam_result.score += question_score
-            exam_result.save()
-
-        elif old_correct and not new_correct:
-            exam_result.score -= question_score
-            exam_result.save()
-
 
-class UserExamResultSerializer(serializers.ModelSerializer):
+class UserExamResultSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_id = serializers.PrimaryKeyRelatedField(
         queryset=models.Student.objects.all(),
         source="user",
@@ -437,43 +687,34 @@ class UserExamResultSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
-    user = serializers.SerializerMethodField(read_only=True)
-    exam = serializers.SerializerMethodField(read_only=True)
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    exam = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.UserExamResult
-        fields = ['id', 'user', 'user_id', 'exam', 'exam_id', 'score']
-
-    def get_user(self, obj):
-        return StudentSerializer(obj.user).data
+        fields = ['id', 'user', 'user_id', 'exam', 'exam_id', 'score', 'is_pending']
+        expandable_fields = {'user': StudentSerializer, 'exam': ExamSerializer}
+        read_only_fields = ['is_pending']
 
-    def get_exam(self, obj):
-        return ExamSerializer(obj.exam).data
 
-
-class UserExamTimeSerializer(serializers.ModelSerializer):
+class UserExamTimeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     exam_id = serializers.PrimaryKeyRelatedField(
         queryset=models.Exam.objects.all(),
         source="exam",
         write_only=True,
         required=False
     )
-    user = serializers.SerializerMethodField(read_only=True)
-    exam = serializers.SerializerMethodField(read_only=True)
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    exam = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.UserExamTime
-        fields = ['exam_id', 'user', 'exam', 'finish_time']
-        read_only_fields = ['user', 'finish_time']
+        fields = ['exam_id', 'user', 'exam', 'status', 'started_at', 'finish_time', 'submitted_at']
+        expandable_fields = {'user': StudentSerializer, 'exam': ExamSerializer}
+        read_only_fields = ['user', 'status', 'started_at', 'finish_time', 'submitted_at']
 
-    def get_user(self, obj):
-        return StudentSerializer(obj.user).data
 
-    def get_exam(self, obj):
-        return ExamSerializer(obj.exam).data
-
-
-class FeedbackSerializer(serializers.ModelSerializer):
+class FeedbackSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_id = serializers.PrimaryKeyRelatedField(
         queryset=models.Student.objects.all(),
         source="user",
@@ -486,12 +727,13 @@ class FeedbackSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
-    user = serializers.SerializerMethodField(read_only=True)
-    exam = serializers.SerializerMethodField(read_only=True)
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    exam = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = models.Feedback
         fields = '__all__'
+        expandable_fields = {'user': StudentSerializer, 'exam': ExamSerializer}
         read_only_fields = ['user']
 
     def create(self, validated_data):
@@ -500,8 +742,46 @@ class FeedbackSerializer(serializers.ModelSerializer):
             validated_data['user'] = user.student
         return super().create(validated_data)
 
-    def get_user(self, obj):
-        return StudentSerializer(obj.user).data
 
-    def get_exam(self, obj):
-        return ExamSerializer(obj.exam).data
+
+class LeaderboardStudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    اطلاعات عمومی دانش‌آموز در جدول رتبه‌بندی که هم‌کلاسی‌ها هم می‌بینند؛ کد ملی، تلفن و تاریخ تولد را ندارد.
+    """
+    name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.Student
+        fields = ['id', 'name']
+        select_related = ('account',)
+
+    def get_name(self, obj):
+        return obj.account.get_full_name() or obj.account.username
+
+
+class LeaderboardEntrySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    # صدک ذخیره نمی‌شود و view آن را از روی رتبه و تعداد شرکت‌کنندگان محاسبه می‌کند.
+    percentile = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = models.LeaderboardEntry
+        fields = ['user', 'score', 'rank', 'dense_rank', 'percentile']
+        expandable_fields = {'user': StudentSerializer}
+
+
+class StudentLeaderboardEntrySerializer(LeaderboardEntrySerializer):
+
+    class Meta(LeaderboardEntrySerializer.Meta):
+        expandable_fields = {'user': LeaderboardStudentSerializer}
+
+
+class LeaderboardSerializer(serializers.ModelSerializer):
+    buckets = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.Leaderboard
+        fields = ['exam', 'participants', 'max_score', 'buckets', 'updated_at']
+
+    def get_buckets(self, obj):
+        return leaderboard.histogram_buckets(obj)
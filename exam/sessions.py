@@ -0,0 +1,223 @@
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from . import autosave
+from . import consts
+from . import live
+from . import models
+from . import scoring
+
+SESSION_KEY = 'exam:{exam_id}:session:{student_id}'
+
+FIELDS = ('status', 'started_at', 'finish_time', 'submitted_at')
+
+NOT_STARTED = {'status': consts.SESSION_NOT_STARTED, 'started_at': None, 'finish_time': None, 'submitted_at': None}
+
+CLOSED = consts.SESSION_CLOSED
+
+MESSAGES = {
+    consts.SESSION_SUBMITTED: 'پاسخ‌های این آزمون ثبت نهایی شده است.',
+    consts.SESSION_EXPIRED: 'زمان پاسخ‌گویی به این آزمون به پایان رسیده است.',
+}
+
+
+def _key(student_id, exam_id):
+    return SESSION_KEY.format(exam_id=exam_id, student_id=student_id)
+
+
+def _remember(student_id, exam_id, session):
+    cache.set(_key(student_id, exam_id), session, timeout=settings.EXAM_SESSION_CACHE_TIMEOUT)
+    return session
+
+
+def get_session(student_id, exam_id):
+    """
+    وضعیت جلسه دانش‌آموز در آزمون (دیکشنری ``FIELDS``) را از کش و در صورت نبود از پایگاه داده برمی‌گرداند.
+    نبود ردیف هم به صورت «شروع نشده» در کش نگه داشته می‌شود.
+    """
+    session = cache.get(_key(student_id, exam_id))
+    if session is None:
+        session = models.UserExamTime.objects.filter(user_id=student_id, exam_id=exam_id).values(*FIELDS).first()
+        session = _remember(student_id, exam_id, session or NOT_STARTED)
+    return session
+
+
+def is_overdue(session, now=None):
+    deadline = session['finish_time'] + timedelta(seconds=settings.EXAM_SESSION_GRACE_SECONDS)
+    return (now or timezone.now()) > deadline
+
+
+def heartbeat(student_id, exam_id, timing, now=None):
+    """
+    داده‌های زمان‌سنج صفحه آزمون: زمان سرور، وضعیت آزمون، وضعیت جلسه و ثانیه‌های باقی‌مانده تا شروع آزمون و
+    پایان جلسه. ``timing`` خروجی ``cache.get_exam_timing`` است و جلسه از کش خوانده می‌شود.
+    """
+    return describe(exam_id, get_session(student_id, exam_id), timing, now)
+
+
+def describe(exam_id, session, timing, now=None):
+    """
+    داده‌های زمان‌سنج را بدون هیچ دسترسی به کش یا پایگاه داده از روی جلسه و زمان‌بندی آزمون می‌سازد.
+    """
+    now = now or timezone.now()
+    if now < timing['start_time']:
+        exam_status = consts.EXAM_UPCOMING
+    elif now <= timing['end_time']:
+        exam_status = consts.EXAM_RUNNING
+    else:
+        exam_status = consts.EXAM_ENDED
+
+    status = session['status']
+    remaining = None
+    if status == consts.SESSION_IN_PROGRESS:
+        # جلسه‌ای که مهلتش گذشته ولی هنوز sweep_exam_sessions آن را نبسته است.
+        if is_overdue(session, now):
+            status = consts.SESSION_EXPIRED
+        remaining = max(int((session['finish_time'] - now).total_seconds()), 0)
+    elif status in CLOSED:
+        remaining = 0
+
+    return {
+        'server_time': now,
+        'exam': exam_id,
+        'exam_status': exam_status,
+        'starts_in': max(int((timing['start_time'] - now).total_seconds()), 0),
+        'status': status,
+        'finish_time': session['finish_time'],
+        'remaining_seconds': remaining,
+    }
+
+
+def prepare(exam, student_ids, batch_size=1000):
+    """
+    پیش از شروع آزمون برای دانش‌آموزانی از ``student_ids`` که ردیف جلسه ندارند، در دسته‌های ``batch_size`` تایی
+    با ``bulk_create`` ردیف جلسه «شروع نشده» می‌سازد و فقط همین جلسه‌ها را با ``cache.add`` در کش قرار می‌دهد.
+    ردیف‌های موجود و کش آن‌ها تغییری نمی‌کنند؛ جلسه‌ای که در این فاصله شروع یا ثبت نهایی شده با مقدار قدیمی‌تری
+    بازنویسی نمی‌شود.
+    """
+    student_ids = list(student_ids)
+    for offset in range(0, len(student_ids), batch_size):
+        batch = student_ids[offset:offset + batch_size]
+        existing = set(
+            models.UserExamTime.objects.filter(exam=exam, user_id__in=batch).values_list('user_id', flat=True)
+        )
+        missing = [student_id for student_id in batch if student_id not in existing]
+        models.UserExamTime.objects.bulk_create(
+            [models.UserExamTime(user_id=student_id, exam=exam) for student_id in missing], ignore_conflicts=True,
+        )
+        for student_id in missing:
+            cache.add(_key(student_id, exam.pk), NOT_STARTED, timeout=settings.EXAM_SESSION_CACHE_TIMEOUT)
+
+
+def start(student_id, exam):
+    """
+    جلسه آزمون را شروع می‌کند و (ردیف جلسه، ساخته شدن ردیف) را برمی‌گرداند. پایان جلسه مدت آزمون پس از شروع است
+    ولی از زمان پایان آزمون جلوتر نمی‌رود. شروع دوباره جلسه‌ای که قبلا شروع شده چیزی را تغییر نمی‌دهد.
+    """
+    now = timezone.now()
+    if exam.start_time > now:
+        raise ValidationError({'detail': 'آزمون هنوز شروع نشده است.'})
+    if exam.end_time < now:
+        raise ValidationError({'detail': 'زمان انجام آزمون به پایان رسیده است.'})
+
+    started = {
+        'status': consts.SESSION_IN_PROGRESS,
+        'started_at': now,
+        'finish_time': min(now + timedelta(minutes=exam.duration_minutes), exam.end_time),
+    }
+    row, created = models.UserExamTime.objects.get_or_create(user_id=student_id, exam=exam, defaults=started)
+    if not created and row.status == consts.SESSION_NOT_STARTED:
+        # ردیف‌هایی که پیش از شروع آزمون ساخته شده‌اند؛ شرط وضعیت از شروع هم‌زمان دوباره جلوگیری می‌کند.
+        models.UserExamTime.objects.filter(pk=row.pk, status=consts.SESSION_NOT_STARTED).update(**started)
+        row.refresh_from_db()
+
+    _remember(student_id, exam.pk, {field: getattr(row, field) for field in FIELDS})
+    return row, created
+
+
+def ensure_writable(student_id, exam):
+    """
+    پیش از هر ثبت یا تغییر پاسخ دانش‌آموز فراخوانی می‌شود. در حالت عادی فقط وضعیت جلسه از کش خوانده و مهلت
+    آن در حافظه بررسی می‌شود. اولین پاسخ جلسه‌ای را که شروع نشده شروع می‌کند.
+    """
+    session = get_session(student_id, exam.pk)
+    if session['status'] == consts.SESSION_NOT_STARTED:
+        row, _ = start(student_id, exam)
+        session = {field: getattr(row, field) for field in FIELDS}
+
+    if session['status'] in CLOSED:
+        raise PermissionDenied(MESSAGES[session['status']])
+    if is_overdue(session):
+        raise PermissionDenied(MESSAGES[consts.SESSION_EXPIRED])
+
+
+def submit(student_id, exam):
+    """
+    جلسه در حال انجام را ثبت نهایی می‌کند و ردیف جلسه را برمی‌گرداند. ثبت پس از پایان مهلت جلسه را «پایان زمان»
+    با زمان ثبت برابر پایان جلسه می‌بندد. پیش‌نویس‌های ذخیره خودکار پیش از بستن جلسه نوشته می‌شوند و نمره نهایی
+    دوباره محاسبه می‌شود.
+    """
+    session = get_session(student_id, exam.pk)
+    if session['status'] == consts.SESSION_NOT_STARTED:
+        raise ValidationError({'detail': 'این آزمون هنوز شروع نشده است.'})
+    if session['status'] in CLOSED:
+        raise PermissionDenied(MESSAGES[session['status']])
+
+    now = timezone.now()
+    if is_overdue(session, now):
+        closed = {'status': consts.SESSION_EXPIRED, 'submitted_at': session['finish_time']}
+    else:
+        closed = {'status': consts.SESSION_SUBMITTED, 'submitted_at': now}
+    # جلسه در همان تراکنش و قفلی بسته می‌شود که پیش‌نویس‌ها با آن نوشته می‌شوند؛ پیش‌نویسی که پس از آن برسد
+    # دیگر نوشته نمی‌شود.
+    autosave.flush(exam.pk, [student_id], close=lambda: models.UserExamTime.objects.filter(
+        user_id=student_id, exam_id=exam.pk, status=consts.SESSION_IN_PROGRESS,
+    ).update(**closed))
+    scoring.request_rescore(student_id, exam.pk)
+
+    row = models.UserExamTime.objects.get(user_id=student_id, exam_id=exam.pk)
+    _remember(student_id, exam.pk, {field: getattr(row, field) for field in FIELDS})
+    return row
+
+
+def _expire(ids):
+    models.UserExamTime.objects.filter(pk__in=ids, status=consts.SESSION_IN_PROGRESS).update(
+        status=consts.SESSION_EXPIRED, submitted_at=F('finish_time')
+    )
+
+
+def sweep_expired(batch_size=1000, now=None):
+    """
+    یک دسته از جلسه‌های در حال انجامی را که مهلتشان گذشته پس از نوشتن پیش‌نویس‌های ذخیره خودکارشان با یک
+    UPDATE برای هر آزمون می‌بندد (زمان ثبت برابر پایان جلسه)، نمره آن‌ها را برای هر آزمون یکجا دوباره محاسبه می‌کند و به
+    اتصال‌های زنده آزمون خبر می‌دهد. تعداد جلسه‌های بسته‌شده برگردانده می‌شود.
+    """
+    deadline = (now or timezone.now()) - timedelta(seconds=settings.EXAM_SESSION_GRACE_SECONDS)
+    rows = list(
+        models.UserExamTime.objects.filter(status=consts.SESSION_IN_PROGRESS, finish_time__lt=deadline)
+        .order_by('finish_time').values_list('pk', 'exam_id', 'user_id')[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    ids_by_exam, students_by_exam = defaultdict(list), defaultdict(list)
+    for pk, exam_id, student_id in rows:
+        ids_by_exam[exam_id].append(pk)
+        students_by_exam[exam_id].append(student_id)
+    for exam_id, student_ids in students_by_exam.items():
+        autosave.flush(exam_id, student_ids, close=partial(_expire, ids_by_exam[exam_id]))
+
+    for exam_id, student_ids in students_by_exam.items():
+        scoring.request_rescores(exam_id, student_ids)
+
+    cache.delete_many([_key(student_id, exam_id) for _, exam_id, student_id in rows])
+    for exam_id, student_ids in students_by_exam.items():
+        live.notify_forced_submit(exam_id, student_ids)
+    return len(rows)
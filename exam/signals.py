@@ -0,0 +1,114 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.models import CustomUser, Institute, Student, Teacher
+from . import cache
+from . import leaderboard
+from . import regrade
+from . import scoring
+from .models import Classroom, Exam, ExamCategory, Option, Question, StudentClassroom, UserExamResult
+
+
+def _option_exam_id(option):
+    if Option.question.is_cached(option):
+        return option.question.exam_id
+    return Question.objects.filter(pk=option.question_id).values_list('exam_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    cache.bump_paper_version(instance.pk)
+    cache.bump_classroom_exams_version(instance.classroom_id)
+    cache.bump_version(cache.RELATED_VERSION_KEY)
+    previous = getattr(instance, '_previous_classroom_id', None)
+    if previous is not None and previous != instance.classroom_id:
+        cache.bump_classroom_exams_version(previous)
+
+
+@receiver(pre_save, sender=Exam)
+def remember_exam_classroom(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_classroom_id = Exam.objects.filter(pk=instance.pk).values_list(
+            'classroom_id', flat=True
+        ).first()
+
+
+@receiver([post_save, post_delete], sender=Classroom)
+def classroom_changed(sender, instance, **kwargs):
+    cache.bump_version(cache.CLASSROOMS_VERSION_KEY)
+    cache.bump_version(cache.RELATED_VERSION_KEY)
+
+
+@receiver([post_save, post_delete], sender=StudentClassroom)
+def student_classroom_changed(sender, instance, **kwargs):
+    cache.bump_version(cache.CLASSROOMS_VERSION_KEY)
+
+
+@receiver(pre_delete, sender=ExamCategory)
+def category_deleted(sender, instance, **kwargs):
+    # حذف دسته‌بندی فیلد category آزمون‌ها را بدون ارسال سیگنال NULL می‌کند.
+    classroom_ids = Exam.objects.filter(category=instance).order_by().values_list('classroom_id', flat=True)
+    for classroom_id in classroom_ids.distinct():
+        cache.bump_classroom_exams_version(classroom_id)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+@receiver([post_save, post_delete], sender=Institute)
+@receiver([post_save, post_delete], sender=Teacher)
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=ExamCategory)
+def related_changed(sender, instance, update_fields=None, **kwargs):
+    # ثبت زمان ورود در خروجی هیچ لیستی دیده نمی‌شود.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    cache.bump_version(cache.RELATED_VERSION_KEY)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, raw=False, **kwargs):
+    cache.bump_paper_version(instance.exam_id)
+    cache.bump_question_options_version(instance.pk)
+    if not raw:
+        leaderboard.rescale(instance.exam_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_changed(sender, instance, **kwargs):
+    cache.bump_question_options_version(instance.question_id)
+    exam_id = _option_exam_id(instance)
+    if exam_id is not None:
+        cache.bump_paper_version(exam_id)
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_score(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_score = Question.objects.filter(pk=instance.pk).values_list('score', flat=True).first()
+
+
+@receiver(pre_save, sender=Option)
+def remember_option_key(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_is_correct = Option.objects.filter(
+            pk=instance.pk
+        ).values_list('is_correct', flat=True).first()
+
+
+@receiver(post_save, sender=Question)
+def regrade_question(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        instance.regraded_students = regrade.regrade_question_score(
+            instance, getattr(instance, '_previous_score', None)
+        )
+
+
+@receiver(post_save, sender=Option)
+def regrade_option(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        instance.regraded_students = regrade.regrade_option(instance, getattr(instance, '_previous_is_correct', None))
+
+
+@receiver([post_save, post_delete], sender=UserExamResult)
+def result_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        scoring.results_changed(instance.exam_id, [instance.user_id])
@@ -1,3 +1,1631 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.models import CustomUser, Institute, Teacher, Student
+from . import analytics
+from . import authoring
+from . import autosave
+from . import benchmarks
+from . import cache as exam_cache
+from . import exports
+from . import leaderboard
+from . import live
+from . import models
+from . import prewarm
+from . import scoring
+from . import serializers
+from . import sessions
+
+
+class ExamDataMixin:
+    """
+    داده‌های پایه مشترک بین تست‌ها: یک موسسه، یک استاد، یک کلاس و یک آزمون.
+    """
+
+    @classmethod
+    def create_institute(cls, name='institute'):
+        account = CustomUser.objects.create_user(username=name, password='pass', user_type='institute')
+        return Institute.objects.create(account=account, name=name, registration_code=name, address='-', phone='1')
+
+    @classmethod
+    def create_teacher(cls, institute, username='teacher'):
+        account = CustomUser.objects.create_user(username=username, password='pass', user_type='teacher')
+        return Teacher.objects.create(account=account, institute=institute, national_code=username[-10:],
+                                      phone_number='1', expertise='-')
+
+    @classmethod
+    def create_student(cls, institute, username):
+        account = CustomUser.objects.create_user(username=username, password='pass', user_type='student')
+        return Student.objects.create(account=account, institute=institute, national_code=username[-10:],
+                                      phone_number='1', major=cls.major)
+
+    @classmethod
+    def create_question(cls, exam, score=2, options=4, question_type='MultipleChoice'):
+        question = models.Question.objects.create(exam=exam, text='q', question_type=question_type, score=score)
+        if question_type != 'Descriptive':
+            models.Option.objects.bulk_create(
+                models.Option(question=question, text=f'o{i}', is_correct=(i == 0)) for i in range(options)
+            )
+        return question
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.major = models.Major.objects.create(name='major')
+        cls.institute = cls.create_institute()
+        cls.teacher = cls.create_teacher(cls.institute)
+        cls.student = cls.create_student(cls.institute, 'student')
+        cls.classroom = models.Classroom.objects.create(name='class', teacher=cls.teacher, grade='bachelor')
+        models.StudentClassroom.objects.create(classroom=cls.classroom, student=cls.student)
+
+        now = timezone.now()
+        cls.exam = models.Exam.objects.create(
+            title='exam', description='-', start_time=now - timedelta(minutes=10),
+            end_time=now + timedelta(hours=1), duration_minutes=60, result_show_time=now + timedelta(hours=2),
+            classroom=cls.classroom, creator=cls.teacher.account,
+        )
+
+
+class ExamPaperAPITests(ExamDataMixin, APITestCase):
+
+    def paper_url(self, exam=None):
+        return f'/api/exam/exams/{(exam or self.exam).id}/paper/'
+
+    def test_paper_contains_questions_and_options(self):
+        for _ in range(3):
+            self.create_question(self.exam)
+
+        self.client.force_authenticate(self.teacher.account)
+        response = self.client.get(self.paper_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['questions']), 3)
+        self.assertEqual(len(response.json()['questions'][0]['options']), 4)
+        self.assertIn('is_correct', response.json()['questions'][0]['options'][0])
+
+    def test_student_does_not_see_correct_option_before_end_time(self):
+        self.create_question(self.exam)
+
+        self.client.force_authenticate(self.student.account)
+        response = self.client.get(self.paper_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('is_correct', response.json()['questions'][0]['options'][0])
+
+    def test_query_count_does_not_grow_with_questions(self):
+        self.create_question(self.exam)
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.student.account_id))
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.paper_url())
+
+        for _ in range(20):
+            self.create_question(self.exam)
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.student.account_id))
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.paper_url())
+
+        self.assertEqual(len(small), len(large))
+
+    def test_other_institute_cannot_read_paper(self):
+        other = self.create_institute('other')
+        self.client.force_authenticate(other.account)
+        response = self.client.get(self.paper_url())
+        self.assertEqual(response.status_code, 404)
+
+    def test_repeated_paper_requests_do_not_touch_exam_tables(self):
+        self.create_question(self.exam)
+        self.client.force_authenticate(self.student.account)
+        first = self.client.get(self.paper_url())
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.paper_url())
+
+        self.assertEqual(first.content, second.content)
+        self.assertFalse([q for q in queries if 'exam_' in q['sql']])
+
+    def test_admin_paper_request_only_authenticates_when_cached(self):
+        admin = CustomUser.objects.create_superuser(username='admin', password='pass')
+        token = Token.objects.create(user=admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get(self.paper_url())
+
+        # تنها کوئری، خواندن توکن همراه کاربر و پروفایل‌های اوست.
+        with self.assertNumQueries(1):
+            self.client.get(self.paper_url())
+
+    def test_option_change_invalidates_cached_paper(self):
+        question = self.create_question(self.exam)
+        self.client.force_authenticate(self.teacher.account)
+        self.client.get(self.paper_url())
+
+        option = question.options.first()
+        option.text = 'changed'
+        option.save()
+
+        response = self.client.get(self.paper_url())
+        self.assertEqual(response.json()['questions'][0]['options'][0]['text'], 'changed')
+
+    def test_new_question_invalidates_cached_paper(self):
+        self.client.force_authenticate(self.teacher.account)
+        self.client.get(self.paper_url())
+
+        self.create_question(self.exam)
+
+        response = self.client.get(self.paper_url())
+        self.assertEqual(len(response.json()['questions']), 1)
+
+
+class ExamSubmitAPITests(ExamDataMixin, APITestCase):
+
+    def submit_url(self):
+        return f'/api/exam/exams/{self.exam.id}/submit/'
+
+    def setUp(self):
+        super().setUp()
+        self.questions = [self.create_question(self.exam, score=2) for _ in range(5)]
+        self.descriptive = self.create_question(self.exam, question_type='Descriptive')
+        sessions.start(self.student.id, self.exam)
+        self.client.force_authenticate(self.student.account)
+
+    def build_answers(self, correct=True):
+        answers = [
+            {'question_id': q.id, 'option_id': q.options.get(is_correct=correct).id
+             if correct else q.options.filter(is_correct=False).first().id}
+            for q in self.questions
+        ]
+        answers.append({'question_id': self.descriptive.id, 'answer_text': 'text'})
+        return answers
+
+    def test_submit_writes_all_answers_and_result(self):
+        response = self.client.post(self.submit_url(), {'answers': self.build_answers()}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['options_saved'], 5)
+        self.assertEqual(response.data['answers_saved'], 1)
+        self.assertEqual(models.UserOptions.objects.filter(user=self.student).count(), 5)
+        scoring.process_pending_jobs()
+        self.assertEqual(models.UserExamResult.objects.get(user=self.student, exam=self.exam).score, 10)
+
+    def test_resubmit_updates_existing_answers(self):
+        self.client.post(self.submit_url(), {'answers': self.build_answers()}, format='json')
+        response = self.client.post(self.submit_url(), {'answers': self.build_answers(correct=False)},
+                                    format='json')
+
+        self.assertEqual(response.data['options_saved'], 5)
+        self.assertEqual(models.UserOptions.objects.filter(user=self.student).count(), 5)
+        scoring.process_pending_jobs()
+        self.assertEqual(models.UserExamResult.objects.get(user=self.student, exam=self.exam).score, 0)
+
+    def test_query_count_does_not_grow_with_answers(self):
+        answers = self.build_answers()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.student.account_id))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.submit_url(), {'answers': answers}, format='json')
+        small = len(queries)
+
+        self.questions += [self.create_question(self.exam) for _ in range(20)]
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.student.account_id))
+        for model in (models.UserOptions, models.UserAnswer, models.UserExamResult):
+            model.objects.all().delete()
+        answers = self.build_answers()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.submit_url(), {'answers': answers}, format='json')
+
+        self.assertEqual(small, len(queries))
+
+    def test_option_of_another_question_is_rejected(self):
+        answers = [{'question_id': self.questions[0].id, 'option_id': self.questions[1].options.first().id}]
+        response = self.client.post(self.submit_url(), {'answers': answers}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(models.UserOptions.objects.exists())
+
+
+class ScoringTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.questions = [self.create_question(self.exam, score=3) for _ in range(4)]
+        self.descriptive = self.create_question(self.exam, question_type='Descriptive', score=5)
+
+    def answer(self, student, question, correct=True):
+        return models.UserOptions.objects.create(
+            user=student, question=question, answer_option=question.options.filter(is_correct=correct).first()
+        )
+
+    def test_recompute_result_sums_correct_options_and_descriptive_scores(self):
+        self.answer(self.student, self.questions[0])
+        self.answer(self.student, self.questions[1])
+        self.answer(self.student, self.questions[2], correct=False)
+        models.UserAnswer.objects.create(user=self.student, question=self.descriptive, answer_text='-', score=4)
+
+        scoring.recompute_result(self.student.id, self.exam.id)
+
+        self.assertEqual(models.UserExamResult.objects.get(user=self.student, exam=self.exam).score, 10)
+
+    def test_recompute_results_covers_whole_exam(self):
+        students = [self.create_student(self.institute, f'student{i}') for i in range(5)]
+        for i, student in enumerate(students):
+            for question in self.questions[:i]:
+                self.answer(student, question)
+
+        # پنج کوئری برای ساخت نتایج و محاسبه نمره و یک کوئری برای بررسی وجود جدول رتبه‌بندی
+        with self.assertNumQueries(6):
+            scoring.recompute_results(self.exam.id)
+
+        scores = dict(models.UserExamResult.objects.filter(exam=self.exam).values_list('user_id', 'score'))
+        self.assertEqual(scores, {student.id: 3 * i for i, student in enumerate(students) if i})
+
+    def test_recompute_repairs_drifted_result(self):
+        self.answer(self.student, self.questions[0])
+        models.UserExamResult.objects.create(user=self.student, exam=self.exam, score=99)
+
+        scoring.recompute_result(self.student.id, self.exam.id)
+
+        self.assertEqual(models.UserExamResult.objects.get(user=self.student, exam=self.exam).score, 3)
+
+    def test_interleaved_writes_do_not_lose_updates(self):
+        # دو پاسخ پیش از افزایش نمره هرکدام ثبت می‌شوند؛ نمره در خود پایگاه داده افزایش می‌یابد و نتیجه‌ای که
+        # پیش از هر دو نوشتن خوانده شده (score=0) هیچ‌کدام را بازنویسی نمی‌کند.
+        result = models.UserExamResult.objects.create(user=self.student, exam=self.exam, score=0)
+        first, second = self.questions[:2]
+
+        self.answer(self.student, first)
+        self.answer(self.student, second)
+        scoring.increment_score(self.student.id, self.exam.id, first.score)
+        scoring.increment_score(self.student.id, self.exam.id, second.score)
+
+        self.assertEqual(models.UserExamResult.objects.get(pk=result.pk).score, first.score + second.score)
+        scoring.recompute_result(self.student.id, self.exam.id)
+        self.assertEqual(models.UserExamResult.objects.get(pk=result.pk).score, first.score + second.score)
+
+
+class ConcurrentScoringTests(ExamDataMixin, TransactionTestCase):
+
+    def test_concurrent_submissions_do_not_lose_updates(self):
+        self.setUpTestData()
+        questions = [self.create_question(self.exam, score=1) for _ in range(8)]
+        barrier = threading.Barrier(len(questions))
+        errors = []
+
+        def retry_locked(func, *args, **kwargs):
+            # SQLite جدول را در نوشتن همزمان قفل می‌کند؛ تلاش دوباره رفتار پایگاه داده واقعی را شبیه‌سازی می‌کند.
+            for _ in range(200):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError:
+                    time.sleep(0.005)
+            raise AssertionError("database stayed locked")
+
+        def submit(question):
+            try:
+                barrier.wait()
+                retry_locked(
+                    models.UserOptions.objects.create,
+                    user_id=self.student.id, question=question, answer_option=question.options.get(is_correct=True)
+                )
+                retry_locked(scoring.recompute_result, self.student.id, self.exam.id)
+            except Exception as exc:  # noqa: BLE001
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit, args=(question,)) for question in questions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(models.UserExamResult.objects.get(user=self.student, exam=self.exam).score, len(questions))
+
+
+class ScoringJobTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.question = self.create_question(self.exam, score=3)
+        models.UserOptions.objects.create(
+            user=self.student, question=self.question, answer_option=self.question.options.get(is_correct=True)
+        )
+
+    def test_repeated_requests_are_coalesced_into_one_job(self):
+        for _ in range(5):
+            scoring.enqueue_rescore(self.exam.id, [self.student.id])
+
+        self.assertEqual(models.ScoringJob.objects.count(), 1)
+        self.assertEqual(scoring.process_pending_jobs(), 1)
+        self.assertFalse(models.ScoringJob.objects.exists())
+        result = models.UserExamResult.objects.get(user=self.student, exam=self.exam)
+        self.assertEqual(result.score, 3)
+        self.assertFalse(result.is_pending)
+
+    def test_result_is_pending_until_job_is_processed(self):
+        models.UserExamResult.objects.create(user=self.student, exam=self.exam, score=0)
+        scoring.enqueue_rescore(self.exam.id, [self.student.id])
+
+        self.assertTrue(models.UserExamResult.objects.get(user=self.student, exam=self.exam).is_pending)
+        scoring.process_pending_jobs()
+        self.assertFalse(models.UserExamResult.objects.get(user=self.student, exam=self.exam).is_pending)
+
+    def test_job_requested_again_while_running_is_kept(self):
+        scoring.enqueue_rescore(self.exam.id, [self.student.id])
+        jobs = scoring._claim_jobs(10)
+        scoring.enqueue_rescore(self.exam.id, [self.student.id])
+
+        scoring._finish_jobs(self.exam.id, jobs)
+
+        job = models.ScoringJob.objects.get()
+        self.assertIsNone(job.claimed_at)
+        self.assertEqual(job.generation, 2)
+        self.assertTrue(models.UserExamResult.objects.get(user=self.student, exam=self.exam).is_pending)
+
+    def test_request_with_an_older_timestamp_is_not_lost(self):
+        # ساعت پروسه درخواست‌کننده ممکن است از پردازشگر عقب باشد یا تراکنش آن دیرتر ثبت شود.
+        scoring.enqueue_rescore(self.exam.id, [self.student.id])
+        jobs = scoring._claim_jobs(10)
+        scoring.enqueue_rescore(self.exam.id, [self.student.id])
+        models.ScoringJob.objects.update(requested_at=timezone.now() - timedelta(minutes=1))
+
+        scoring._finish_jobs(self.exam.id, jobs)
+
+        self.assertTrue(models.ScoringJob.objects.exists())
+
+    def test_worker_command_drains_queue(self):
+        scoring.enqueue_rescore(self.exam.id, [self.student.id])
+        call_command('run_scoring_worker', processes=1, once=True)
+        self.assertFalse(models.ScoringJob.objects.exists())
+
+    @override_settings(EXAM_SCORING_BACKGROUND=False)
+    def test_synchronous_mode_scores_immediately(self):
+        scoring.request_rescore(self.student.id, self.exam.id)
+        self.assertFalse(models.ScoringJob.objects.exists())
+        self.assertEqual(models.UserExamResult.objects.get(user=self.student, exam=self.exam).score, 3)
+
+
+class RegradeTests(ExamDataMixin, APITestCase):
+
+    @classmethod
+    def bulk_create_students(cls, count):
+        accounts = CustomUser.objects.bulk_create(
+            CustomUser(username=f'bulk{i}', user_type='student') for i in range(count)
+        )
+        return Student.objects.bulk_create(
+            Student(account=account, institute=cls.institute, national_code=f'{i:010d}', phone_number='1',
+                    major=cls.major)
+            for i, account in enumerate(accounts)
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.question = self.create_question(self.exam, score=2)
+        self.correct = self.question.options.get(is_correct=True)
+        self.wrong = self.question.options.filter(is_correct=False).first()
+
+    def answer_all(self, students, option):
+        models.UserOptions.objects.bulk_create(
+            models.UserOptions(user=student, question=self.question, answer_option=option) for student in students
+        )
+        scoring.recompute_results(self.exam.id)
+
+    def scores(self):
+        return dict(models.UserExamResult.objects.filter(exam=self.exam).values_list('user_id', 'score'))
+
+    def test_flipping_answer_key_moves_only_affected_results(self):
+        students = self.bulk_create_students(4)
+        self.answer_all(students[:2], self.correct)
+        self.answer_all(students[2:], self.wrong)
+
+        self.correct.is_correct = False
+        self.correct.save()
+        self.wrong.is_correct = True
+        self.wrong.save()
+
+        self.assertEqual(self.correct.regraded_students, 2)
+        self.assertEqual(self.wrong.regraded_students, 2)
+        self.assertEqual(self.scores(), {s.id: (0 if i < 2 else 2) for i, s in enumerate(students)})
+
+    def test_question_score_change_applies_delta_to_correct_answers(self):
+        students = self.bulk_create_students(3)
+        self.answer_all(students[:1], self.correct)
+        self.answer_all(students[1:], self.wrong)
+
+        self.question.score = 5
+        self.question.save()
+
+        self.assertEqual(self.question.regraded_students, 1)
+        self.assertEqual(self.scores(), {students[0].id: 5, students[1].id: 0, students[2].id: 0})
+
+    def test_regrade_matches_full_recompute_for_large_exam(self):
+        students = self.bulk_create_students(5000)
+        self.answer_all(students[::2], self.correct)
+        self.answer_all(students[1::2], self.wrong)
+
+        started = time.monotonic()
+        with CaptureQueriesContext(connection) as queries:
+            self.wrong.is_correct = True
+            self.wrong.save()
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(self.wrong.regraded_students, 2500)
+        self.assertLess(len(queries), 10)
+        self.assertLess(elapsed, 5)
+
+        regraded = self.scores()
+        scoring.recompute_results(self.exam.id)
+        self.assertEqual(regraded, self.scores())
+
+
+class AnswerUpsertTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.question = self.create_question(self.exam)
+        self.client.force_authenticate(self.student.account)
+
+    def test_answering_twice_replaces_previous_option(self):
+        for option in self.question.options.all()[:2]:
+            response = self.client.post('/api/exam/options-answers/', {
+                'question_id': self.question.id, 'answer_option_id': option.id,
+            })
+            self.assertEqual(response.status_code, 201)
+
+        row = models.UserOptions.objects.get(user=self.student, question=self.question)
+        self.assertEqual(row.answer_option, option)
+        self.assertEqual(response.data['id'], row.id)
+
+    def test_duplicate_rows_are_rejected_by_the_database(self):
+        option = self.question.options.first()
+        models.UserOptions.objects.create(user=self.student, question=self.question, answer_option=option)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.UserOptions.objects.create(user=self.student, question=self.question, answer_option=option)
+
+
+class SparseFieldsetTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for _ in range(5):
+            question = self.create_question(self.exam)
+            models.UserOptions.objects.create(user=self.student, question=question,
+                                              answer_option=question.options.first())
+        self.client.force_authenticate(self.teacher.account)
+
+    def test_relations_are_ids_by_default(self):
+        response = self.client.get('/api/exam/options-answers/')
+        row = response.data[0]
+        self.assertEqual(row['user'], self.student.id)
+        self.assertIsInstance(row['question'], int)
+        self.assertIsInstance(row['answer_option'], int)
+
+    def test_expand_inlines_requested_relations(self):
+        response = self.client.get('/api/exam/options-answers/?expand=user.account,question')
+        row = response.data[0]
+        self.assertEqual(row['user']['account']['username'], self.student.account.username)
+        self.assertEqual(row['user']['institute'], self.institute.id)
+        self.assertEqual(row['question']['exam'], self.exam.id)
+        self.assertIsInstance(row['answer_option'], int)
+
+    def test_fields_limits_output(self):
+        response = self.client.get('/api/exam/options-answers/?fields=id,user.national_code&expand=user')
+        self.assertEqual(set(response.data[0]), {'id', 'user'})
+        self.assertEqual(response.data[0]['user'], {'national_code': self.student.national_code})
+
+    def test_default_response_is_much_smaller_than_expanded(self):
+        compact = self.client.get('/api/exam/options-answers/')
+        expanded = self.client.get('/api/exam/options-answers/?expand=user.account,user.institute,question')
+        self.assertLess(len(compact.content) * 3, len(expanded.content))
+
+    def test_expanded_list_runs_fixed_number_of_queries(self):
+        url = '/api/exam/options-answers/?expand=user.account,user.institute.account,question.exam,answer_option'
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+
+        for i in range(10):
+            question = self.create_question(self.exam)
+            student = self.create_student(self.institute, f'expanded-{i:02d}')
+            models.UserOptions.objects.create(user=student, question=question,
+                                              answer_option=question.options.first())
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data), 15)
+        self.assertEqual(len(few), len(many))
+
+
+class ValuesListTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            student = self.create_student(self.institute, f'values-{i:04d}')
+            models.UserExamResult.objects.create(user=student, exam=self.exam, score=i)
+            models.UserExamTime.objects.create(user=student, exam=self.exam, finish_time=timezone.now())
+        self.client.force_authenticate(self.teacher.account)
+
+    def test_fast_path_matches_serializer_output(self):
+        for url, serializer_class, queryset in [
+            ('/api/exam/user-exam-results/', serializers.UserExamResultSerializer, models.UserExamResult.objects),
+            ('/api/exam/exam-time/', serializers.UserExamTimeSerializer, models.UserExamTime.objects),
+        ]:
+            response = self.client.get(url + '?ordering=pk')
+            self.assertEqual(response.json(), serializer_class(queryset.order_by('pk'), many=True).data)
+
+    def test_fast_path_keeps_keyset_pagination(self):
+        first = self.client.get('/api/exam/user-exam-results/?page_size=2')
+        self.assertEqual(len(first.json()), 2)
+        second = self.client.get(first['Link'].split(';')[0].strip('<>'))
+        self.assertEqual(len(second.json()), 1)
+        self.assertNotIn('Link', second)
+
+    def test_expand_falls_back_to_serializer(self):
+        response = self.client.get('/api/exam/user-exam-results/?expand=exam')
+        self.assertEqual(response.json()[0]['exam']['title'], self.exam.title)
+
+
+class ExportTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.question = self.create_question(self.exam, score=2)
+        self.descriptive = self.create_question(self.exam, score=5, question_type='Descriptive')
+        correct, wrong = self.question.options.order_by('pk')[:2]
+        self.students = [self.student] + [self.create_student(self.institute, f'export-{i:04d}') for i in range(4)]
+        for index, student in enumerate(self.students):
+            models.UserOptions.objects.create(user=student, question=self.question,
+                                              answer_option=correct if index % 2 == 0 else wrong)
+            models.UserAnswer.objects.create(user=student, question=self.descriptive, answer_text='=1+1', score=index)
+            models.UserExamResult.objects.create(user=student, exam=self.exam, score=index)
+        self.client.force_authenticate(self.teacher.account)
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertTrue(content.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(content[1:])))
+
+    def test_results_csv_streams_every_row(self):
+        response = self.client.get(f'/api/exam/exams/{self.exam.id}/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0], exports.RESULT_HEADER)
+        self.assertEqual([row[2] for row in rows[1:]], [str(student.id) for student in self.students])
+
+    def test_matrix_has_one_row_per_student_and_column_per_question(self):
+        rows = self.read_csv(self.client.get(f'/api/exam/exams/{self.exam.id}/export/?kind=matrix'))
+        self.assertEqual(len(rows[0]), len(exports.STUDENT_COLUMNS) + 3)
+        self.assertEqual(rows[1][-3:], ['2.0', '0.0', '2.0'])
+        self.assertEqual(rows[2][-3:], ['0', '1.0', '1.0'])
+
+    def test_answers_are_escaped_for_spreadsheets(self):
+        rows = self.read_csv(self.client.get(f'/api/exam/classrooms/{self.classroom.id}/export/?kind=answers'))
+        self.assertEqual(len(rows), 1 + 2 * len(self.students))
+        self.assertIn("'=1+1", [row[5] for row in rows])
+
+    def test_xlsx_is_a_valid_workbook(self):
+        self.client.force_authenticate(self.institute.account)
+        response = self.client.get(f'/api/exam/institutes/{self.institute.id}/export/?output=xlsx')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        self.assertEqual(len(sheet.findall(f'{namespace}sheetData/{namespace}row')), 1 + len(self.students))
+
+    def test_rows_are_read_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(exports.result_rows([self.exam], chunk_size=2))
+        self.assertEqual(len(rows), 1 + len(self.students))
+        self.assertEqual(len(queries), 3)
+
+    def test_students_and_other_teachers_cannot_export(self):
+        self.client.force_authenticate(self.student.account)
+        self.assertEqual(self.client.get(f'/api/exam/exams/{self.exam.id}/export/').status_code, 403)
+
+        self.client.force_authenticate(self.create_teacher(self.institute, 'other-teacher').account)
+        self.assertEqual(self.client.get(f'/api/exam/exams/{self.exam.id}/export/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/exam/classrooms/{self.classroom.id}/export/').status_code, 403)
+        self.assertEqual(self.client.get(f'/api/exam/institutes/{self.institute.id}/export/').status_code, 403)
+
+    def test_unknown_kind_is_rejected(self):
+        response = self.client.get(f'/api/exam/classrooms/{self.classroom.id}/export/?kind=matrix')
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.question = self.create_question(self.exam)
+        self.client.force_authenticate(self.teacher.account)
+        self.urls = {
+            'classrooms': '/api/exam/classrooms/',
+            'exams': f'/api/exam/classrooms/{self.classroom.id}/exams/',
+            'questions': f'/api/exam/classrooms/{self.classroom.id}/exams/{self.exam.id}/questions/',
+            'options': f'/api/exam/classrooms/{self.classroom.id}/exams/{self.exam.id}/questions/'
+                       f'{self.question.id}/options/',
+        }
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_returns_304_without_reading_rows(self):
+        for name, url in self.urls.items():
+            etag = self.etag(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, name)
+            self.assertEqual(response.content, b'')
+            self.assertFalse([q for q in queries if 'exam_' in q['sql']], name)
+
+    def test_writes_change_only_affected_etags(self):
+        before = {name: self.etag(url) for name, url in self.urls.items()}
+        models.Option.objects.create(question=self.question, text='new', is_correct=False)
+        after = {name: self.etag(url) for name, url in self.urls.items()}
+
+        self.assertEqual(before['classrooms'], after['classrooms'])
+        self.assertEqual(before['exams'], after['exams'])
+        self.assertNotEqual(before['questions'], after['questions'])
+        self.assertNotEqual(before['options'], after['options'])
+
+        other = models.Classroom.objects.create(name='other', teacher=self.teacher, grade='bachelor')
+        models.Exam.objects.create(title='other', description='-', start_time=timezone.now(),
+                                   end_time=timezone.now(), duration_minutes=1, classroom=other,
+                                   creator=self.teacher.account)
+        self.assertNotEqual(after['classrooms'], self.etag(self.urls['classrooms']))
+        self.assertEqual(after['exams'], self.etag(self.urls['exams']))
+
+        self.client.force_authenticate(self.student.account)
+        enrolled = self.etag(self.urls['classrooms'])
+        models.StudentClassroom.objects.create(classroom=other, student=self.student)
+        response = self.client.get(self.urls['classrooms'], HTTP_IF_NONE_MATCH=enrolled)
+        self.assertEqual(len(response.data), 2)
+
+    def test_etag_depends_on_user_query_and_expanded_relations(self):
+        url = self.urls['classrooms']
+        plain, expanded = self.etag(url), self.etag(url + '?expand=teacher.account')
+        self.assertNotEqual(plain, expanded)
+
+        self.teacher.account.first_name = 'renamed'
+        self.teacher.account.save()
+        self.assertEqual(plain, self.etag(url))
+        self.assertNotEqual(expanded, self.etag(url + '?expand=teacher.account'))
+
+        self.client.force_authenticate(self.institute.account)
+        self.assertNotEqual(plain, self.etag(url))
+
+
+class LeaderboardTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for _ in range(5):
+            self.create_question(self.exam, score=2)
+        models.Exam.objects.filter(pk=self.exam.pk).update(result_show_time=timezone.now() - timedelta(minutes=1))
+        self.students = [self.student] + [self.create_student(self.institute, f'board-{i:04d}') for i in range(4)]
+        for student, score in zip(self.students, [10, 8, 8, 5, 1]):
+            models.UserExamResult.objects.create(user=student, exam=self.exam, score=score)
+        models.StudentClassroom.objects.bulk_create(
+            models.StudentClassroom(classroom=self.classroom, student=student) for student in self.students[1:]
+        )
+
+    def snapshot(self):
+        return {
+            entry['user_id']: entry for entry in models.LeaderboardEntry.objects.filter(exam=self.exam).values(
+                'user_id', 'score', 'rank', 'dense_rank')
+        }
+
+    def test_rebuild_ranks_ties_and_histogram(self):
+        leaderboard.rebuild(self.exam.id)
+        entries = self.snapshot()
+        self.assertEqual([entries[student.id]['rank'] for student in self.students], [1, 2, 2, 4, 5])
+        self.assertEqual([entries[student.id]['dense_rank'] for student in self.students], [1, 2, 2, 3, 4])
+
+        board = models.Leaderboard.objects.get(exam=self.exam)
+        self.assertEqual((board.participants, board.max_score), (5, 10))
+        self.assertEqual(board.histogram, [0, 1, 0, 0, 0, 1, 0, 0, 2, 1])
+
+    def test_incremental_updates_match_full_rebuild(self):
+        leaderboard.rebuild(self.exam.id)
+        scoring.increment_score(self.students[4].id, self.exam.id, 9)
+        scoring.increment_score(self.students[0].id, self.exam.id, -2)
+        result = models.UserExamResult.objects.get(user=self.students[3], exam=self.exam)
+        result.score = 8
+        result.save()
+        models.UserExamResult.objects.get(user=self.students[1], exam=self.exam).delete()
+        newcomer = self.create_student(self.institute, 'board-late')
+        models.UserExamResult.objects.create(user=newcomer, exam=self.exam, score=3)
+
+        incremental = self.snapshot()
+        histogram = models.Leaderboard.objects.get(exam=self.exam).histogram
+        leaderboard.rebuild(self.exam.id)
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(histogram, models.Leaderboard.objects.get(exam=self.exam).histogram)
+
+    def test_list_is_paginated_by_rank(self):
+        self.client.force_authenticate(self.teacher.account)
+        first = self.client.get(f'/api/exam/exams/{self.exam.id}/leaderboard/?page_size=3')
+        self.assertEqual([row['rank'] for row in first.data], [1, 2, 2])
+        second = self.client.get(first['Link'].split(';')[0].strip('<>'))
+        self.assertEqual([row['user'] for row in second.data], [self.students[3].id, self.students[4].id])
+
+        summary = self.client.get(f'/api/exam/exams/{self.exam.id}/leaderboard/summary/')
+        self.assertEqual(summary.data['participants'], 5)
+        self.assertEqual(summary.data['buckets'][-1], {'from': 9.0, 'to': 10.0, 'count': 1})
+
+    def test_percentile_follows_participants(self):
+        self.client.force_authenticate(self.teacher.account)
+        url = f'/api/exam/exams/{self.exam.id}/leaderboard/'
+        self.assertEqual([row['percentile'] for row in self.client.get(url).data], [100, 75, 75, 25, 0])
+
+        newcomer = self.create_student(self.institute, 'board-late')
+        models.UserExamResult.objects.create(user=newcomer, exam=self.exam, score=0)
+        self.assertEqual([row['percentile'] for row in self.client.get(url).data], [100, 80, 80, 40, 20, 0])
+
+        self.client.force_authenticate(self.students[3].account)
+        self.assertEqual(self.client.get(f'{url}me/').data['percentile'], 40)
+
+    def test_students_see_only_public_fields_of_classmates(self):
+        self.client.force_authenticate(self.students[1].account)
+        response = self.client.get(f'/api/exam/exams/{self.exam.id}/leaderboard/?expand=user')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data[0]['user']), {'id', 'name'})
+
+        self.client.force_authenticate(self.teacher.account)
+        response = self.client.get(f'/api/exam/exams/{self.exam.id}/leaderboard/?expand=user')
+        self.assertIn('national_code', response.data[0]['user'])
+
+    def test_question_changes_rescale_histogram(self):
+        leaderboard.rebuild(self.exam.id)
+        question = self.create_question(self.exam, score=10)
+        board = models.Leaderboard.objects.get(exam=self.exam)
+        self.assertEqual(board.max_score, 20)
+        self.assertEqual(board.histogram, [1, 0, 1, 0, 2, 1, 0, 0, 0, 0])
+
+        question.delete()
+        board = models.Leaderboard.objects.get(exam=self.exam)
+        self.assertEqual((board.max_score, board.histogram), (10, [0, 1, 0, 0, 0, 1, 0, 0, 2, 1]))
+
+    def test_my_rank_is_a_constant_lookup(self):
+        leaderboard.rebuild(self.exam.id)
+        self.client.force_authenticate(self.students[2].account)
+        self.client.get(f'/api/exam/exams/{self.exam.id}/leaderboard/me/')
+        # ثبت‌نام دانش‌آموز در کلاس از کش خوانده می‌شود.
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/exam/exams/{self.exam.id}/leaderboard/me/')
+        self.assertEqual((response.data['rank'], response.data['participants']), (2, 5))
+
+    def test_students_wait_for_result_show_time(self):
+        models.Exam.objects.filter(pk=self.exam.pk).update(result_show_time=timezone.now() + timedelta(hours=1))
+        self.client.force_authenticate(self.student.account)
+        self.assertEqual(self.client.get(f'/api/exam/exams/{self.exam.id}/leaderboard/me/').status_code, 403)
+
+
+class ItemAnalysisTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.first = self.create_question(self.exam, score=2)
+        self.second = self.create_question(self.exam, score=2)
+        self.descriptive = self.create_question(self.exam, score=5, question_type='Descriptive')
+        self.students = [self.student] + [self.create_student(self.institute, f'item-{i:05d}') for i in range(3)]
+
+        self.choose(self.first, [0, 0, 1, None])
+        self.choose(self.second, [0, 1, 1, 1])
+        for student, score in zip(self.students, [5, 3, 1]):
+            models.UserAnswer.objects.create(user=student, question=self.descriptive, answer_text='-', score=score)
+        scoring.recompute_results(self.exam.id)
+
+    def choose(self, question, choices):
+        options = list(question.options.order_by('pk'))
+        for student, choice in zip(self.students, choices):
+            if choice is not None:
+                models.UserOptions.objects.create(user=student, question=question, answer_option=options[choice])
+
+    def test_difficulty_discrimination_and_distractors(self):
+        from statistics import correlation
+
+        analysis = analytics.item_analysis(self.exam.id)
+        first, second, descriptive = analysis['questions']
+        totals = [9, 5, 1, 0]
+
+        self.assertEqual((analysis['participants'], analysis['mean_score']), (4, 3.75))
+        self.assertEqual([first['difficulty'], second['difficulty'], descriptive['difficulty']], [0.5, 0.25, 0.45])
+        self.assertEqual((first['responses'], first['omitted']), (3, 1))
+        self.assertAlmostEqual(
+            first['discrimination'], correlation([1, 1, 0, 0], [total - x for total, x in zip(totals, [2, 2, 0, 0])]),
+            places=4,
+        )
+        self.assertAlmostEqual(
+            descriptive['discrimination'], correlation([5, 3, 1, 0], [4, 2, 0, 0]), places=4,
+        )
+        self.assertEqual(
+            [(option['count'], option['proportion'], option['mean_score']) for option in first['options']],
+            [(2, 0.5, 7), (1, 0.25, 1), (0, 0, None), (0, 0, None)],
+        )
+        self.assertAlmostEqual(first['options'][1]['discrimination'], correlation([0, 0, 1, 0], [7, 3, 1, 0]),
+                               places=4)
+        self.assertIsNone(first['options'][2]['discrimination'])
+
+    def test_cached_until_scores_change(self):
+        analytics.get_item_analysis(self.exam.id)
+        with self.assertNumQueries(0):
+            analytics.get_item_analysis(self.exam.id)
+
+        models.UserOptions.objects.filter(user=self.students[3], question=self.second).update(
+            answer_option=self.second.options.get(is_correct=True)
+        )
+        scoring.recompute_result(self.students[3].id, self.exam.id)
+        self.assertEqual(analytics.get_item_analysis(self.exam.id)['questions'][1]['difficulty'], 0.5)
+
+    def test_only_exam_managers_see_the_analysis(self):
+        url = f'/api/exam/exams/{self.exam.id}/item-analysis/'
+        self.client.force_authenticate(self.teacher.account)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['questions']), 3)
+
+        self.client.force_authenticate(self.student.account)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class EnrollmentTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/exam/classrooms/{self.classroom.id}/enroll/'
+        self.client.force_authenticate(self.teacher.account)
+
+    def test_reports_each_row(self):
+        newcomers = [self.create_student(self.institute, f'enroll-{i:04d}') for i in range(2)]
+        outsider = self.create_student(self.create_institute('other-institute'), 'outsider00')
+
+        response = self.client.post(self.url, {
+            'student_ids': [newcomers[0].id, self.student.id, 999999, newcomers[0].id],
+            'national_codes': [newcomers[1].national_code, outsider.national_code, '0000000000'],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['enrolled'], 2)
+        self.assertEqual(
+            [row['status'] for row in response.data['rows']],
+            ['enrolled', 'already_enrolled', 'not_found', 'duplicate', 'enrolled', 'other_institute', 'not_found'],
+        )
+        self.assertEqual(
+            set(models.StudentClassroom.objects.filter(classroom=self.classroom).values_list('student_id', flat=True)),
+            {self.student.id, newcomers[0].id, newcomers[1].id},
+        )
+
+    def test_query_count_does_not_grow_with_students(self):
+        def enroll(students):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, {'student_ids': [student.id for student in students]},
+                                            format='json')
+            self.assertEqual(response.data['enrolled'], len(students))
+            return len(queries)
+
+        few = enroll([self.create_student(self.institute, f'few-{i:06d}') for i in range(2)])
+        many = enroll([self.create_student(self.institute, f'many-{i:05d}') for i in range(30)])
+        self.assertEqual(few, many)
+
+    def test_csv_upload(self):
+        newcomer = self.create_student(self.institute, 'csv-000001')
+        upload = io.BytesIO(f'\ufeffnational_code\n{newcomer.national_code}\n'.encode())
+        upload.name = 'students.csv'
+
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rows'][0]['student_id'], newcomer.id)
+        self.assertTrue(models.StudentClassroom.objects.filter(classroom=self.classroom, student=newcomer).exists())
+
+    def test_students_cannot_enroll(self):
+        self.client.force_authenticate(self.student.account)
+        response = self.client.post(self.url, {'student_ids': [self.student.id]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class AuthoringTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.teacher.account)
+
+    @staticmethod
+    def question(index=0, options=4):
+        return {
+            'text': f'question {index}', 'question_type': 'MultipleChoice', 'score': 2,
+            'options': [{'text': f'option {i}', 'is_correct': i == 0} for i in range(options)],
+        }
+
+    def import_payload(self, document):
+        start = timezone.now() + timedelta(days=1)
+        return {'file': document, 'start_time': start, 'end_time': start + timedelta(hours=2)}
+
+    def test_creates_question_with_options(self):
+        response = self.client.post(f'/api/exam/exams/{self.exam.id}/questions/', self.question(), format='json')
+
+        self.assertEqual(response.status_code, 201)
+        question = models.Question.objects.get(pk=response.data['id'])
+        self.assertEqual(question.exam_id, self.exam.id)
+        self.assertEqual([option['text'] for option in response.data['options']],
+                         list(question.options.order_by('pk').values_list('text', flat=True)))
+
+    def test_bulk_create_runs_fixed_number_of_queries(self):
+        def create(count):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(f'/api/exam/exams/{self.exam.id}/questions/',
+                                            [self.question(i) for i in range(count)], format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.data), count)
+            return len(queries)
+
+        self.assertEqual(create(2), create(30))
+        self.assertEqual(models.Option.objects.filter(question__exam=self.exam).count(), 32 * 4)
+
+    def test_rejects_inconsistent_options(self):
+        url = f'/api/exam/exams/{self.exam.id}/questions/'
+        no_correct = dict(self.question(), options=[{'text': 'a', 'is_correct': False}] * 2)
+        descriptive = dict(self.question(), question_type='Descriptive')
+
+        for payload in (no_correct, descriptive, self.question(options=1)):
+            self.assertEqual(self.client.post(url, payload, format='json').status_code, 400)
+        self.assertFalse(models.Question.objects.filter(exam=self.exam).exists())
+
+    def test_options_without_is_correct_are_rejected(self):
+        payload = dict(self.question(), options=[{'text': 'a'}, {'text': 'b'}])
+
+        response = self.client.post(f'/api/exam/exams/{self.exam.id}/questions/', payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([str(error) for error in response.data['options']], ["حداقل یکی از گزینه‌ها باید صحیح باشد."])
+
+    def test_options_without_is_correct_are_created_as_incorrect(self):
+        payload = dict(self.question(), options=[{'text': 'a', 'is_correct': True}, {'text': 'b'}])
+
+        response = self.client.post(f'/api/exam/exams/{self.exam.id}/questions/', payload, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([option['is_correct'] for option in response.data['options']], [True, False])
+
+    def test_export_import_round_trip(self):
+        self.client.post(f'/api/exam/exams/{self.exam.id}/questions/',
+                         [self.question(i) for i in range(3)] + [{
+                             'text': 'essay', 'question_type': 'Descriptive', 'score': 5,
+                         }], format='json')
+        document = self.client.get(f'/api/exam/exams/{self.exam.id}/file/').data
+
+        response = self.client.post(f'/api/exam/classrooms/{self.classroom.id}/exams/import/',
+                                    self.import_payload(document), format='json')
+
+        self.assertEqual(response.status_code, 201)
+        imported = models.Exam.objects.get(pk=response.data['id'])
+        self.assertEqual((imported.title, imported.creator_id), (self.exam.title, self.teacher.account_id))
+        self.assertEqual(authoring.export_exam(imported), document)
+
+    def test_import_query_count_does_not_grow_with_questions(self):
+        def load(count):
+            document = {
+                'format': authoring.FILE_FORMAT, 'version': authoring.FILE_VERSION,
+                'exam': {'title': 'bank', 'description': '-', 'duration_minutes': 60},
+                'questions': [self.question(i) for i in range(count)],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(f'/api/exam/classrooms/{self.classroom.id}/exams/import/',
+                                            self.import_payload(document), format='json')
+            self.assertEqual(response.status_code, 201)
+            return len(queries)
+
+        # SQLite دستورهای INSERT بزرگ را به خاطر محدودیت تعداد پارامتر چند تکه می‌کند؛ MySQL این محدودیت را ندارد.
+        self.assertEqual(load(2), load(60))
+
+    def test_students_cannot_author(self):
+        self.client.force_authenticate(self.student.account)
+        response = self.client.post(f'/api/exam/exams/{self.exam.id}/questions/', self.question(), format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get(f'/api/exam/exams/{self.exam.id}/file/').status_code, 403)
+
+
+class ExamSessionTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.question = self.create_question(self.exam)
+        self.client.force_authenticate(self.student.account)
+
+    def answer(self):
+        return self.client.post('/api/exam/options-answers/', {
+            'question_id': self.question.id, 'answer_option_id': self.question.options.first().id,
+        })
+
+    def expired_session(self, student, minutes=5):
+        finish_time = timezone.now() - timedelta(minutes=minutes)
+        return models.UserExamTime.objects.create(
+            user=student, exam=self.exam, status='in_progress', started_at=finish_time - timedelta(hours=1),
+            finish_time=finish_time,
+        )
+
+    def test_start_records_session_within_exam_window(self):
+        response = self.client.post('/api/exam/exam-time/', {'exam_id': self.exam.id})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'in_progress')
+        session = models.UserExamTime.objects.get(user=self.student, exam=self.exam)
+        self.assertIsNotNone(session.started_at)
+        self.assertLessEqual(session.finish_time, self.exam.end_time)
+
+    def test_start_before_exam_opens_is_rejected(self):
+        models.Exam.objects.filter(pk=self.exam.pk).update(start_time=timezone.now() + timedelta(hours=1))
+        response = self.client.post('/api/exam/exam-time/', {'exam_id': self.exam.id})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(models.UserExamTime.objects.exists())
+
+    def test_first_answer_starts_session(self):
+        self.assertEqual(self.answer().status_code, 201)
+        self.assertEqual(models.UserExamTime.objects.get(user=self.student, exam=self.exam).status, 'in_progress')
+
+    def test_deadline_check_uses_cached_session(self):
+        sessions.start(self.student.id, self.exam)
+        with self.assertNumQueries(0):
+            sessions.ensure_writable(self.student.id, self.exam)
+
+    def test_answer_after_deadline_is_rejected(self):
+        self.expired_session(self.student)
+
+        self.assertEqual(self.answer().status_code, 403)
+        response = self.client.post(f'/api/exam/exams/{self.exam.id}/submit/', {'answers': []}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(models.UserOptions.objects.exists())
+
+    def test_finish_closes_session_and_scores(self):
+        self.answer()
+        response = self.client.post(f'/api/exam/exams/{self.exam.id}/finish/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'submitted')
+        self.assertEqual(self.answer().status_code, 403)
+        self.assertEqual(self.client.post(f'/api/exam/exams/{self.exam.id}/finish/').status_code, 403)
+        scoring.process_pending_jobs()
+        self.assertEqual(models.UserExamResult.objects.get(user=self.student, exam=self.exam).score, 2)
+
+    def test_sweep_expires_overdue_sessions_in_bulk(self):
+        students = [self.create_student(self.institute, f'sweep-{i:04d}') for i in range(3)]
+        expired = [self.expired_session(student) for student in students]
+        sessions.start(self.student.id, self.exam)
+
+        call_command('sweep_exam_sessions', once=True, stdout=io.StringIO())
+
+        for session in expired:
+            session.refresh_from_db()
+            self.assertEqual(session.status, 'expired')
+            self.assertEqual(session.submitted_at, session.finish_time)
+        self.assertEqual(models.UserExamTime.objects.get(user=self.student).status, 'in_progress')
+        self.assertEqual(
+            set(models.ScoringJob.objects.values_list('user_id', flat=True)), {student.id for student in students}
+        )
+
+    def test_sweep_invalidates_cached_session(self):
+        session = self.expired_session(self.student, minutes=0)
+        sessions.get_session(self.student.id, self.exam.id)
+
+        sessions.sweep_expired(now=session.finish_time + timedelta(minutes=1))
+
+        self.assertEqual(sessions.get_session(self.student.id, self.exam.id)['status'], 'expired')
+
+
+class HeartbeatTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.student.account)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def heartbeat(self):
+        return self.client.get(f'/api/exam/exams/{self.exam.id}/heartbeat/')
+
+    def test_steady_state_does_not_touch_the_database(self):
+        sessions.start(self.student.id, self.exam)
+        self.heartbeat()
+
+        with self.assertNumQueries(0):
+            response = self.heartbeat()
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['exam_status'], data['status']), ('running', 'in_progress'))
+        self.assertGreater(data['remaining_seconds'], 0)
+        self.assertIn('server_time', data)
+
+    def test_overdue_session_is_reported_expired_before_sweep(self):
+        models.UserExamTime.objects.create(
+            user=self.student, exam=self.exam, status='in_progress', finish_time=timezone.now() - timedelta(minutes=1),
+        )
+        data = self.heartbeat().json()
+        self.assertEqual((data['status'], data['remaining_seconds']), ('expired', 0))
+
+    def test_deleted_token_is_not_served_from_cache(self):
+        self.heartbeat()
+        self.token.delete()
+        self.assertEqual(self.heartbeat().status_code, 401)
+
+    def test_only_students_of_the_exam_institute_are_allowed(self):
+        other = self.create_student(self.create_institute('other-institute'), 'other-student')
+        token = Token.objects.create(user=other.account)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.heartbeat().status_code, 403)
+
+        token = Token.objects.create(user=self.teacher.account)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.heartbeat().status_code, 403)
+
+    def test_started_session_is_returned_from_cache(self):
+        self.client.post('/api/exam/exam-time/', {'exam_id': self.exam.id})
+
+        # فقط کوئری احراز هویت توکن
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/exam/exam-time/', {'exam_id': self.exam.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'in_progress')
+
+
+class PrewarmTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_question(self.exam)
+        for i in range(2):
+            student = self.create_student(self.institute, f'prewarm-{i:04d}')
+            models.StudentClassroom.objects.create(classroom=self.classroom, student=student)
+
+    def test_prewarm_prepares_paper_timing_and_sessions(self):
+        report = prewarm.prewarm_due_exams()
+
+        self.assertEqual([(entry['exam'], entry['students']) for entry in report], [(self.exam.id, 3)])
+        self.assertEqual(
+            list(models.UserExamTime.objects.filter(exam=self.exam).values_list('status', flat=True).distinct()),
+            ['not_started'],
+        )
+        with self.assertNumQueries(0):
+            exam_cache.get_paper(self.exam.id, lambda: None)
+            exam_cache.get_exam_timing(self.exam.id)
+            self.assertEqual(sessions.get_session(self.student.id, self.exam.id)['status'], 'not_started')
+
+    def test_exams_outside_the_lead_time_are_skipped(self):
+        models.Exam.objects.filter(pk=self.exam.pk).update(start_time=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(prewarm.prewarm_due_exams(lead_minutes=10), [])
+        self.assertEqual(len(prewarm.prewarm_due_exams(lead_minutes=90)), 1)
+
+    def test_exam_is_prewarmed_again_after_enrollment_changes(self):
+        prewarm.prewarm_due_exams()
+        self.assertEqual(prewarm.prewarm_due_exams(), [])
+
+        student = self.create_student(self.institute, 'prewarm-late')
+        models.StudentClassroom.objects.create(classroom=self.classroom, student=student)
+
+        self.assertEqual(prewarm.prewarm_due_exams()[0]['students'], 4)
+        self.assertTrue(models.UserExamTime.objects.filter(exam=self.exam, user=student).exists())
+
+    def test_prewarm_does_not_recache_existing_sessions(self):
+        sessions.start(self.student.id, self.exam)
+        key = sessions._key(self.student.id, self.exam.id)
+        # جلسه‌ای که ممکن است هم‌زمان ثبت نهایی شود نباید از روی ردیفی که prewarm خوانده دوباره در کش نوشته شود.
+        cache.delete(key)
+        models.UserExamTime.objects.filter(user=self.student).update(status='submitted')
+        live = {**sessions.NOT_STARTED, 'status': 'in_progress'}
+        late = self.create_student(self.institute, 'prewarm-late')
+        models.StudentClassroom.objects.create(classroom=self.classroom, student=late)
+        cache.set(sessions._key(late.id, self.exam.id), live)
+
+        self.assertEqual(prewarm.prewarm_due_exams()[0]['students'], 4)
+
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(sessions.get_session(self.student.id, self.exam.id)['status'], 'submitted')
+        self.assertEqual(cache.get(sessions._key(late.id, self.exam.id)), live)
+
+    def test_start_uses_prepared_session_row(self):
+        call_command('prewarm_exams', once=True, stdout=io.StringIO())
+
+        row, created = sessions.start(self.student.id, self.exam)
+
+        self.assertFalse(created)
+        self.assertEqual(row.status, 'in_progress')
+        self.assertIsNotNone(row.started_at)
+        self.assertEqual(sessions.get_session(self.student.id, self.exam.id)['status'], 'in_progress')
+
+
+class AutosaveTests(ExamDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        buffer_settings = override_settings(EXAM_AUTOSAVE_PATH=os.path.join(directory.name, 'autosave.sqlite3'))
+        buffer_settings.enable()
+        self.addCleanup(buffer_settings.disable)
+
+        self.questions = [self.create_question(self.exam, score=1) for _ in range(4)]
+        self.descriptive = self.create_question(self.exam, question_type='Descriptive')
+        self.token = Token.objects.create(user=self.student.account)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        sessions.start(self.student.id, self.exam)
+
+    def autosave(self, answers):
+        return self.client.put(f'/api/exam/exams/{self.exam.id}/autosave/', {'answers': answers}, format='json')
+
+    def choose(self, question, index):
+        return {'question_id': question.id, 'option_id': question.options.order_by('pk')[index].id}
+
+    def clicks(self):
+        # هر سوال تستی چند بار تغییر می‌کند و پاسخ تشریحی چند بار بازنویسی می‌شود.
+        for index in (1, 2, 3, 0, 1, 2):
+            for question in self.questions:
+                yield self.choose(question, index)
+        for length in range(1, 7):
+            yield {'question_id': self.descriptive.id, 'answer_text': 'a' * length}
+
+    def count_writes(self):
+        writes = []
+
+        def count(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+                writes.append(sql)
+            return execute(sql, params, many, context)
+
+        return writes, connection.execute_wrapper(count)
+
+    def saved_answers(self, student):
+        return (
+            set(models.UserOptions.objects.filter(user=student).values_list('question_id', 'answer_option_id')),
+            set(models.UserAnswer.objects.filter(user=student).values_list('question_id', 'answer_text')),
+        )
+
+    def test_autosave_is_query_free(self):
+        self.autosave([self.choose(self.questions[0], 1)])
+        answers = [self.choose(self.questions[0], 2)]
+
+        with self.assertNumQueries(0):
+            response = self.autosave(answers)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(models.UserOptions.objects.exists())
+
+    def test_final_state_matches_direct_writes_with_ten_times_fewer_writes(self):
+        direct = self.create_student(self.institute, 'direct-student')
+        models.StudentClassroom.objects.create(classroom=self.classroom, student=direct)
+        sessions.start(direct.id, self.exam)
+        direct_client = self.client_class()
+        direct_client.force_authenticate(direct.account)
+
+        direct_writes, counting = self.count_writes()
+        with counting:
+            for click in self.clicks():
+                if 'option_id' in click:
+                    direct_client.post('/api/exam/options-answers/', {
+                        'question_id': click['question_id'], 'answer_option_id': click['option_id'],
+                    })
+                else:
+                    direct_client.post('/api/exam/answers/', click)
+            sessions.submit(direct.id, self.exam)
+
+        buffered_writes, counting = self.count_writes()
+        with counting:
+            for number, click in enumerate(self.clicks(), start=1):
+                self.autosave([click])
+                # flush دوره‌ای flush_exam_autosave
+                if number % 15 == 0:
+                    autosave.flush_pending()
+            sessions.submit(self.student.id, self.exam)
+
+        scoring.process_pending_jobs()
+        self.assertEqual(self.saved_answers(self.student), self.saved_answers(direct))
+        self.assertEqual(
+            models.UserExamResult.objects.get(user=self.student, exam=self.exam).score,
+            models.UserExamResult.objects.get(user=direct, exam=self.exam).score,
+        )
+        self.assertGreaterEqual(len(direct_writes), 10 * len(buffered_writes))
+
+    def test_drafts_survive_worker_restart(self):
+        self.autosave([self.choose(self.questions[0], 2), {'question_id': self.descriptive.id, 'answer_text': 'x'}])
+        # پروسه جدید بافر و اتصال جدیدی به فایل آن می‌سازد.
+        autosave.get_buffer.cache_clear()
+
+        response = self.client.get(f'/api/exam/exams/{self.exam.id}/autosave/')
+        self.assertEqual(len(response.json()['answers']), 2)
+
+        self.assertEqual(autosave.flush_pending(), 1)
+        self.assertEqual(self.saved_answers(self.student), (
+            {(self.questions[0].id, self.questions[0].options.order_by('pk')[2].id)}, {(self.descriptive.id, 'x')},
+        ))
+        self.assertEqual(autosave.get_drafts(self.exam.id, self.student.id), {})
+
+    def test_direct_write_replaces_pending_draft(self):
+        self.autosave([self.choose(self.questions[0], 1)])
+        self.client.post('/api/exam/options-answers/', {
+            'question_id': self.questions[0].id, 'answer_option_id': self.questions[0].options.order_by('pk')[3].id,
+        })
+
+        autosave.flush_pending()
+        self.assertEqual(
+            models.UserOptions.objects.get(user=self.student).answer_option_id,
+            self.questions[0].options.order_by('pk')[3].id,
+        )
+
+    def test_empty_draft_clears_saved_answer(self):
+        models.UserOptions.objects.create(
+            user=self.student, question=self.questions[0], answer_option=self.questions[0].options.first(),
+        )
+        self.autosave([{'question_id': self.questions[0].id}])
+
+        autosave.flush_pending()
+        self.assertFalse(models.UserOptions.objects.filter(user=self.student).exists())
+
+    def test_sweep_writes_drafts_before_expiring(self):
+        self.autosave([self.choose(self.questions[0], 0)])
+        models.UserExamTime.objects.filter(user=self.student).update(finish_time=timezone.now() - timedelta(minutes=1))
+
+        sessions.sweep_expired()
+
+        self.assertTrue(models.UserOptions.objects.filter(user=self.student).exists())
+        self.assertEqual(models.UserExamTime.objects.get(user=self.student).status, 'expired')
+
+    def test_invalid_drafts_are_rejected(self):
+        other_option = {'question_id': self.questions[0].id, 'option_id': self.questions[1].options.first().id}
+        self.assertEqual(self.autosave([other_option]).status_code, 400)
+        self.assertEqual(self.autosave([{'question_id': self.questions[0].id, 'answer_text': 'x'}]).status_code, 400)
+        self.assertEqual(self.autosave([{'question_id': self.questions[0].id + 1000}]).status_code, 400)
+
+    def test_closed_session_rejects_drafts(self):
+        sessions.submit(self.student.id, self.exam)
+        self.assertEqual(self.autosave([self.choose(self.questions[0], 0)]).status_code, 403)
+
+    def test_draft_saved_while_submitting_is_discarded(self):
+        self.autosave([self.choose(self.questions[0], 0)])
+        write = autosave._write
+
+        def write_then_autosave(exam_id, drafts):
+            write(exam_id, drafts)
+            # درخواستی که بین نوشتن پیش‌نویس‌ها و بستن جلسه می‌رسد و جلسه را در کش هنوز باز می‌بیند.
+            self.assertEqual(self.autosave([self.choose(self.questions[0], 1)]).status_code, 202)
+
+        with mock.patch.object(autosave, '_write', write_then_autosave):
+            sessions.submit(self.student.id, self.exam)
+        scoring.process_pending_jobs()
+        submitted = self.saved_answers(self.student)
+
+        self.assertEqual(autosave.flush_pending(), 1)
+        self.assertEqual(self.saved_answers(self.student), submitted)
+        self.assertEqual(submitted[0], {(self.questions[0].id, self.questions[0].options.order_by('pk')[0].id)})
+        self.assertEqual(autosave.get_drafts(self.exam.id, self.student.id), {})
+        self.assertFalse(models.ScoringJob.objects.exists())
+
+    def test_flush_command(self):
+        self.autosave([self.choose(self.questions[0], 0)])
+        call_command('flush_exam_autosave', once=True, stdout=io.StringIO())
+        self.assertTrue(models.UserOptions.objects.filter(user=self.student).exists())
+
+
+@override_settings(EXAM_LIVE_TICK_SECONDS=60)
+class LiveChannelTests(ExamDataMixin, TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.setUpTestData()
+        self.token = Token.objects.create(user=self.student.account)
+
+    async def connect(self, token=None, exam_id=None):
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/exams/{exam_id or self.exam.id}/',
+            'query_string': f'token={token or self.token.key}'.encode(),
+        }
+        communicator = ApplicationCommunicator(live.websocket_application, scope)
+        await communicator.send_input({'type': 'websocket.connect'})
+        return communicator, await communicator.receive_output(timeout=5)
+
+    async def receive(self, communicator):
+        message = await communicator.receive_output(timeout=5)
+        return json.loads(message['text'])
+
+    async def disconnect(self, communicator):
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(timeout=5)
+
+    async def test_connection_receives_ticks(self):
+        await sync_to_async(sessions.start)(self.student.id, self.exam)
+        communicator, accepted = await self.connect()
+
+        self.assertEqual(accepted['type'], 'websocket.accept')
+        tick = await self.receive(communicator)
+        self.assertEqual((tick['type'], tick['exam_status'], tick['status']), ('tick', 'running', 'in_progress'))
+        self.assertGreater(tick['remaining_seconds'], 0)
+        await self.disconnect(communicator)
+
+    async def test_unauthorized_connections_are_closed(self):
+        _, closed = await self.connect(token='invalid')
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': live.CLOSE_UNAUTHENTICATED})
+
+        token = await sync_to_async(Token.objects.create)(user=self.teacher.account)
+        _, closed = await self.connect(token=token.key)
+        self.assertEqual(closed['code'], live.CLOSE_FORBIDDEN)
+
+        _, closed = await self.connect(exam_id=self.exam.id + 1000)
+        self.assertEqual(closed['code'], live.CLOSE_NOT_FOUND)
+
+    async def test_announcement_is_forwarded(self):
+        communicator, _ = await self.connect()
+        await self.receive(communicator)
+
+        await sync_to_async(live.announce)(self.exam.id, 'ten minutes left', 'teacher')
+
+        message = await self.receive(communicator)
+        self.assertEqual((message['type'], message['text']), ('announcement', 'ten minutes left'))
+        await self.disconnect(communicator)
+
+    async def test_sweep_notifies_forced_submit(self):
+        await sync_to_async(models.UserExamTime.objects.create)(
+            user=self.student, exam=self.exam, status='in_progress', finish_time=timezone.now() - timedelta(minutes=1),
+        )
+        communicator, _ = await self.connect()
+        await self.receive(communicator)
+
+        await sync_to_async(sessions.sweep_expired)()
+
+        message = await self.receive(communicator)
+        self.assertEqual((message['type'], message['status']), ('forced_submit', 'expired'))
+        await self.disconnect(communicator)
+
+    async def test_results_published_is_sent_once(self):
+        await sync_to_async(models.Exam.objects.filter(pk=self.exam.pk).update)(
+            result_show_time=timezone.now() - timedelta(minutes=1),
+        )
+        communicator, _ = await self.connect()
+
+        self.assertEqual((await self.receive(communicator))['type'], 'tick')
+        self.assertEqual((await self.receive(communicator))['type'], 'results_published')
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+        await self.disconnect(communicator)
+
+
+class ExamAnnouncementAPITests(ExamDataMixin, APITestCase):
+
+    def test_teacher_announcement_is_published(self):
+        self.client.force_authenticate(self.teacher.account)
+        with mock.patch.object(live, 'publish') as publish:
+            response = self.client.post(f'/api/exam/exams/{self.exam.id}/announcements/', {'text': 'hello'})
+
+        self.assertEqual(response.status_code, 202)
+        (exam_id, message), _ = publish.call_args
+        self.assertEqual((exam_id, message['type'], message['text']), (self.exam.id, 'announcement', 'hello'))
+
+    def test_students_cannot_announce(self):
+        self.client.force_authenticate(self.student.account)
+        response = self.client.post(f'/api/exam/exams/{self.exam.id}/announcements/', {'text': 'hello'})
+        self.assertEqual(response.status_code, 403)
+
+
+class DeduplicationMigrationTests(ExamDataMixin, TransactionTestCase):
+    """
+    داده تکراری پیش از افزودن قیدهای یکتا با مایگریشن‌های 0017 و 0019 پاک می‌شود؛ تعداد گروه‌های تکراری
+    بیشتر از حد عمق عبارت SQLite در یک شرط OR است.
+    """
+    groups = 2000
+
+    def setUp(self):
+        super().setUp()
+        self.setUpTestData()
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes('exam')[0][1])
+        super().tearDown()
+
+    def migrate(self, name):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('exam', name)])
+        return executor.loader.project_state([('exam', name)]).apps
+
+    def test_duplicate_answers_are_removed_and_rescored(self):
+        other = self.create_student(self.institute, 'other-student')
+        questions = models.Question.objects.bulk_create(
+            models.Question(exam=self.exam, text='q', question_type='MultipleChoice', score=1)
+            for _ in range(self.groups // 2)
+        )
+        option = models.Option.objects.create(question=questions[0], text='o', is_correct=True)
+        models.UserExamResult.objects.create(user=self.student, exam=self.exam, score=99)
+
+        apps = self.migrate('0016_scoringjob_userexamresult_is_pending')
+        UserOptions = apps.get_model('exam', 'UserOptions')
+        UserOptions.objects.bulk_create(
+            UserOptions(user_id=student.id, question_id=question.id, answer_option_id=option.id)
+            for _ in range(2) for student in (self.student, other) for question in questions
+        )
+        UserExamResult = apps.get_model('exam', 'UserExamResult')
+        UserExamResult.objects.create(user_id=self.student.id, exam_id=self.exam.id, score=98)
+
+        self.migrate('0017_unique_answers_and_results')
+
+        self.assertEqual(models.UserOptions.objects.count(), self.groups)
+        self.assertEqual(
+            set(models.ScoringJob.objects.values_list('user_id', 'exam_id')),
+            {(self.student.id, self.exam.id), (other.id, self.exam.id)},
+        )
+        result = models.UserExamResult.objects.get(user=self.student, exam=self.exam)
+        self.assertEqual((result.score, result.is_pending), (98, True))
+
+    def test_duplicate_enrollments_are_removed(self):
+        other = self.create_student(self.institute, 'other-student')
+        classrooms = models.Classroom.objects.bulk_create(
+            models.Classroom(name='class', teacher=self.teacher, grade='bachelor') for _ in range(self.groups // 2)
+        )
+
+        apps = self.migrate('0018_leaderboard')
+        StudentClassroom = apps.get_model('exam', 'StudentClassroom')
+        StudentClassroom.objects.bulk_create(
+            StudentClassroom(classroom_id=classroom.id, student_id=student.id)
+            for _ in range(2) for student in (self.student, other) for classroom in classrooms
+        )
+
+        self.migrate('0019_unique_student_classroom')
+
+        self.assertEqual(models.StudentClassroom.objects.exclude(classroom=self.classroom).count(), self.groups)
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN output is checked for SQLite only")
+class IndexUsageTests(ExamDataMixin, APITestCase):
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertIn('USING', plan)
+        self.assertNotRegex(plan, r'SCAN exam_\w+(?! USING)')
+
+    def test_hot_queries_use_indexes(self):
+        self.assertUsesIndex(models.UserExamResult.objects.filter(exam_id=1, user_id=1))
+        self.assertUsesIndex(models.UserExamResult.objects.filter(exam_id=1))
+        self.assertUsesIndex(models.UserExamTime.objects.filter(exam_id=1, user_id=1))
+        self.assertUsesIndex(models.UserExamTime.objects.filter(status='in_progress', finish_time__lt=timezone.now()))
+        self.assertUsesIndex(prewarm.due_exams())
+        self.assertUsesIndex(models.UserOptions.objects.filter(question_id=1, user_id=1))
+        self.assertUsesIndex(models.UserOptions.objects.filter(user_id=1, question__exam_id=1))
+        self.assertUsesIndex(models.UserAnswer.objects.filter(user_id=1, question__exam_id=1))
+
+
+class BenchmarkTests(APITestCase):
+
+    def test_heartbeat_steady_state_is_query_free(self):
+        report = benchmarks.measure_heartbeat(clients=20, rounds=2)
+        self.assertEqual([result['statuses'] for result in report['rounds']], [[200], [200]])
+        self.assertEqual(report['rounds'][1]['queries'], 0)
+
+    def test_values_fast_path_renders_same_output_as_serializer(self):
+        report = benchmarks.compare_list_rendering(rows=30, repeat=1)
+        self.assertTrue(report['identical'])
+        self.assertEqual(set(report['results']), {'serializer+json', 'serializer+orjson', 'values+orjson'})
+
+    def test_exam_paper_and_item_analysis_run_on_seeded_data(self):
+        self.assertEqual(benchmarks.measure_exam_paper(questions=3, repeat=2)['questions'], 3)
+        self.assertEqual(benchmarks.measure_item_analysis(responders=5, questions=2, repeat=1)['responders'], 5)
@@ -4,6 +4,7 @@ from exam import views
 urlpatterns = [
     path('classrooms/', views.ClassroomListCreateAPIView.as_view(), name='classroom'),
     path('classrooms/<int:pk>/', views.ClassroomDetailAPIView.as_view(), name='classroom-detail'),
+    path('classrooms/<int:pk>/enroll/', views.ClassroomEnrollmentAPIView.as_view(), name='classroom-enroll'),
 
     path('students-classrooms/', views.StudentClassroomListCreateAPIView.as_view(), name='students-classroom'),
     path('students-classrooms/<int:pk>/', views.StudentClassroomDetailAPIView.as_view()
@@ -17,6 +18,24 @@ urlpatterns = [
 
     path('classrooms/<int:classroom_id>/exams/', views.ExamListCreateAPIView.as_view(), name='exam'),
     path('classrooms/<int:classroom_id>/exams/<int:pk>/', views.ExamDetailAPIView.as_view(), name='exam-detail'),
+    path('classrooms/<int:pk>/exams/import/', views.ExamImportAPIView.as_view(), name='exam-import'),
+    path('exams/<int:pk>/questions/', views.ExamQuestionsAPIView.as_view(), name='exam-questions'),
+    path('exams/<int:pk>/file/', views.ExamFileAPIView.as_view(), name='exam-file'),
+
+    path('exams/<int:pk>/paper/', views.ExamPaperAPIView.as_view(), name='exam-paper'),
+    path('exams/<int:pk>/submit/', views.ExamSubmitAPIView.as_view(), name='exam-submit'),
+    path('exams/<int:pk>/heartbeat/', views.ExamHeartbeatAPIView.as_view(), name='exam-heartbeat'),
+    path('exams/<int:pk>/finish/', views.ExamFinishAPIView.as_view(), name='exam-finish'),
+    path('exams/<int:pk>/autosave/', views.ExamAutosaveAPIView.as_view(), name='exam-autosave'),
+    path('exams/<int:pk>/announcements/', views.ExamAnnouncementAPIView.as_view(), name='exam-announcements'),
+    path('exams/<int:pk>/export/', views.ExamExportAPIView.as_view(), name='exam-export'),
+    path('classrooms/<int:pk>/export/', views.ClassroomExportAPIView.as_view(), name='classroom-export'),
+    path('institutes/<int:pk>/export/', views.InstituteExportAPIView.as_view(), name='institute-export'),
+    path('exams/<int:pk>/leaderboard/', views.LeaderboardListAPIView.as_view(), name='exam-leaderboard'),
+    path('exams/<int:pk>/leaderboard/summary/', views.LeaderboardSummaryAPIView.as_view(),
+         name='exam-leaderboard-summary'),
+    path('exams/<int:pk>/leaderboard/me/', views.LeaderboardMeAPIView.as_view(), name='exam-leaderboard-me'),
+    path('exams/<int:pk>/item-analysis/', views.ItemAnalysisAPIView.as_view(), name='exam-item-analysis'),
 
     path('classrooms/<int:classroom_id>/exams/<int:exam_id>/questions/', views.QuestionListCreateAPIView.as_view(),
          name='question'),
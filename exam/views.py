@@ -1,8 +1,9 @@
 from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import generics
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
@@ -10,12 +11,26 @@ from . import models
 from . import serializers
 from . import permissions
 from . import filters
+from . import analytics
+from . import authoring
+from . import autosave
+from . import consts
+from . import cache as exam_cache
+from . import exports
+from . import leaderboard
+from . import live
+from . import scoring
+from . import sessions
 from .models import Major, StudentClassroom, UserExamTime
 from rest_framework.response import Response
 from rest_framework import status
+from core.authentication import CachedTokenAuthentication
+from core.principal import get_principal
+from core.mixins import ConditionalListMixin, SelectRelatedMixin, ValuesListMixin
+from core.pagination import KeysetPagination
 
 
-class ClassroomListCreateAPIView(generics.ListCreateAPIView):
+class ClassroomListCreateAPIView(ConditionalListMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.ClassroomSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -40,15 +55,17 @@ class ClassroomListCreateAPIView(generics.ListCreateAPIView):
     ]
 
     ordering = ['name']
+    etag_version_keys = [exam_cache.CLASSROOMS_VERSION_KEY]
+    etag_expand_version_keys = [exam_cache.RELATED_VERSION_KEY]
 
     def get_queryset(self):
-        user = self.request.user
-        if hasattr(user, "student"):
-            return models.Classroom.objects.filter(student_classroom__student=user.student)
-        elif hasattr(user, "teacher"):
-            return models.Classroom.objects.filter(teacher=user.teacher)
-        elif hasattr(user, "institute"):
-            return models.Classroom.objects.filter(teacher__institute=user.institute)
+        principal = get_principal(self.request)
+        if principal.is_student:
+            return models.Classroom.objects.filter(student_classroom__student_id=principal.student_id)
+        elif principal.is_teacher:
+            return models.Classroom.objects.filter(teacher_id=principal.teacher_id)
+        elif principal.is_institute:
+            return models.Classroom.objects.filter(teacher__institute_id=principal.institute_id)
         else:
             return models.Classroom.objects.all()
 
@@ -58,13 +75,13 @@ class ClassroomListCreateAPIView(generics.ListCreateAPIView):
         return [IsAuthenticated()]
 
 
-class ClassroomDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ClassroomDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Classroom.objects.all()
     serializer_class = serializers.ClassroomSerializer
     permission_classes = [IsAuthenticated, permissions.IsAdminOrTeacherOrInstituteOwner]
 
 
-class StudentClassroomListCreateAPIView(generics.ListCreateAPIView):
+class StudentClassroomListCreateAPIView(SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.StudentClassroomSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -88,73 +105,109 @@ class StudentClassroomListCreateAPIView(generics.ListCreateAPIView):
     ordering = ['classroom__name']
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             return models.StudentClassroom.objects.all()
 
-        elif hasattr(user, 'institute'):
-            return models.StudentClassroom.objects.filter(classroom__teacher__institute=user.institute)
+        elif principal.is_institute:
+            return models.StudentClassroom.objects.filter(classroom__teacher__institute_id=principal.institute_id)
 
-        elif hasattr(user, 'teacher'):
-            return models.StudentClassroom.objects.filter(classroom__teacher=user.teacher)
+        elif principal.is_teacher:
+            return models.StudentClassroom.objects.filter(classroom__teacher_id=principal.teacher_id)
 
-        elif hasattr(user, 'student'):
-            return models.StudentClassroom.objects.filter(student=user.student)
+        elif principal.is_student:
+            return models.StudentClassroom.objects.filter(student_id=principal.student_id)
 
         return models.StudentClassroom.objects.none()
 
     def perform_create(self, serializer):
-        user = self.request.user
+        principal = get_principal(self.request)
         classroom = serializer.validated_data['classroom']
         student = serializer.validated_data['student']
 
         if StudentClassroom.objects.filter(classroom=classroom, student=student).exists():
             raise PermissionDenied("قبلا این دانش آموز را به کلاس اضافه کرده اید.")
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             serializer.save()
 
-        elif hasattr(user, 'institute') and classroom.teacher.institute == user.institute:
+        elif principal.is_institute and classroom.teacher.institute_id == principal.institute_id:
             serializer.save()
 
-        elif hasattr(user, 'teacher') and classroom.teacher == user.teacher:
+        elif principal.is_teacher and classroom.teacher_id == principal.teacher_id:
             serializer.save()
 
         else:
             raise PermissionDenied("شما اجازه افزودن دانش‌آموز به این کلاس را ندارید.")
 
 
-class StudentClassroomDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+def get_managed_classroom(request, pk, message):
+    """
+    کلاس را برای مدیر، موسسه کلاس یا استاد آن برمی‌گرداند و برای بقیه خطای دسترسی با پیام ``message`` می‌دهد.
+    """
+    principal = get_principal(request)
+    classroom = get_object_or_404(models.Classroom.objects.select_related('teacher'), pk=pk)
+    allowed = (
+        principal.is_admin or principal.is_superuser
+        or (principal.is_teacher and classroom.teacher_id == principal.teacher_id)
+        or (principal.is_institute and classroom.teacher is not None
+            and classroom.teacher.institute_id == principal.institute_id)
+    )
+    if not allowed:
+        raise PermissionDenied(message)
+    return classroom
+
+
+class ClassroomEnrollmentAPIView(generics.GenericAPIView):
+    """
+    ثبت‌نام گروهی دانش‌آموزان در کلاس توسط مدیر، موسسه کلاس یا استاد آن؛ برای هر ورودی یک ردیف گزارش برمی‌گردد.
+    """
+    serializer_class = serializers.BulkEnrollmentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['classroom'] = self.classroom
+        return context
+
+    def post(self, request, pk):
+        self.classroom = get_managed_classroom(request, pk, "شما اجازه افزودن دانش‌آموز به این کلاس را ندارید.")
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save(), status=status.HTTP_200_OK)
+
+
+class StudentClassroomDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.StudentClassroomSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         obj = get_object_or_404(models.StudentClassroom, pk=self.kwargs["pk"])
 
-        if getattr(user, 'user_type', None) == 'admin':
+        if principal.is_admin:
             return obj
 
-        if hasattr(user, 'student'):
-            if self.request.method == 'GET' and obj.student_id == user.student.id:
+        if principal.is_student:
+            if self.request.method == 'GET' and obj.student_id == principal.student_id:
                 return obj
             raise PermissionDenied("دانش‌آموز فقط می‌تواند پاسخ‌های خودش را مشاهده کند.")
 
-        if hasattr(user, 'institute'):
-            if obj.classroom.teacher.institute_id == user.institute.id:
+        if principal.is_institute:
+            if obj.classroom.teacher.institute_id == principal.institute_id:
                 return obj
             raise PermissionDenied("این کلاس متعلق به موسسه شما نیست.")
 
-        if hasattr(user, 'teacher'):
-            if obj.classroom.teacher_id == user.teacher.id:
+        if principal.is_teacher:
+            if obj.classroom.teacher_id == principal.teacher_id:
                 return obj
             raise PermissionDenied("شما استاد این کلاس نیستید.")
 
         raise PermissionDenied("شما مجاز به انجام این عملیات نیستید.")
 
 
-class MajorListCreateAPIView(generics.ListCreateAPIView):
+class MajorListCreateAPIView(ValuesListMixin, generics.ListCreateAPIView):
     serializer_class = serializers.MajorSerializer
     permission_classes = [IsAuthenticated]
     queryset = Major.objects.all()
@@ -172,7 +225,7 @@ class MajorDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminUser]
 
 
-class ExamCategoryListCreateAPIView(generics.ListCreateAPIView):
+class ExamCategoryListCreateAPIView(ValuesListMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.ExamCategorySerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = filters.ExamCategoryFilter
@@ -193,18 +246,18 @@ class ExamCategoryListCreateAPIView(generics.ListCreateAPIView):
     ordering = ['name']
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.user_type == 'admin':
+        if principal.is_admin:
             return models.ExamCategory.objects.all()
 
-        elif hasattr(user, 'teacher'):
+        elif principal.is_teacher:
             return models.ExamCategory.objects.filter(
-                Q(creator=user) | Q(creator__user_type='admin')
+                Q(creator_id=principal.user_id) | Q(creator__user_type='admin')
             )
-        elif hasattr(user, 'institute'):
+        elif principal.is_institute:
             return models.ExamCategory.objects.filter(
-                Q(creator=user) | Q(creator__user_type='admin')
+                Q(creator_id=principal.user_id) | Q(creator__user_type='admin')
             )
 
         return models.ExamCategory.objects.none()
@@ -215,39 +268,39 @@ class ExamCategoryListCreateAPIView(generics.ListCreateAPIView):
         return [IsAuthenticated()]
 
 
-class ExamCategoryDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ExamCategoryDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.ExamCategorySerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.user_type == 'admin':
+        principal = get_principal(self.request)
+        if principal.is_admin:
             return models.ExamCategory.objects.all()
-        elif hasattr(user, 'teacher'):
+        elif principal.is_teacher:
             return models.ExamCategory.objects.filter(
-                Q(creator=user) | Q(creator__user_type='admin')
+                Q(creator_id=principal.user_id) | Q(creator__user_type='admin')
             )
         return models.ExamCategory.objects.none()
 
     def perform_update(self, serializer):
-        user = self.request.user
+        principal = get_principal(self.request)
         instance = self.get_object()
 
-        if user.user_type == 'admin' or instance.creator == user:
+        if principal.is_admin or instance.creator_id == principal.user_id:
             serializer.save()
         else:
             raise PermissionDenied("شما مجاز به ویرایش این دسته‌بندی نیستید.")
 
     def perform_destroy(self, instance):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.user_type == 'admin' or instance.creator == user:
+        if principal.is_admin or instance.creator_id == principal.user_id:
             instance.delete()
         else:
             raise PermissionDenied("شما مجاز به حذف این دسته‌بندی نیستید.")
 
 
-class ExamListCreateAPIView(generics.ListCreateAPIView):
+class ExamListCreateAPIView(ConditionalListMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.ExamSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -275,29 +328,31 @@ class ExamListCreateAPIView(generics.ListCreateAPIView):
     ]
 
     ordering = ['start_time']
+    etag_version_keys = [exam_cache.CLASSROOM_EXAMS_VERSION_KEY]
+    etag_expand_version_keys = [exam_cache.RELATED_VERSION_KEY]
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         classroom_id = self.kwargs.get('classroom_id')
 
         base_qs = models.Exam.objects.filter(classroom_id=classroom_id)
 
-        if user.user_type == 'admin':
+        if principal.is_admin:
             return base_qs
 
-        elif hasattr(user, 'institute'):
+        elif principal.is_institute:
             return base_qs.filter(
-                classroom__teacher__institute=user.institute
+                classroom__teacher__institute_id=principal.institute_id
             )
 
-        elif hasattr(user, 'teacher'):
+        elif principal.is_teacher:
             return base_qs.filter(
-                classroom__teacher=user.teacher
+                classroom__teacher_id=principal.teacher_id
             )
 
-        elif hasattr(user, 'student'):
+        elif principal.is_student:
             return base_qs.filter(
-                classroom__teacher__institute=user.student.institute
+                classroom__teacher__institute_id=principal.institute_id
             ).distinct()
 
         return models.Exam.objects.none()
@@ -306,13 +361,54 @@ class ExamListCreateAPIView(generics.ListCreateAPIView):
         serializer.save()
 
 
-class ExamDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ExamDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Exam.objects.all()
     serializer_class = serializers.ExamSerializer
     permission_classes = [IsAuthenticated, permissions.IsAdminOrInstituteOrCreatorTeacher]
 
 
-class QuestionListCreateAPIView(generics.ListCreateAPIView):
+class ExamPaperAPIView(generics.GenericAPIView):
+    """
+    برگه آزمون از کش و به صورت JSON از پیش کدشده برگردانده می‌شود؛
+    در حالت پایدار نه کوئری‌ای روی جداول آزمون اجرا می‌شود و نه سریالایزری ساخته می‌شود.
+    """
+    serializer_class = serializers.ExamPaperSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return exam_cache.paper_queryset()
+
+    def get(self, request, *args, **kwargs):
+        exam_id = self.kwargs['pk']
+        paper = exam_cache.get_paper(exam_id, lambda: self.get_queryset().filter(pk=exam_id).first())
+        if paper is None:
+            raise NotFound("آزمون مشخص‌شده وجود ندارد.")
+
+        variant = self.get_paper_variant(get_principal(request), paper)
+        if variant is None:
+            raise NotFound("آزمون مشخص‌شده وجود ندارد.")
+
+        return HttpResponse(paper[variant], content_type='application/json')
+
+    def get_paper_variant(self, principal, paper):
+        if principal.is_admin:
+            return 'full'
+
+        elif principal.is_institute:
+            return 'full' if paper['institute_id'] == principal.institute_id else None
+
+        elif principal.is_teacher:
+            return 'full' if paper['teacher_id'] == principal.teacher_id else None
+
+        elif principal.is_student:
+            if paper['institute_id'] != principal.institute_id:
+                return None
+            return 'public' if timezone.now() < paper['end_time'] else 'full'
+
+        return None
+
+
+class QuestionListCreateAPIView(ConditionalListMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.QuestionSerializer
     permission_classes = [IsAuthenticated, permissions.IsAdminOrInstituteOrTeacherForQuestion]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -343,33 +439,96 @@ class QuestionListCreateAPIView(generics.ListCreateAPIView):
     ]
 
     ordering = ['exam__start_time']
+    etag_version_keys = [exam_cache.PAPER_VERSION_KEY]
+    etag_expand_version_keys = [exam_cache.RELATED_VERSION_KEY]
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         exam_id = self.kwargs.get('exam_id')
 
-        if user.user_type == 'admin':
+        if principal.is_admin:
             return models.Question.objects.filter(exam_id=exam_id)
 
-        if hasattr(user, 'institute'):
+        if principal.is_institute:
             return models.Question.objects.filter(
-                exam__classroom__teacher__institute=user.institute, exam_id=exam_id
+                exam__classroom__teacher__institute_id=principal.institute_id, exam_id=exam_id
             )
 
-        if hasattr(user, 'teacher'):
+        if principal.is_teacher:
             return models.Question.objects.filter(
-                exam__classroom__teacher=user.teacher, exam_id=exam_id
+                exam__classroom__teacher_id=principal.teacher_id, exam_id=exam_id
             )
 
-        if hasattr(user, 'student'):
+        if principal.is_student:
             return models.Question.objects.filter(
-                exam__classroom__teacher__institute=user.student.institute, exam_id=exam_id
+                exam__classroom__teacher__institute_id=principal.institute_id, exam_id=exam_id
             ).distinct()
 
         return models.Question.objects.none()
 
 
-class QuestionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ExamQuestionsAPIView(generics.GenericAPIView):
+    """
+    ساخت یک سوال یا لیستی از سوالات به همراه گزینه‌ها در یک تراکنش.
+    """
+    serializer_class = serializers.QuestionWithOptionsSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['exam'] = self.exam
+        return context
+
+    def post(self, request, pk):
+        self.exam = managed_exams(request, "شما اجازه ایجاد سوال را ندارید.").filter(pk=pk).first()
+        if self.exam is None:
+            raise NotFound("آزمون یافت نشد.")
+
+        serializer = self.get_serializer(data=request.data, many=isinstance(request.data, list))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ExamFileAPIView(generics.GenericAPIView):
+    """
+    خروجی آزمون (مشخصات، سوالات و گزینه‌ها) در قالب فایل JSON قابل انتقال.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        exam = managed_exams(request, "شما اجازه دریافت خروجی را ندارید.").select_related('category').filter(
+            pk=pk).first()
+        if exam is None:
+            raise NotFound("آزمون یافت نشد.")
+
+        response = Response(authoring.export_exam(exam))
+        response['Content-Disposition'] = f'attachment; filename="exam-{pk}.json"'
+        return response
+
+
+class ExamImportAPIView(generics.GenericAPIView):
+    """
+    ساخت آزمون در کلاس از روی فایل آزمون؛ همه سوالات و گزینه‌ها در یک تراکنش با ``bulk_create`` ساخته می‌شوند.
+    """
+    serializer_class = serializers.ExamImportSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['classroom'] = self.classroom
+        return context
+
+    def post(self, request, pk):
+        self.classroom = get_managed_classroom(request, pk, "شما اجازه ساخت آزمون در این کلاس را ندارید.")
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        exam = serializer.save()
+        return Response(serializers.ExamSerializer(exam, context=self.get_serializer_context()).data,
+                        status=status.HTTP_201_CREATED)
+
+
+class QuestionDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.QuestionSerializer
     permission_classes = [IsAuthenticated, permissions.IsAdminOrInstituteOrTeacherForQuestion]
 
@@ -377,7 +536,7 @@ class QuestionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         return models.Question.objects.select_related('exam__classroom__teacher__institute')
 
 
-class OptionListCreateAPIView(generics.ListCreateAPIView):
+class OptionListCreateAPIView(ConditionalListMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.OptionSerializer
     permission_classes = [IsAuthenticated, permissions.OptionPermission]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -397,23 +556,25 @@ class OptionListCreateAPIView(generics.ListCreateAPIView):
     ]
 
     ordering = ['text']
+    etag_version_keys = [exam_cache.QUESTION_OPTIONS_VERSION_KEY]
+    etag_expand_version_keys = [exam_cache.RELATED_VERSION_KEY]
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         question_id = self.kwargs.get('question_id')
         queryset = models.Option.objects.filter(question_id=question_id)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return queryset
 
-        elif hasattr(user, 'teacher'):
-            return queryset.filter(question__exam__classroom__teacher=user.teacher)
+        elif principal.is_teacher:
+            return queryset.filter(question__exam__classroom__teacher_id=principal.teacher_id)
 
-        elif hasattr(user, 'institute'):
-            return queryset.filter(question__exam__classroom__teacher__institute=user.institute)
+        elif principal.is_institute:
+            return queryset.filter(question__exam__classroom__teacher__institute_id=principal.institute_id)
 
-        elif hasattr(user, 'student'):
-            return queryset.filter(question__exam__classroom__teacher__institute=user.student.institute)
+        elif principal.is_student:
+            return queryset.filter(question__exam__classroom__teacher__institute_id=principal.institute_id)
 
         return models.Option.objects.none()
 
@@ -427,37 +588,39 @@ class OptionListCreateAPIView(generics.ListCreateAPIView):
         serializer.save(question=question)
 
 
-class OptionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class OptionDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.OptionSerializer
     permission_classes = [IsAuthenticated, permissions.OptionPermission]
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         queryset = models.Option.objects.filter(
             question_id=self.kwargs.get('question_id')
         ).select_related('question__exam__classroom__teacher__institute')
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return queryset
 
-        elif hasattr(user, 'institute'):
-            return queryset.filter(question__exam__classroom__teacher__institute=user.institute)
+        elif principal.is_institute:
+            return queryset.filter(question__exam__classroom__teacher__institute_id=principal.institute_id)
 
-        elif hasattr(user, 'teacher'):
-            return queryset.filter(question__exam__classroom__teacher=user.teacher)
+        elif principal.is_teacher:
+            return queryset.filter(question__exam__classroom__teacher_id=principal.teacher_id)
 
-        elif hasattr(user, 'student'):
-            return queryset.filter(question__exam__classroom__teacher__institute=user.student.institute)
+        elif principal.is_student:
+            return queryset.filter(question__exam__classroom__teacher__institute_id=principal.institute_id)
 
         return models.Option.objects.none()
 
 
-class UserAnswerListCreateAPIView(generics.ListCreateAPIView):
+class UserAnswerListCreateAPIView(SelectRelatedMixin, generics.ListCreateAPIView):
     queryset = models.UserAnswer.objects.select_related(
         'question__exam__classroom__teacher__institute', 'user'
     )
     serializer_class = serializers.UserAnswerSerializer
     permission_classes = [permissions.UserAnswerPermission]
+    pagination_class = KeysetPagination
+    page_size = 200
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = filters.UserAnswerFilter
 
@@ -483,37 +646,37 @@ class UserAnswerListCreateAPIView(generics.ListCreateAPIView):
     ordering = ['-score']
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return models.UserAnswer.objects.all()
 
-        if hasattr(user, 'institute'):
+        if principal.is_institute:
             return models.UserAnswer.objects.filter(
-                question__exam__classroom__teacher__institute=user.institute)
+                question__exam__classroom__teacher__institute_id=principal.institute_id)
 
-        if hasattr(user, 'teacher'):
+        if principal.is_teacher:
             return models.UserAnswer.objects.filter(
-                question__exam__classroom__teacher=user.teacher)
+                question__exam__classroom__teacher_id=principal.teacher_id)
 
-        if hasattr(user, 'student'):
-            return models.UserAnswer.objects.filter(user=user.student)
+        if principal.is_student:
+            return models.UserAnswer.objects.filter(user_id=principal.student_id)
 
         return models.UserAnswer.objects.none()
 
     def perform_create(self, serializer):
-        user = self.request.user
+        principal = get_principal(self.request)
         question = serializer.validated_data['question']
 
         if question.question_type != 'Descriptive':
             raise ValidationError("فقط برای سوالات تشریحی می‌توانید پاسخ ثبت کنید.")
 
-        if hasattr(user, 'student'):
-            if question.exam.classroom.teacher.institute != user.student.institute:
+        if principal.is_student:
+            if question.exam.classroom.teacher.institute_id != principal.institute_id:
                 raise ValidationError("شما مجاز به پاسخ به این سوال نیستید.")
-            serializer.save(user=user.student)
+            serializer.save(user=self.request.user.student)
 
-        elif user.is_superuser:
+        elif principal.is_superuser:
             if 'user' not in serializer.validated_data:
                 raise ValidationError("ادمین باید دانش‌آموز را مشخص کند.")
             serializer.save()
@@ -522,7 +685,7 @@ class UserAnswerListCreateAPIView(generics.ListCreateAPIView):
             raise ValidationError("فقط دانش‌آموز یا ادمین می‌توانند پاسخ ثبت کنند.")
 
 
-class UserAnswerDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class UserAnswerDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.UserAnswer.objects.select_related(
         'question__exam__classroom__teacher__institute', 'user'
     )
@@ -530,28 +693,38 @@ class UserAnswerDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.UserAnswerPermission]
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return models.UserAnswer.objects.all()
 
-        if hasattr(user, 'institute'):
+        if principal.is_institute:
             return models.UserAnswer.objects.filter(
-                question__exam__classroom__teacher__institute=user.institute)
+                question__exam__classroom__teacher__institute_id=principal.institute_id)
 
-        if hasattr(user, 'teacher'):
+        if principal.is_teacher:
             return models.UserAnswer.objects.filter(
-                question__exam__classroom__teacher=user.teacher)
+                question__exam__classroom__teacher_id=principal.teacher_id)
 
-        if hasattr(user, 'student'):
-            return models.UserAnswer.objects.filter(user=user.student)
+        if principal.is_student:
+            return models.UserAnswer.objects.filter(user_id=principal.student_id)
 
         return models.UserAnswer.objects.none()
 
+    def perform_destroy(self, instance):
+        exam_id = instance.question.exam_id
+        if get_principal(self.request).is_student:
+            sessions.ensure_writable(instance.user_id, instance.question.exam)
+        autosave.discard(exam_id, instance.user_id, [instance.question_id])
+        instance.delete()
+        scoring.request_rescore(instance.user_id, exam_id)
+
 
-class UserOptionsListCreateAPIView(generics.ListCreateAPIView):
+class UserOptionsListCreateAPIView(SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.UserOptionsSerializer
     permission_classes = [IsAuthenticated, permissions.UserOptionsPermission]
+    pagination_class = KeysetPagination
+    page_size = 200
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = filters.UserOptionsFilter
 
@@ -576,56 +749,197 @@ class UserOptionsListCreateAPIView(generics.ListCreateAPIView):
     ordering = ['user__account__last_name']
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return models.UserOptions.objects.all()
 
-        elif hasattr(user, 'institute'):
+        elif principal.is_institute:
             return models.UserOptions.objects.filter(
-                question__exam__classroom__teacher__institute=user.institute
+                question__exam__classroom__teacher__institute_id=principal.institute_id
             )
 
-        elif hasattr(user, 'teacher'):
+        elif principal.is_teacher:
             return models.UserOptions.objects.filter(
-                question__exam__classroom__teacher=user.teacher
+                question__exam__classroom__teacher_id=principal.teacher_id
             )
 
-        elif hasattr(user, 'student'):
-            return models.UserOptions.objects.filter(user=user.student)
+        elif principal.is_student:
+            return models.UserOptions.objects.filter(user_id=principal.student_id)
 
         return models.UserOptions.objects.none()
 
 
-class UserOptionsDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class UserOptionsDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.UserOptionsSerializer
     permission_classes = [IsAuthenticated, permissions.UserOptionsPermission]
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return models.UserOptions.objects.all()
 
-        elif hasattr(user, 'institute'):
+        elif principal.is_institute:
             return models.UserOptions.objects.filter(
-                question__exam__classroom__teacher__institute=user.institute
+                question__exam__classroom__teacher__institute_id=principal.institute_id
             )
 
-        elif hasattr(user, 'teacher'):
+        elif principal.is_teacher:
             return models.UserOptions.objects.filter(
-                question__exam__classroom__teacher=user.teacher
+                question__exam__classroom__teacher_id=principal.teacher_id
             )
 
-        elif hasattr(user, 'student'):
-            return models.UserOptions.objects.filter(user=user.student)
+        elif principal.is_student:
+            return models.UserOptions.objects.filter(user_id=principal.student_id)
 
         return models.UserOptions.objects.none()
 
+    def perform_destroy(self, instance):
+        exam_id = instance.question.exam_id
+        if get_principal(self.request).is_student:
+            sessions.ensure_writable(instance.user_id, instance.question.exam)
+        autosave.discard(exam_id, instance.user_id, [instance.question_id])
+        instance.delete()
+        scoring.request_rescore(instance.user_id, exam_id)
+
+
+class ExamSubmitAPIView(generics.GenericAPIView):
+    """
+    ثبت یکجای پاسخ‌های تستی و تشریحی دانش‌آموز برای یک آزمون در یک تراکنش.
+    """
+    serializer_class = serializers.ExamSubmissionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['exam'] = self.exam
+        return context
+
+    def post(self, request, *args, **kwargs):
+        principal = get_principal(request)
+        if not principal.is_student:
+            raise PermissionDenied("فقط دانش‌آموز می‌تواند پاسخ‌های آزمون را ثبت کند.")
+
+        self.exam = get_object_or_404(models.Exam.objects.select_related('classroom__teacher'), pk=self.kwargs['pk'])
+        if self.exam.classroom.teacher.institute_id != principal.institute_id:
+            raise PermissionDenied("شما مجاز به پاسخ به این آزمون نیستید.")
+        sessions.ensure_writable(principal.student_id, self.exam)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = serializer.save(student=request.user.student)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class ExamHeartbeatAPIView(generics.GenericAPIView):
+    """
+    زمان‌سنج صفحه آزمون که دانش‌آموزان مرتب آن را می‌خوانند. توکن، زمان‌بندی آزمون و جلسه دانش‌آموز همه از
+    کش خوانده می‌شوند و در حالت عادی هیچ کوئری‌ای به پایگاه داده زده نمی‌شود.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        principal = get_principal(request)
+        if not principal.is_student:
+            raise PermissionDenied("فقط دانش‌آموز به زمان‌سنج آزمون دسترسی دارد.")
+
+        timing = exam_cache.get_exam_timing(self.kwargs['pk'])
+        if timing is None:
+            raise NotFound("آزمون یافت نشد.")
+        if timing['institute_id'] != principal.institute_id:
+            raise PermissionDenied("شما به این آزمون دسترسی ندارید.")
+
+        return Response(sessions.heartbeat(principal.student_id, self.kwargs['pk'], timing))
 
-class UserExamResultListAPIView(generics.ListAPIView):
+
+class ExamAutosaveAPIView(generics.GenericAPIView):
+    """
+    ذخیره خودکار پاسخ‌های جلسه در حال انجام. پیش‌نویس‌ها فقط در بافر ذخیره خودکار نوشته می‌شوند و
+    flush_exam_autosave آن‌ها را به صورت دسته‌ای (و ثبت نهایی جلسه بلافاصله) در جداول پاسخ می‌نویسد. توکن،
+    زمان‌بندی، برگه و جلسه از کش خوانده می‌شوند و در حالت عادی هیچ کوئری‌ای به پایگاه داده زده نمی‌شود.
+    """
+    serializer_class = serializers.AutosaveSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_timing(self, principal):
+        if not principal.is_student:
+            raise PermissionDenied("فقط دانش‌آموز می‌تواند پاسخ‌های آزمون را ذخیره کند.")
+
+        timing = exam_cache.get_exam_timing(self.kwargs['pk'])
+        if timing is None:
+            raise NotFound("آزمون یافت نشد.")
+        if timing['institute_id'] != principal.institute_id:
+            raise PermissionDenied("شما مجاز به پاسخ به این آزمون نیستید.")
+        return timing
+
+    def get(self, request, *args, **kwargs):
+        principal = get_principal(request)
+        self.get_timing(principal)
+        return Response(self.get_serializer(autosave.get_drafts(self.kwargs['pk'], principal.student_id)).data)
+
+    def put(self, request, *args, **kwargs):
+        principal = get_principal(request)
+        timing = self.get_timing(principal)
+        exam_id = self.kwargs['pk']
+        # start فقط به این فیلدها نیاز دارد؛ آزمون از پایگاه داده خوانده نمی‌شود.
+        exam = models.Exam(pk=exam_id, start_time=timing['start_time'], end_time=timing['end_time'],
+                           duration_minutes=timing['duration_minutes'])
+        sessions.ensure_writable(principal.student_id, exam)
+
+        paper = exam_cache.get_paper(exam_id, lambda: exam_cache.paper_queryset().filter(pk=exam_id).first())
+        serializer = self.get_serializer(data=request.data, context={**self.get_serializer_context(), 'paper': paper})
+        serializer.is_valid(raise_exception=True)
+        autosave.save(exam_id, principal.student_id, serializer.validated_data['answers'])
+        return Response({'saved': len(serializer.validated_data['answers'])}, status=status.HTTP_202_ACCEPTED)
+
+
+class ExamAnnouncementAPIView(generics.GenericAPIView):
+    """
+    ارسال اطلاعیه به همه دانش‌آموزانی که به کانال زنده آزمون متصل هستند؛ اطلاعیه ذخیره نمی‌شود.
+    """
+    serializer_class = serializers.AnnouncementSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        exams = managed_exams(request, "شما مجاز به ارسال اطلاعیه برای این آزمون نیستید.")
+        if not exams.filter(pk=pk).exists():
+            raise NotFound("آزمون یافت نشد.")
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sender = request.user.get_full_name() or request.user.username
+        live.announce(pk, serializer.validated_data['text'], sender)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class ExamFinishAPIView(generics.GenericAPIView):
+    """
+    ثبت نهایی جلسه آزمون دانش‌آموز؛ پس از آن هیچ پاسخی پذیرفته نمی‌شود.
+    """
+    serializer_class = serializers.UserExamTimeSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        principal = get_principal(request)
+        if not principal.is_student:
+            raise PermissionDenied("فقط دانش‌آموز می‌تواند آزمون را ثبت نهایی کند.")
+
+        exam = get_object_or_404(models.Exam.objects.select_related('classroom__teacher'), pk=self.kwargs['pk'])
+        if exam.classroom.teacher.institute_id != principal.institute_id:
+            raise PermissionDenied("شما مجاز به پاسخ به این آزمون نیستید.")
+
+        instance = sessions.submit(principal.student_id, exam)
+        return Response(self.get_serializer(instance).data, status=status.HTTP_200_OK)
+
+
+class UserExamResultListAPIView(ValuesListMixin, SelectRelatedMixin, generics.ListAPIView):
     serializer_class = serializers.UserExamResultSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    page_size = 200
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['user', 'exam', 'score', 'exam__classroom', 'exam__classroom__teacher',
                         'exam__result_show_time']
@@ -640,27 +954,27 @@ class UserExamResultListAPIView(generics.ListAPIView):
     ordering_fields = ['score', 'exam__result_show_time', 'exam__title', 'user', 'exam']
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return models.UserExamResult.objects.all()
 
-        elif hasattr(user, 'institute'):
+        elif principal.is_institute:
             return models.UserExamResult.objects.filter(
-                exam__classroom__teacher__institute=user.institute
+                exam__classroom__teacher__institute_id=principal.institute_id
             )
 
-        elif hasattr(user, 'teacher'):
+        elif principal.is_teacher:
             return models.UserExamResult.objects.filter(
-                exam__classroom__teacher=user.teacher
+                exam__classroom__teacher_id=principal.teacher_id
             )
 
 
-        elif hasattr(user, 'student'):
+        elif principal.is_student:
             now = timezone.now()
 
             return models.UserExamResult.objects.filter(
-                user=user.student
+                user_id=principal.student_id
             ).filter(
 
                 Q(exam__result_show_time__lte=now) | Q(exam__result_show_time__isnull=True)
@@ -668,30 +982,30 @@ class UserExamResultListAPIView(generics.ListAPIView):
         return models.UserExamResult.objects.none()
 
 
-class UserExamResultDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class UserExamResultDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.UserExamResult.objects.select_related('exam__classroom__teacher', 'user')
     serializer_class = serializers.UserExamResultSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
         obj = super().get_object()
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return obj
 
-        if hasattr(user, 'institute'):
-            if obj.exam.classroom.teacher.institute == user.institute:
+        if principal.is_institute:
+            if obj.exam.classroom.teacher.institute_id == principal.institute_id:
                 return obj
             raise PermissionDenied("شما به این نتیجه دسترسی ندارید.")
 
-        if hasattr(user, 'teacher'):
-            if obj.exam.classroom.teacher == user.teacher:
+        if principal.is_teacher:
+            if obj.exam.classroom.teacher_id == principal.teacher_id:
                 return obj
             raise PermissionDenied("شما به این نتیجه دسترسی ندارید.")
 
-        if hasattr(user, 'student'):
-            if obj.user == user.student:
+        if principal.is_student:
+            if obj.user_id == principal.student_id:
                 now = timezone.now()
                 if obj.exam.result_show_time is None or obj.exam.result_show_time <= now:
                     if self.request.method in ['PUT', 'PATCH', 'DELETE']:
@@ -702,56 +1016,47 @@ class UserExamResultDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         raise PermissionDenied("شما اجازه دسترسی به این نتیجه را ندارید.")
 
 
-class UserExamTimeListCreateAPIView(generics.ListCreateAPIView):
+class UserExamTimeListCreateAPIView(ValuesListMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.UserExamTimeSerializer
     permission_classes = [IsAuthenticated]
     queryset = UserExamTime.objects.all()
 
     def create(self, request, *args, **kwargs):
-        user = self.request.user
-        try:
-            account = models.CustomUser.objects.get(pk=user.id)
-        except models.CustomUser.DoesNotExist:
-            return Response({"detail": "کاربر مشخص‌شده وجود ندارد."}, status=status.HTTP_404_NOT_FOUND)
-
-        student = getattr(account, "student", None)
-        if not student:
+        principal = get_principal(request)
+        if not principal.is_student:
             return Response({"detail": "این کاربر دانش‌آموز نیست."}, status=status.HTTP_400_BAD_REQUEST)
 
         exam_id = request.data.get("exam_id")
         if not exam_id:
             return Response({"detail": "شناسه آزمون الزامی است."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            exam_id = int(exam_id)
+        except (TypeError, ValueError):
+            return Response({"detail": "شناسه آزمون معتبر نیست."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # صفحه آزمون این مسیر را با هر بار باز شدن دوباره می‌خواند؛ جلسه شروع‌شده از کش برگردانده می‌شود.
+        session = sessions.get_session(principal.student_id, exam_id)
+        if session['status'] != consts.SESSION_NOT_STARTED:
+            instance = models.UserExamTime(user_id=principal.student_id, exam_id=exam_id, **session)
+            return Response(self.get_serializer(instance).data, status=status.HTTP_200_OK)
 
         try:
             exam = models.Exam.objects.get(pk=exam_id)
         except models.Exam.DoesNotExist:
             return Response({"detail": "آزمون مشخص‌شده وجود ندارد."}, status=status.HTTP_404_NOT_FOUND)
 
-        if exam.end_time < timezone.now():
-            return Response({"detail": "زمان انجام آزمون به پایان رسیده است."}, status=status.HTTP_400_BAD_REQUEST)
-
-        instance = models.UserExamTime.objects.filter(user=student, exam=exam).first()
-        if instance:
-            serializer = self.get_serializer(instance)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-
-        finish_time = timezone.now() + timezone.timedelta(minutes=exam.duration_minutes)
-        instance = models.UserExamTime.objects.create(
-            user=student,
-            exam=exam,
-            finish_time=finish_time
-        )
+        instance, created = sessions.start(principal.student_id, exam)
         serializer = self.get_serializer(instance)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
-class UserExamTimeDetailAPIView(generics.RetrieveAPIView):
+class UserExamTimeDetailAPIView(SelectRelatedMixin, generics.RetrieveAPIView):
     serializer_class = serializers.UserExamTimeSerializer
     permission_classes = [IsAuthenticated]
     queryset = UserExamTime.objects.all()
 
 
-class FeedbackListCreateAPIView(generics.ListCreateAPIView):
+class FeedbackListCreateAPIView(ValuesListMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     serializer_class = serializers.FeedbackSerializer
     permission_classes = [IsAuthenticated, permissions.FeedbackPermission]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -775,40 +1080,207 @@ class FeedbackListCreateAPIView(generics.ListCreateAPIView):
     ordering = ['user__account__last_name']
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return models.Feedback.objects.all()
 
-        if hasattr(user, 'institute'):
-            return models.Feedback.objects.filter(exam__classroom__teacher__institute=user.institute)
+        if principal.is_institute:
+            return models.Feedback.objects.filter(exam__classroom__teacher__institute_id=principal.institute_id)
 
-        if hasattr(user, 'teacher'):
-            return models.Feedback.objects.filter(exam__classroom__teacher=user.teacher)
+        if principal.is_teacher:
+            return models.Feedback.objects.filter(exam__classroom__teacher_id=principal.teacher_id)
 
-        if hasattr(user, 'student'):
-            return models.Feedback.objects.filter(user=user.student)
+        if principal.is_student:
+            return models.Feedback.objects.filter(user_id=principal.student_id)
 
         return models.Feedback.objects.none()
 
 
-class FeedbackDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class FeedbackDetailAPIView(SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.FeedbackSerializer
     permission_classes = [IsAuthenticated, permissions.FeedbackPermission]
 
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
 
-        if user.is_superuser:
+        if principal.is_superuser:
             return models.Feedback.objects.all()
 
-        if hasattr(user, 'institute'):
-            return models.Feedback.objects.filter(exam__classroom__teacher__institute=user.institute)
+        if principal.is_institute:
+            return models.Feedback.objects.filter(exam__classroom__teacher__institute_id=principal.institute_id)
 
-        if hasattr(user, 'teacher'):
-            return models.Feedback.objects.filter(exam__classroom__teacher=user.teacher)
+        if principal.is_teacher:
+            return models.Feedback.objects.filter(exam__classroom__teacher_id=principal.teacher_id)
 
-        if hasattr(user, 'student'):
-            return models.Feedback.objects.filter(user=user.student)
+        if principal.is_student:
+            return models.Feedback.objects.filter(user_id=principal.student_id)
 
         return models.Feedback.objects.none()
+
+
+def managed_exams(request, message):
+    """
+    آزمون‌هایی که کاربر مدیریت می‌کند: همه آزمون‌ها برای مدیر، آزمون‌های موسسه و آزمون‌های کلاس‌های استاد.
+    برای بقیه کاربران خطای دسترسی با پیام ``message`` برمی‌گردد.
+    """
+    principal = get_principal(request)
+    exams = models.Exam.objects.order_by('pk')
+
+    if principal.is_admin or principal.is_superuser:
+        return exams
+    if principal.is_institute:
+        return exams.filter(classroom__teacher__institute_id=principal.institute_id)
+    if principal.is_teacher:
+        return exams.filter(classroom__teacher_id=principal.teacher_id)
+    raise PermissionDenied(message)
+
+
+class ExportMixin:
+    """
+    خروجی جریانی CSV یا XLSX از نتایج (``kind=results``)، پاسخ‌ها (``kind=answers``) یا ماتریس
+    دانش‌آموز × سوال (``kind=matrix``، فقط برای یک آزمون). قالب فایل با ``output=csv|xlsx`` انتخاب می‌شود.
+    ردیف‌ها دسته به دسته از پایگاه داده خوانده و همان لحظه فرستاده می‌شوند. view باید ``scope`` و متد
+    ``get_exams(pk)`` را که آزمون‌های مجاز خروجی را برمی‌گرداند تعریف کند.
+    """
+    permission_classes = [IsAuthenticated]
+    kinds = ('results', 'answers')
+
+    def get_queryset(self):
+        return managed_exams(self.request, "شما اجازه دریافت خروجی را ندارید.")
+
+    def get_rows(self, kind, exams):
+        if kind == 'results':
+            return exports.result_rows(exams)
+        if kind == 'answers':
+            return exports.answer_rows(exams)
+        return exports.matrix_rows(exams[0])
+
+    def get(self, request, pk):
+        kind = request.query_params.get('kind', 'results')
+        output = request.query_params.get('output', 'csv')
+        if kind not in self.kinds:
+            raise ValidationError({'kind': f"مقدار مجاز: {', '.join(self.kinds)}"})
+        if output not in exports.WRITERS:
+            raise ValidationError({'output': f"مقدار مجاز: {', '.join(exports.WRITERS)}"})
+
+        exams = list(self.get_exams(pk).only('id', 'title'))
+        writer, content_type = exports.WRITERS[output]
+        response = StreamingHttpResponse(writer(self.get_rows(kind, exams)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.scope}-{pk}-{kind}.{output}"'
+        return response
+
+
+class ExamExportAPIView(ExportMixin, generics.GenericAPIView):
+    scope = 'exam'
+    kinds = ('results', 'answers', 'matrix')
+
+    def get_exams(self, pk):
+        exams = self.get_queryset().filter(pk=pk)
+        if not exams.exists():
+            raise NotFound("آزمون یافت نشد.")
+        return exams
+
+
+class ClassroomExportAPIView(ExportMixin, generics.GenericAPIView):
+    scope = 'classroom'
+
+    def get_exams(self, pk):
+        get_managed_classroom(self.request, pk, "شما به این کلاس دسترسی ندارید.")
+        return self.get_queryset().filter(classroom_id=pk)
+
+
+class InstituteExportAPIView(ExportMixin, generics.GenericAPIView):
+    scope = 'institute'
+
+    def get_exams(self, pk):
+        principal = get_principal(self.request)
+        if not (principal.is_admin or principal.is_superuser or (principal.is_institute and principal.institute_id == pk)):
+            raise PermissionDenied("شما به این موسسه دسترسی ندارید.")
+        return self.get_queryset().filter(classroom__teacher__institute_id=pk)
+
+
+def get_leaderboard_exam(request, pk):
+    """
+    آزمون را برای مشاهده جدول رتبه‌بندی برمی‌گرداند: مدیر، موسسه و استاد صاحب آزمون و دانش‌آموزان کلاس آن
+    (پس از زمان نمایش نتایج) دسترسی دارند.
+    """
+    principal = get_principal(request)
+    exam = get_object_or_404(models.Exam.objects.select_related('classroom__teacher'), pk=pk)
+    teacher = exam.classroom.teacher
+
+    if principal.is_admin or principal.is_superuser:
+        return exam
+    if principal.is_institute and teacher is not None and teacher.institute_id == principal.institute_id:
+        return exam
+    if principal.is_teacher and exam.classroom.teacher_id == principal.teacher_id:
+        return exam
+    if principal.is_student and principal.student_id in exam_cache.get_classroom_students(exam.classroom_id):
+        if exam.result_show_time is None or exam.result_show_time <= timezone.now():
+            return exam
+        raise PermissionDenied("هنوز زمان مشاهده نتایج این آزمون فرا نرسیده است.")
+    raise PermissionDenied("شما به رتبه‌بندی این آزمون دسترسی ندارید.")
+
+
+class LeaderboardListAPIView(ValuesListMixin, SelectRelatedMixin, generics.ListAPIView):
+    serializer_class = serializers.LeaderboardEntrySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['rank', 'score']
+    ordering = ['rank']
+
+    def get_serializer_class(self):
+        if get_principal(self.request).is_student:
+            return serializers.StudentLeaderboardEntrySerializer
+        return serializers.LeaderboardEntrySerializer
+
+    def get_queryset(self):
+        exam = get_leaderboard_exam(self.request, self.kwargs['pk'])
+        board = leaderboard.ensure(exam.id)
+        return models.LeaderboardEntry.objects.filter(exam_id=exam.id).annotate(
+            percentile=leaderboard.percentile_expression(board.participants)
+        )
+
+
+class LeaderboardSummaryAPIView(generics.GenericAPIView):
+    serializer_class = serializers.LeaderboardSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        exam = get_leaderboard_exam(request, pk)
+        return Response(self.get_serializer(leaderboard.ensure(exam.id)).data)
+
+
+class LeaderboardMeAPIView(generics.GenericAPIView):
+    serializer_class = serializers.LeaderboardEntrySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        principal = get_principal(request)
+        if not principal.is_student:
+            raise PermissionDenied("فقط دانش‌آموزان رتبه شخصی دارند.")
+
+        exam = get_leaderboard_exam(request, pk)
+        board = leaderboard.ensure(exam.id)
+        entry = models.LeaderboardEntry.objects.filter(exam_id=exam.id, user_id=principal.student_id).first()
+        if entry is None:
+            raise NotFound("برای شما نتیجه‌ای در این آزمون ثبت نشده است.")
+
+        entry.percentile = leaderboard.percentile_of(entry.rank, board.participants)
+        data = self.get_serializer(entry).data
+        data['participants'] = board.participants
+        return Response(data)
+
+
+class ItemAnalysisAPIView(generics.GenericAPIView):
+    """
+    تحلیل سوالات آزمون (ضریب دشواری، ضریب تمیز و تحلیل گزینه‌ها) برای مدیر، موسسه و استاد آزمون.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        exams = managed_exams(request, "شما به تحلیل سوالات این آزمون دسترسی ندارید.")
+        if not exams.filter(pk=pk).exists():
+            raise NotFound("آزمون یافت نشد.")
+        return Response(analytics.get_item_analysis(pk))
@@ -2,6 +2,8 @@
 ASGI config for online_exam_platform_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests are served by Django; WebSocket connections under ``/ws/exams/<id>/``
+are served by the live exam channel in ``exam.live``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_exam_platform_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from exam.live import websocket_application  # noqa: E402  (needs the app registry loaded above)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
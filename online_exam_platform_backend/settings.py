@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from decouple import config as env
 
@@ -85,17 +86,80 @@ WSGI_APPLICATION = 'online_exam_platform_backend.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# برای اجرای محلی تست‌ها و بنچمارک‌ها می‌توان DATABASE_ENGINE را django.db.backends.sqlite3 و
+# DATABASE_NAME را مسیر فایل پایگاه داده قرار داد.
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': env('DATABASE_ENGINE', default='django.db.backends.mysql'),
         'NAME': env('DATABASE_NAME'),
-        'HOST': env('DATABASE_HOST'),
-        'USER': env('DATABASE_USER'),
-        'PASSWORD': env('DATABASE_PASS'),
+        'HOST': env('DATABASE_HOST', default=''),
+        'USER': env('DATABASE_USER', default=''),
+        'PASSWORD': env('DATABASE_PASS', default=''),
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# در محیط عملیاتی باید از کش مشترک (مثلا Redis یا Memcached) استفاده شود تا شمارنده نسخه‌ها
+# بین همه پروسه‌ها یکسان باشد.
+
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('CACHE_LOCATION', default=''),
+    }
+}
+
+EXAM_PAPER_CACHE_TIMEOUT = env('EXAM_PAPER_CACHE_TIMEOUT', default=6 * 60 * 60, cast=int)
+
+# محاسبه نمره در پس‌زمینه (python manage.py run_scoring_worker)
+EXAM_SCORING_BACKGROUND = env('EXAM_SCORING_BACKGROUND', default=True, cast=bool)
+EXAM_SCORING_WORKERS = env('EXAM_SCORING_WORKERS', default=2, cast=int)
+EXAM_SCORING_CLAIM_TIMEOUT = env('EXAM_SCORING_CLAIM_TIMEOUT', default=5 * 60, cast=int)
+
+# تعداد ردیف‌هایی که خروجی CSV/XLSX در هر کوئری می‌خواند
+EXAM_EXPORT_CHUNK_SIZE = env('EXAM_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# جدول رتبه‌بندی: تعداد بازه‌های نمودار نمره و حداکثر تعداد دانش‌آموزی که تغییرشان به صورت افزایشی اعمال می‌شود
+EXAM_LEADERBOARD_BUCKETS = env('EXAM_LEADERBOARD_BUCKETS', default=10, cast=int)
+EXAM_LEADERBOARD_INCREMENTAL_LIMIT = env('EXAM_LEADERBOARD_INCREMENTAL_LIMIT', default=50, cast=int)
+
+# مدت نگهداری تحلیل سوالات در کش؛ با تغییر نمره‌ها یا سوالات نسخه جدید ساخته می‌شود
+EXAM_ITEM_ANALYSIS_CACHE_TIMEOUT = env('EXAM_ITEM_ANALYSIS_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+
+# حداکثر تعداد دانش‌آموز در هر درخواست ثبت‌نام گروهی کلاس
+EXAM_BULK_ENROLLMENT_LIMIT = env('EXAM_BULK_ENROLLMENT_LIMIT', default=5000, cast=int)
+
+# جلسه آزمون: مدت نگهداری وضعیت جلسه در کش و مهلت اضافه برای پاسخ‌هایی که نزدیک پایان زمان ارسال شده‌اند
+EXAM_SESSION_CACHE_TIMEOUT = env('EXAM_SESSION_CACHE_TIMEOUT', default=6 * 60 * 60, cast=int)
+EXAM_SESSION_GRACE_SECONDS = env('EXAM_SESSION_GRACE_SECONDS', default=10, cast=int)
+
+# چند دقیقه پیش از شروع آزمون برگه و جلسه‌های آن آماده شوند (python manage.py prewarm_exams)
+EXAM_PREWARM_LEAD_MINUTES = env('EXAM_PREWARM_LEAD_MINUTES', default=10, cast=int)
+
+# کانال زنده آزمون (WebSocket در /ws/exams/<id>/): پخش پیام در همین پروسه یا بین چند سرور
+# (exam.live.RedisBroadcast با EXAM_LIVE_BROADCAST_URL)، فاصله تیک‌های زمان و بازخوانی جلسه از کش بر حسب ثانیه
+EXAM_LIVE_BROADCAST_BACKEND = env('EXAM_LIVE_BROADCAST_BACKEND', default='exam.live.LocalBroadcast')
+EXAM_LIVE_BROADCAST_URL = env('EXAM_LIVE_BROADCAST_URL', default='redis://localhost:6379/0')
+EXAM_LIVE_TICK_SECONDS = env('EXAM_LIVE_TICK_SECONDS', default=5, cast=float)
+EXAM_LIVE_REFRESH_SECONDS = env('EXAM_LIVE_REFRESH_SECONDS', default=60, cast=float)
+
+# ذخیره خودکار پاسخ‌ها: بافر پیش‌نویس‌ها (exam.autosave.LocalBuffer در فایل EXAM_AUTOSAVE_PATH یا
+# exam.autosave.RedisBuffer با EXAM_AUTOSAVE_BUFFER_URL برای چند سرور) و فاصله نوشتن دسته‌ای آن‌ها بر حسب ثانیه
+# (python manage.py flush_exam_autosave)
+EXAM_AUTOSAVE_BUFFER_BACKEND = env('EXAM_AUTOSAVE_BUFFER_BACKEND', default='exam.autosave.LocalBuffer')
+EXAM_AUTOSAVE_PATH = env('EXAM_AUTOSAVE_PATH', default=str(BASE_DIR / 'autosave.sqlite3'))
+EXAM_AUTOSAVE_BUFFER_URL = env('EXAM_AUTOSAVE_BUFFER_URL', default='redis://localhost:6379/0')
+EXAM_AUTOSAVE_FLUSH_SECONDS = env('EXAM_AUTOSAVE_FLUSH_SECONDS', default=30, cast=float)
+
+# مدت نگهداری نتیجه احراز هویت توکن در کش برای مسیرهای پرتکرار مانند heartbeat آزمون
+AUTH_TOKEN_CACHE_TIMEOUT = env('AUTH_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+
+# ورود گروهی دانش‌آموزان: تعداد پردازه‌های هش رمز عبور (۱ یعنی بدون پردازه جدا) و تعداد ردیف هر تراکنش
+ACCOUNT_IMPORT_WORKERS = env('ACCOUNT_IMPORT_WORKERS', default=os.cpu_count() or 1, cast=int)
+ACCOUNT_IMPORT_CHUNK_SIZE = env('ACCOUNT_IMPORT_CHUNK_SIZE', default=500, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -136,11 +200,16 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.CustomUser'
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['Link']
 
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.TokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 STATIC_ROOT = BASE_DIR / 'staticfiles'